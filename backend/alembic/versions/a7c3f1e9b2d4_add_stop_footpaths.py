@@ -0,0 +1,41 @@
+"""add_stop_footpaths
+
+Revision ID: a7c3f1e9b2d4
+Revises: d4e2a6e4d93f
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3f1e9b2d4'
+down_revision: Union[str, Sequence[str], None] = 'd4e2a6e4d93f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('stop_footpaths',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('from_stop_id', sa.Integer(), nullable=False),
+    sa.Column('to_stop_id', sa.Integer(), nullable=False),
+    sa.Column('distance_meters', sa.Float(), nullable=False),
+    sa.Column('walk_seconds', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['from_stop_id'], ['stops.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['to_stop_id'], ['stops.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stop_footpaths_id'), 'stop_footpaths', ['id'], unique=False)
+    op.create_index(op.f('ix_stop_footpaths_from_stop_id'), 'stop_footpaths', ['from_stop_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stop_footpaths_from_stop_id'), table_name='stop_footpaths')
+    op.drop_index(op.f('ix_stop_footpaths_id'), table_name='stop_footpaths')
+    op.drop_table('stop_footpaths')
@@ -0,0 +1,34 @@
+"""add_stops_geography_index
+
+Revision ID: b5d8e2c4f0a1
+Revises: a7c3f1e9b2d4
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d8e2c4f0a1'
+down_revision: Union[str, Sequence[str], None] = 'a7c3f1e9b2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # المواقف المنشأة أو المعدلة فردياً لم تكن تحدث geom
+    op.execute("""
+        UPDATE stops
+        SET geom = ST_SetSRID(ST_MakePoint(lng, lat), Find_SRID(current_schema()::text, 'stops', 'geom'))
+        WHERE geom IS NULL OR ST_X(geom) <> lng OR ST_Y(geom) <> lat
+    """)
+    # فهرس على geography لـ ST_DWithin بالمتر وترتيب KNN (<->) في /stops/nearby
+    op.execute("CREATE INDEX IF NOT EXISTS ix_stops_geog ON stops USING gist ((geom::geography))")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_stops_geog")
@@ -0,0 +1,78 @@
+"""
+مقارنة إنتاجية البحث الفردي POST /search-route/ مع البحث الدفعي POST /search-route/batch
+على خادم يعمل محلياً.
+
+مثال:
+    python scripts/benchmark_batch_search.py --pairs 500 --batch-size 100
+"""
+import argparse
+import random
+import time
+
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+# حدود تقريبية لمدينة دمشق
+BBOX = (33.47, 36.24, 33.55, 36.34)
+
+
+def random_pairs(count, seed):
+    rng = random.Random(seed)
+    min_lat, min_lng, max_lat, max_lng = BBOX
+    pairs = []
+    for _ in range(count):
+        pairs.append({
+            "start_lat": rng.uniform(min_lat, max_lat),
+            "start_lng": rng.uniform(min_lng, max_lng),
+            "end_lat": rng.uniform(min_lat, max_lat),
+            "end_lng": rng.uniform(min_lng, max_lng),
+            "filter_type": rng.choice(["fastest", "cheapest", "least_transfers"]),
+        })
+    return pairs
+
+
+def run_single(base_url, pairs):
+    session = requests.Session()
+    started = time.perf_counter()
+    for pair in pairs:
+        r = session.post(f"{base_url}/api/v1/search-route/", json=pair, timeout=60)
+        r.raise_for_status()
+    return time.perf_counter() - started
+
+
+def run_batch(base_url, pairs, batch_size):
+    session = requests.Session()
+    started = time.perf_counter()
+    for i in range(0, len(pairs), batch_size):
+        chunk = pairs[i:i + batch_size]
+        r = session.post(f"{base_url}/api/v1/search-route/batch", json=chunk, timeout=600)
+        r.raise_for_status()
+        assert len(r.json()) == len(chunk), "عدد النتائج لا يطابق عدد الطلبات"
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مقارنة البحث الفردي مع البحث الدفعي")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--pairs", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # مجموعتان مختلفتان حتى لا تستفيد إحداهما من كاش الأخرى
+    single_pairs = random_pairs(args.pairs, args.seed)
+    batch_pairs = random_pairs(args.pairs, args.seed + 1)
+
+    single_seconds = run_single(args.base_url, single_pairs)
+    batch_seconds = run_batch(args.base_url, batch_pairs, args.batch_size)
+
+    single_rate = args.pairs / single_seconds
+    batch_rate = args.pairs / batch_seconds
+    print(f"البحث الفردي: {args.pairs} طلب في {single_seconds:.2f} ث ({single_rate:.1f} طلب/ث)")
+    print(f"البحث الدفعي: {args.pairs} طلب في {batch_seconds:.2f} ث ({batch_rate:.1f} طلب/ث، دفعات من {args.batch_size})")
+    print(f"التسريع: {batch_rate / single_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
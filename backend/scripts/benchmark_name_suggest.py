@@ -0,0 +1,62 @@
+"""
+قياس فهرس إكمال الأسماء (name_suggest) على أسماء مواقف عربية مولدة: زمن البناء والذاكرة، وزمن الاستعلام
+(ميكروثانية) لبادئات قصيرة وطويلة، ولكلمات بهمزات وتاء مربوطة مختلفة، ولاستعلام بلا نتائج.
+
+مثال:
+    python scripts/benchmark_name_suggest.py --names 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.name_suggest import NameSuggestIndex
+
+AREAS = ["المزة", "البرامكة", "باب توما", "الميدان", "ركن الدين", "المهاجرين", "جرمانا", "دمر", "القصاع", "الشعلان",
+         "كفرسوسة", "المالكي", "أبو رمانة", "الإذاعة", "السبع بحرات", "الحريقة", "الصالحية", "مساكن برزة", "القابون"]
+PLACES = ["دوار", "جامع", "مدرسة", "مشفى", "سوق", "حديقة", "جسر", "ساحة", "فرن", "صيدلية", "كلية", "مفرق", "شارع"]
+QUALIFIERS = ["الجديد", "القديم", "الشمالي", "الجنوبي", "الكبير", "الصغير", "الأول", "الثاني", "العام", "الغربي"]
+
+QUERIES = ["م", "مدر", "مدرسه المز", "موقف المز", "مزه", "الاذاعة جامع", "دوار ك", "فرن ابو رمانه الاول",
+           "جسر الإذاعة الكبير 12", "xyz"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس فهرس إكمال الأسماء")
+    parser.add_argument("--names", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = set()
+    while len(names) < args.names:
+        names.add(f"{rng.choice(PLACES)} {rng.choice(AREAS)} {rng.choice(QUALIFIERS)} {rng.randint(1, 400)}")
+    entries = [("stop", i, name, 33.5, 36.3) for i, name in enumerate(sorted(names))]
+
+    started = time.perf_counter()
+    index = NameSuggestIndex(entries)
+    build_s = time.perf_counter() - started
+    # ذاكرة نسخة ثانية ما زالت محفوظة (دون نصوص الأسماء المشتركة)
+    tracemalloc.start()
+    measured = NameSuggestIndex(entries)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+
+    query_us = {}
+    for query in QUERIES:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            results = index.suggest(query, 10)
+        query_us[query] = {"us": round((time.perf_counter() - started) / args.repeat * 1e6, 1), "results": len(results)}
+    print(json.dumps({"names": len(index), "build_s": round(build_s, 2), "index_bytes": retained,
+                      "query_us": query_us}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
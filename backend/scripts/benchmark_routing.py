@@ -0,0 +1,214 @@
+"""
+قياس زمن الاستجابة (p50/p95/p99) والإنتاجية للبحث عن الطرق والمواقف القريبة ولوحة التحكم،
+مع إخراج النتائج بصيغة JSON للمقارنة بين التعديلات.
+
+وضع http: طلبات متزامنة على خادم يعمل (مثلاً على قاعدة بيانات generate_synthetic_city.py).
+واجهات لوحة التحكم تحتاج رمز مدير (--token)، وتتخطى دونه.
+وضع inprocess: يولد مدينة تجريبية في الذاكرة ويقيس البحث (دون كاش) والمواقف القريبة مباشرة،
+دون خادم أو قاعدة بيانات أو Redis.
+
+مثال:
+    python scripts/benchmark_routing.py http --requests 2000 --concurrency 16 --token $ADMIN_TOKEN --output bench.json
+    python scripts/benchmark_routing.py inprocess --stops 5000 --routes 300 --requests 500
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BASE_URL = "http://127.0.0.1:8000"
+
+# حدود تقريبية لمدينة دمشق
+BBOX = (33.47, 36.24, 33.55, 36.34)
+
+FILTER_TYPES = ["fastest", "cheapest", "least_transfers"]
+
+DASHBOARD_ENDPOINTS = [
+    "/api/v1/dashboard/real-time-stats",
+    "/api/v1/dashboard/route-analytics?period=week",
+    "/api/v1/dashboard/top-routes",
+    "/api/v1/dashboard/heatmap-data",
+    "/api/v1/dashboard/usage-statistics",
+]
+
+
+def random_point(rng, bbox=BBOX):
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)
+
+
+def summarize(latencies, errors, elapsed):
+    """ملخص سيناريو: الأزمنة بالميلي ثانية والإنتاجية بالطلبات في الثانية"""
+    result = {"requests": len(latencies) + errors, "errors": errors,
+              "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None}
+    if latencies:
+        ms = np.array(latencies) * 1000
+        result.update({
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "p99_ms": round(float(np.percentile(ms, 99)), 2),
+            "mean_ms": round(float(ms.mean()), 2),
+            "max_ms": round(float(ms.max()), 2),
+        })
+    return result
+
+
+def run_scenario(calls, concurrency):
+    """تنفيذ الاستدعاءات بعدد خيوط معين؛ كل استدعاء دالة بلا وسائط ترفع استثناء عند الفشل"""
+    def timed(call):
+        started = time.perf_counter()
+        try:
+            call()
+        except Exception:
+            return None
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, calls))
+    else:
+        results = [timed(call) for call in calls]
+    elapsed = time.perf_counter() - started
+    latencies = [r for r in results if r is not None]
+    return summarize(latencies, len(results) - len(latencies), elapsed)
+
+
+def http_scenarios(args, rng):
+    import requests
+
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    def get(path, params=None, auth=False):
+        def call():
+            r = session.get(f"{args.base_url}{path}", params=params, headers=headers if auth else None, timeout=60)
+            r.raise_for_status()
+        return call
+
+    def post(path, body):
+        def call():
+            r = session.post(f"{args.base_url}{path}", json=body, timeout=60)
+            r.raise_for_status()
+        return call
+
+    searches = []
+    for _ in range(args.requests):
+        (start_lat, start_lng), (end_lat, end_lng) = random_point(rng), random_point(rng)
+        searches.append(post("/api/v1/search-route/", {
+            "start_lat": start_lat, "start_lng": start_lng, "end_lat": end_lat, "end_lng": end_lng,
+            "filter_type": rng.choice(FILTER_TYPES),
+        }))
+    scenarios = {"search": searches}
+    # نفس الطلبات مرة ثانية: النتائج من الكاش
+    scenarios["search_cached"] = list(searches)
+    nearby = []
+    for _ in range(args.requests):
+        lat, lng = random_point(rng)
+        nearby.append(get("/api/v1/stops/nearby", {"lat": lat, "lng": lng, "radius": 0.5}))
+    scenarios["nearby_stops"] = nearby
+    if args.token:
+        per_endpoint = max(1, args.requests // 10)
+        for path in DASHBOARD_ENDPOINTS:
+            name = "dashboard_" + path.split("/")[-1].split("?")[0].replace("-", "_")
+            scenarios[name] = [get(path, auth=True) for _ in range(per_endpoint)]
+    return scenarios
+
+
+def inprocess_scenarios(args, rng):
+    from src.schemas.search import SearchRouteRequest
+    from src.services import route_search
+    from src.services.synthetic_city import generate_city
+    from src.services.traffic import set_traffic_provider
+    from src.services.traffic_profile import ProfileTrafficDelayProvider, TrafficProfile
+    from src.services.transit_network import TransitNetwork
+
+    started = time.perf_counter()
+    city = generate_city(n_stops=args.stops, n_routes=args.routes, seed=args.seed)
+    network = TransitNetwork.from_rows(city.routes, city.stops, city.route_stops, city.route_paths)
+    print(f"Network built in {time.perf_counter() - started:.1f}s: {network.stats()}", file=sys.stderr)
+    # ملف ازدحام فارغ: مزود محلي بزمن صفري، فلا Redis ولا طلبات خارجية
+    set_traffic_provider(ProfileTrafficDelayProvider(TrafficProfile({})))
+    departure = datetime(2024, 5, 6, 12, 0, tzinfo=timezone.utc)
+
+    def search(request):
+        def call():
+            candidates = route_search._find_candidates(
+                network, request, lambda point: route_search._walking_candidates(network, point))
+            route_search._rank(network, candidates, request)
+        return call
+
+    def nearby(lat, lng):
+        return lambda: network.spatial_index.within(lat, lng, 500)
+
+    scenarios = {}
+    for filter_type in FILTER_TYPES + ["pareto"]:
+        requests = []
+        for _ in range(args.requests):
+            (start_lat, start_lng), (end_lat, end_lng) = city.random_point(rng), city.random_point(rng)
+            requests.append(search(SearchRouteRequest(
+                start_lat=start_lat, start_lng=start_lng, end_lat=end_lat, end_lng=end_lng,
+                filter_type=filter_type, departure_time=departure,
+            )))
+        scenarios[f"search_{filter_type}"] = requests
+    scenarios["nearby_stops"] = [nearby(*city.random_point(rng)) for _ in range(args.requests)]
+    return scenarios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء البحث والمواقف القريبة ولوحة التحكم")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    http = sub.add_parser("http", help="طلبات على خادم يعمل")
+    http.add_argument("--base-url", default=BASE_URL)
+    http.add_argument("--token", default=os.getenv("ADMIN_TOKEN"), help="رمز مدير لواجهات لوحة التحكم")
+    http.add_argument("--concurrency", type=int, default=8)
+    local = sub.add_parser("inprocess", help="مدينة تجريبية في الذاكرة دون خادم")
+    local.add_argument("--stops", type=int, default=5000)
+    local.add_argument("--routes", type=int, default=300)
+    local.add_argument("--concurrency", type=int, default=1)
+    for p in (http, local):
+        p.add_argument("--requests", type=int, default=500, help="عدد الطلبات لكل سيناريو")
+        p.add_argument("--seed", type=int, default=1)
+        p.add_argument("--output", help="ملف JSON للنتائج (الافتراضي الطباعة)")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    scenarios = http_scenarios(args, rng) if args.mode == "http" else inprocess_scenarios(args, rng)
+    results = {}
+    for name, calls in scenarios.items():
+        results[name] = run_scenario(calls, args.concurrency)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **({"base_url": args.base_url} if args.mode == "http" else {"stops": args.stops, "routes": args.routes}),
+        },
+        "scenarios": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
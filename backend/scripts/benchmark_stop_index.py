@@ -0,0 +1,79 @@
+"""
+قياس فهرس المواقف في الذاكرة (stop_geohash_index) على مواقف مدينة تجريبية: زمن البناء، الذاكرة لكل
+10 آلاف موقف، وزمن الاستعلام (ميكروثانية) للمواقف القريبة وأقرب المواقف ومربع الخريطة، مقارنة بـ StopIndex.
+
+مثال:
+    python scripts/benchmark_stop_index.py --stops 20000 --queries 5000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.geo_math import METERS_PER_DEG_LAT
+from src.services.stop_geohash_index import GeohashStopIndex
+from src.services.stop_index import StopIndex
+from src.services.synthetic_city import generate_city
+
+
+def per_query_us(fn, points):
+    started = time.perf_counter()
+    for lat, lng in points:
+        fn(lat, lng)
+    return round((time.perf_counter() - started) / len(points) * 1e6, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس فهرس المواقف في الذاكرة")
+    parser.add_argument("--stops", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--radius", type=float, default=500.0)
+    parser.add_argument("--precision", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    city = generate_city(n_stops=args.stops, n_routes=0, seed=args.seed)
+    ids = [s[0] for s in city.stops]
+    names = [s[1] for s in city.stops]
+    lats = [s[2] for s in city.stops]
+    lngs = [s[3] for s in city.stops]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = GeohashStopIndex(ids, names, lats, lngs, precision=args.precision)
+    build_ms = (time.perf_counter() - started) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    grid = StopIndex(lats, lngs, [()] * len(lats))
+
+    rng = random.Random(args.seed)
+    points = [city.random_point(rng) for _ in range(args.queries)]
+    half = 500 / METERS_PER_DEG_LAT
+    report = {
+        "stops": len(index),
+        "precision": args.precision,
+        "cells": len(index.cell_codes),
+        "build_ms": round(build_ms, 1),
+        "build_peak_bytes": peak,
+        "index_bytes": index.memory_bytes(),
+        "bytes_per_10k_stops": round(index.memory_bytes() / len(index) * 10000),
+        "query_us": {
+            "nearby": per_query_us(lambda lat, lng: index.within(lat, lng, args.radius), points),
+            "nearby_rows": per_query_us(lambda lat, lng: index.nearby(lat, lng, args.radius), points),
+            "nearest_5": per_query_us(lambda lat, lng: index.nearest(lat, lng, 5), points),
+            "bbox_1km": per_query_us(lambda lat, lng: index.bbox(lat - half, lng - half, lat + half, lng + half), points),
+            "stop_index_nearby": per_query_us(lambda lat, lng: grid.within(lat, lng, args.radius), points),
+        },
+        "mean_nearby_results": round(float(np.mean([len(index.within(lat, lng, args.radius)) for lat, lng in points[:500]])), 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
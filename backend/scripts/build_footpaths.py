@@ -0,0 +1,48 @@
+"""
+حساب جدول ممرات المشي stop_footpaths بين المواقف القريبة على خطوط مختلفة.
+محرك البحث يقرأ الجدول عند تحميل الشبكة بدل حساب المسافات وقت البحث.
+أعد تشغيله بعد إضافة مواقف أو خطوط أو تعديلها.
+
+مثال:
+    python scripts/build_footpaths.py --max-meters 300
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.database import SessionLocal
+from src.models import models
+from src.services.transit_network import load_network
+from src.config.routing_config import FOOTPATH_MAX_METERS, WALK_SPEED_MPS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="حساب ممرات المشي بين المواقف القريبة")
+    parser.add_argument("--max-meters", type=float, default=FOOTPATH_MAX_METERS)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        network = load_network(db)
+        rows = network.compute_footpaths(args.max_meters)
+        db.query(models.StopFootpath).delete()
+        db.bulk_insert_mappings(models.StopFootpath, [
+            {
+                "from_stop_id": from_stop_id,
+                "to_stop_id": to_stop_id,
+                "distance_meters": meters,
+                "walk_seconds": int(meters / WALK_SPEED_MPS),
+            }
+            for from_stop_id, to_stop_id, meters in rows
+        ])
+        db.commit()
+    finally:
+        db.close()
+    print(f"تم حفظ {len(rows)} ممر مشي ضمن {args.max_meters:.0f} م في {time.perf_counter() - started:.1f} ث")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+بناء ملف الازدحام التاريخي (لكل مقطع بين موقفين ولكل ساعة من الأسبوع) من سجلات makro_locations
+بعد مطابقتها مع route_paths. الخادم يستخدم الملف تلقائياً إذا وجد في ROUTING_TRAFFIC_PROFILE_PATH.
+
+مثال:
+    python scripts/build_traffic_profile.py --days 28
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.database import SessionLocal
+from src.models import models
+from src.services.transit_network import load_network
+from src.services.traffic_profile import build_profile
+from src.config.routing_config import TRAFFIC_PROFILE_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بناء ملف الازدحام التاريخي من سجلات مواقع المكروهات")
+    parser.add_argument("--output", default=TRAFFIC_PROFILE_PATH)
+    parser.add_argument("--days", type=int, default=28, help="عدد الأيام الأخيرة من السجلات المستخدمة")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        network = load_network(db)
+        since = datetime.now(timezone.utc) - timedelta(days=args.days)
+        # قراءة السجلات على دفعات مرتبة حسب المكرو ثم الزمن دون تحميلها كلها في الذاكرة
+        locations = (
+            db.query(models.MakroLocation.makro_id, models.MakroLocation.timestamp,
+                     models.MakroLocation.lat, models.MakroLocation.lng)
+            .filter(models.MakroLocation.timestamp >= since)
+            .order_by(models.MakroLocation.makro_id, models.MakroLocation.timestamp)
+            .yield_per(10000)
+        )
+        profile = build_profile(network, locations)
+    finally:
+        db.close()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    profile.save(args.output)
+    print(f"تم بناء ملف الازدحام لـ {len(profile.routes)} خط في {time.perf_counter() - started:.1f} ث: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+تصدير الشبكة كملف GTFS (zip) إلى مسار محدد، أو تحديث الملف الذي تخدمه /gtfs/feed.zip في GTFS_EXPORT_DIR.
+
+مثال:
+    python scripts/export_gtfs.py --output gtfs.zip
+    python scripts/export_gtfs.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.database import SessionLocal
+from src.services.gtfs_export import export_feed, write_feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تصدير الشبكة بصيغة GTFS")
+    parser.add_argument("--output", help="مسار ملف zip؛ دونه يحدث الملف المخدوم عبر الواجهة")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        if args.output:
+            db = SessionLocal()
+            try:
+                report = {"path": args.output, "counts": write_feed(db, args.output)}
+            finally:
+                db.close()
+        else:
+            report = export_feed(SessionLocal)
+    except ValueError as e:
+        sys.exit(f"GTFS export refused: {e}")
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
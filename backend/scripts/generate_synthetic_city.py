@@ -0,0 +1,142 @@
+"""
+توليد مدينة تجريبية (مواقف وخطوط ومسارات كثيفة) وملايين سجلات البحث ومواقع المكروهات في قاعدة بيانات
+لقياس الأداء. تستخدم DATABASE_URL أو --database-url، وتعمل مع PostgreSQL/PostGIS ومع SQLite
+(ملف قياس مستقل: تنشأ الجداول المطلوبة دون أعمدة geom).
+المعرفات تبدأ بعد أكبر معرف موجود، فلا تتعارض مع البيانات الحالية؛ استخدم قاعدة بيانات منفصلة للقياس.
+
+مثال:
+    python scripts/generate_synthetic_city.py --stops 5000 --routes 300 --search-logs 2000000 --makros 200
+    python scripts/generate_synthetic_city.py --database-url sqlite:///bench.db --search-logs 1000000
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy import Column, MetaData, Table, create_engine, func, select
+from geoalchemy2 import Geometry
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.models import models
+from src.services.synthetic_city import generate_city, makro_location_rows, search_log_rows
+
+TABLES = ["routes", "stops", "route_stops", "route_paths", "search_logs", "makro_locations"]
+
+
+def sqlite_tables(engine):
+    """نسخة من الجداول دون أعمدة Geometry ودون مفاتيح أجنبية (SQLite بلا SpatiaLite)"""
+    metadata = MetaData()
+    tables = {}
+    for name in TABLES:
+        source = models.Base.metadata.tables[name]
+        columns = [Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, unique=c.unique)
+                   for c in source.columns if not isinstance(c.type, Geometry)]
+        tables[name] = Table(name, metadata, *columns)
+    metadata.create_all(engine)
+    return tables
+
+
+def insert_chunks(engine, table, rows, chunk_size, label):
+    """إدخال الصفوف على دفعات (executemany) مع طباعة التقدم؛ تعيد العدد"""
+    total = 0
+    started = time.perf_counter()
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        with engine.begin() as conn:
+            conn.execute(table.insert(), chunk)
+        total += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"\r{label}: {total:,} rows ({total / max(elapsed, 1e-9):,.0f}/s)", end="", flush=True)
+    if total:
+        print()
+    return total
+
+
+def with_geom(rows, spatial):
+    """إضافة geom بنفس صيغة واجهات المواقف (WKT دون SRID، مطابق لـ SRID العمود)"""
+    for row in rows:
+        if spatial:
+            row["geom"] = f"POINT({row['lng']} {row['lat']})"
+        yield row
+
+
+def next_ids(engine, tables):
+    with engine.connect() as conn:
+        return {name: (conn.execute(select(func.max(tables[name].c.id))).scalar() or 0) + 1 for name in TABLES}
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="توليد مدينة تجريبية وسجلات بحث ومواقع لقياس الأداء")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--stops", type=int, default=5000)
+    parser.add_argument("--routes", type=int, default=300)
+    parser.add_argument("--stops-per-route", type=int, default=30)
+    parser.add_argument("--path-spacing", type=float, default=40.0, help="المسافة بين نقاط المسار بالمتر")
+    parser.add_argument("--radius", type=float, default=9000.0, help="نصف قطر المدينة بالمتر")
+    parser.add_argument("--search-logs", type=int, default=1_000_000)
+    parser.add_argument("--search-days", type=int, default=30)
+    parser.add_argument("--makros", type=int, default=100, help="عدد المكروهات (كل مكرو ~1900 موقع يومياً)")
+    parser.add_argument("--makro-days", type=int, default=7)
+    parser.add_argument("--interval", type=int, default=30, help="الثواني بين موقعين لنفس المكرو")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set; pass --database-url")
+
+    engine = create_engine(args.database_url)
+    spatial = engine.dialect.name == "postgresql"
+    tables = models.Base.metadata.tables if spatial else sqlite_tables(engine)
+    if spatial:
+        models.Base.metadata.create_all(engine, tables=[tables[name] for name in TABLES])
+
+    started = time.perf_counter()
+    offsets = next_ids(engine, tables)
+    city = generate_city(
+        n_stops=args.stops, n_routes=args.routes, stops_per_route=args.stops_per_route,
+        path_spacing_m=args.path_spacing, radius_m=args.radius, seed=args.seed, id_offsets=offsets,
+    )
+    print(f"City generated in {time.perf_counter() - started:.1f}s: {city.stats()}")
+
+    # المعرفات محسوبة مسبقاً في المدينة؛ السجلات الكبيرة تترك المعرف لقاعدة البيانات
+    insert_chunks(engine, tables["routes"], (
+        {"id": id, "name": name, "price": price, "operating_hours": hours,
+         "description": "خط مولد لقياس الأداء"} for id, name, price, hours in city.routes
+    ), args.chunk_size, "routes")
+    insert_chunks(engine, tables["stops"], with_geom((
+        {"id": id, "name": name, "lat": lat, "lng": lng} for id, name, lat, lng in city.stops
+    ), spatial), args.chunk_size, "stops")
+    insert_chunks(engine, tables["route_stops"], (
+        {"id": id, "route_id": route_id, "stop_id": stop_id, "stop_order": order}
+        for id, route_id, stop_id, order in city.route_stops
+    ), args.chunk_size, "route_stops")
+    insert_chunks(engine, tables["route_paths"], with_geom((
+        {"id": id, "route_id": route_id, "lat": lat, "lng": lng, "point_order": order}
+        for id, route_id, lat, lng, order in city.route_paths
+    ), spatial), args.chunk_size, "route_paths")
+    insert_chunks(engine, tables["search_logs"],
+                  search_log_rows(city, args.search_logs, days=args.search_days, seed=args.seed + 1),
+                  args.chunk_size, "search_logs")
+    insert_chunks(engine, tables["makro_locations"],
+                  with_geom(makro_location_rows(city, args.makros, days=args.makro_days,
+                                                interval_seconds=args.interval, seed=args.seed + 2), spatial),
+                  args.chunk_size, "makro_locations")
+
+    if spatial:
+        # المعرفات أدخلت صراحة، فتحدَّث التسلسلات حتى لا تتعارض الإدخالات اللاحقة
+        with engine.begin() as conn:
+            for name in ["routes", "stops", "route_stops", "route_paths"]:
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), (SELECT MAX(id) FROM {name}))"
+                )
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+استيراد المواقف والخطوط دفعة واحدة من CSV أو GeoJSON أو GTFS (zip أو مجلد) عبر جداول مؤقتة (COPY)
+ودمج على مستوى المجموعات (src/services/network_import.py). الأسماء الموجودة تتجاهل إلا مع --update-existing.
+بعد الاستيراد شغل build_footpaths إذا أضيفت مواقف كثيرة حتى تحسب ممرات المشي بينها.
+
+مثال:
+    python scripts/import_network.py data/stops.csv
+    python scripts/import_network.py data/gtfs.zip --update-existing
+    python scripts/import_network.py data/lines.geojson --database-url sqlite:///bench.db
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.network_import import import_records, read_source
+from src.config.routing_config import IMPORT_CHUNK_ROWS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استيراد المواقف والخطوط دفعة واحدة")
+    parser.add_argument("path", help="ملف CSV أو GeoJSON أو GTFS (zip أو مجلد)")
+    parser.add_argument("--format", choices=["csv", "geojson", "gtfs"], help="تستنتج من الامتداد إذا لم تحدد")
+    parser.add_argument("--update-existing", action="store_true", help="تحديث المواقف والخطوط الموجودة بنفس الاسم")
+    parser.add_argument("--chunk-rows", type=int, default=IMPORT_CHUNK_ROWS, help="عدد الصفوف في كل دفعة")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("DATABASE_URL is not set; pass --database-url")
+
+    started = time.perf_counter()
+
+    def progress(kind, staged):
+        print(f"  {time.perf_counter() - started:7.1f}s  {staged:>9} {kind} rows staged", flush=True)
+
+    with Session(create_engine(args.database_url)) as db:
+        report = import_records(db, read_source(args.path, args.format), update_existing=args.update_existing,
+                                progress=progress, chunk_rows=args.chunk_rows)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+تصدير لقطة الشبكة الثنائية من قاعدة البيانات، أو تحميلها للتحقق منها وقياس زمن التحميل.
+عمليات الخادم تحمّل اللقطة من ROUTING_NETWORK_SNAPSHOT_PATH عند بدئها إن وجدت.
+أعد التصدير بعد تعديل المواقف أو الخطوط أو المسارات.
+
+مثال:
+    python scripts/network_snapshot.py export --output data/network.snapshot
+    python scripts/network_snapshot.py load --input data/network.snapshot
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.network_snapshot import load_snapshot, save_snapshot, snapshot_info
+from src.config.routing_config import NETWORK_SNAPSHOT_PATH
+
+
+def export(path: str):
+    from config.database import SessionLocal
+    from src.services.network_updates import current_seq
+    from src.services.transit_network import load_network
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # رقم التحديث يقرأ قبل الاستعلامات، كما في get_network: العمليات لا تعيد البناء عند التحميل
+        # إلا إذا نشر تعديل بعد التصدير
+        update_seq = current_seq()
+        network = load_network(db)
+        network.update_seq = update_seq
+    finally:
+        db.close()
+    built = time.perf_counter()
+    save_snapshot(network, path)
+    print(f"الشبكة: {network.stats()}")
+    print(f"البناء من قاعدة البيانات {built - started:.2f} ث، الكتابة {time.perf_counter() - built:.2f} ث، "
+          f"الحجم {os.path.getsize(path) / 1e6:.1f} MB -> {path}")
+
+
+def load(path: str):
+    started = time.perf_counter()
+    network = load_snapshot(path)
+    print(f"اللقطة: {snapshot_info(path)}")
+    print(f"الشبكة: {network.stats()}")
+    print(f"زمن التحميل {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="لقطة الشبكة الثنائية")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("export", help="بناء الشبكة من قاعدة البيانات وحفظ اللقطة").add_argument(
+        "--output", default=NETWORK_SNAPSHOT_PATH)
+    commands.add_parser("load", help="تحميل اللقطة وعرض محتواها وزمن التحميل").add_argument(
+        "--input", default=NETWORK_SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export(args.output)
+    else:
+        load(args.input)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+تسخين كاش البحث بنتائج أكثر الطلبات تكراراً في search_logs للساعات القادمة، قبل الذروة.
+يشغل دورياً، مثلاً كل ساعة من cron:
+    15 * * * *  cd /app/backend && python scripts/warm_search_cache.py --ahead 2
+
+مثال:
+    python scripts/warm_search_cache.py --ahead 2 --top 200
+    python scripts/warm_search_cache.py --hours 7,8,17 --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from config.database import SessionLocal
+from src.services.search_warmup import load_popular_pairs, upcoming_hours, warm_cache
+from src.config.routing_config import WARMUP_HISTORY_DAYS, WARMUP_TOP_PAIRS, WARMUP_TTL_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تسخين كاش البحث من أكثر الطلبات تكراراً")
+    parser.add_argument("--ahead", type=int, default=2, help="عدد الساعات القادمة المسخنة")
+    parser.add_argument("--hours", help="ساعات محلية محددة مفصولة بفواصل بدل --ahead، مثال: 7,8,17")
+    parser.add_argument("--top", type=int, default=WARMUP_TOP_PAIRS, help="عدد الأزواج لكل ساعة")
+    parser.add_argument("--days", type=int, default=WARMUP_HISTORY_DAYS, help="عدد أيام السجلات المستخدمة")
+    parser.add_argument("--ttl", type=int, default=WARMUP_TTL_SECONDS, help="أدنى صلاحية للنتائج (ثانية)")
+    parser.add_argument("--dry-run", action="store_true", help="طباعة الأزواج دون حساب")
+    args = parser.parse_args()
+
+    local_now, hours = upcoming_hours(args.ahead)
+    if args.hours:
+        hours = [int(h) for h in args.hours.split(",") if h.strip()]
+    if not hours:
+        print("No hours left to warm today")
+        return
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        pairs = load_popular_pairs(db, hours, top_n=args.top, days=args.days)
+    finally:
+        db.close()
+    grouped = time.perf_counter()
+    for hour, hour_pairs in sorted(pairs.items()):
+        covered = sum(p.count for p in hour_pairs)
+        print(f"{hour:02d}:00  {len(hour_pairs)} pairs covering {covered} logged searches")
+        if args.dry_run:
+            for p in hour_pairs[:10]:
+                print(f"    {p.count:6d}  ({p.start_lat:.5f}, {p.start_lng:.5f}) -> "
+                      f"({p.end_lat:.5f}, {p.end_lng:.5f})  {p.filter_type}")
+    if args.dry_run:
+        return
+
+    result = warm_cache(pairs, local_now, ttl=args.ttl)
+    print(f"Grouped logs in {grouped - started:.1f}s, warmed in {time.perf_counter() - grouped:.1f}s: {result}")
+
+
+if __name__ == "__main__":
+    main()
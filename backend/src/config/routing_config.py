@@ -0,0 +1,159 @@
+"""
+Routing Configuration
+إعدادات محرك البحث عن المسارات
+"""
+
+import os
+
+# ==================== SPEEDS ====================
+
+# سرعات تقديرية (متر/ثانية)
+WALK_SPEED_MPS = 5000 / 3600  # 5 كم/س
+MAKRO_SPEED_MPS = 20000 / 3600  # 20 كم/س
+
+# ==================== SEARCH SETTINGS ====================
+
+# فرق التوقيت المحلي عن UTC (دمشق UTC+3)، لمطابقة وقت الانطلاق مع ساعات عمل الخطوط
+LOCAL_UTC_OFFSET_HOURS = int(os.getenv("ROUTING_LOCAL_UTC_OFFSET_HOURS", "3"))
+
+# أقصى مسافة مشي من نقطة البداية إلى موقف (ومن موقف إلى الوجهة) بالمتر
+MAX_WALK_METERS = float(os.getenv("ROUTING_MAX_WALK_METERS", "1000"))
+
+# عدد أقرب المواقف المستخدمة إذا لم يوجد أي موقف ضمن مسافة المشي
+FALLBACK_NEAREST_STOPS = int(os.getenv("ROUTING_FALLBACK_NEAREST_STOPS", "5"))
+
+# أقصى عدد للتبديلات بين الخطوط في الرحلة الواحدة
+MAX_TRANSFERS = int(os.getenv("ROUTING_MAX_TRANSFERS", "2"))
+
+# زمن إضافي لكل تبديل (انتظار المكرو التالي) بالثواني
+TRANSFER_PENALTY_SECONDS = int(os.getenv("ROUTING_TRANSFER_PENALTY_SECONDS", "300"))
+
+# المكروهات تعمل بالاتجاهين على نفس تسلسل المواقف
+BIDIRECTIONAL_ROUTES = os.getenv("ROUTING_BIDIRECTIONAL_ROUTES", "true").lower() == "true"
+
+# أقصى مسافة مشي بين موقفين للتبديل بين خطين (جدول stop_footpaths)
+FOOTPATH_MAX_METERS = float(os.getenv("ROUTING_FOOTPATH_MAX_METERS", "300"))
+
+# مقاطع المشي الأقصر من هذه المسافة لا تظهر للمستخدم
+MIN_WALK_SEGMENT_METERS = 30
+
+# عدد المسارات المقترحة المعادة
+MAX_SUGGESTIONS = 3
+
+# أقصى عدد للمسارات في مجموعة باريتو (filter_type=pareto)
+MAX_PARETO_SUGGESTIONS = int(os.getenv("ROUTING_MAX_PARETO_SUGGESTIONS", "8"))
+
+# أقصى عدد طلبات في طلب البحث الدفعي الواحد
+MAX_BATCH_REQUESTS = int(os.getenv("ROUTING_MAX_BATCH_REQUESTS", "1000"))
+
+# حدود طلب منطقة الوصول (isochrone): عدد الفترات وأطولها بالدقائق
+MAX_ISOCHRONE_BANDS = 6
+MAX_ISOCHRONE_MINUTES = int(os.getenv("ROUTING_MAX_ISOCHRONE_MINUTES", "120"))
+
+# حدود مصفوفة الأزمنة: عدد النقاط في كل جهة، وعدد الخلايا، وأطول زمن يحسب (ثانية)
+MAX_MATRIX_POINTS = int(os.getenv("ROUTING_MAX_MATRIX_POINTS", "5000"))
+MAX_MATRIX_CELLS = int(os.getenv("ROUTING_MAX_MATRIX_CELLS", "1000000"))
+MATRIX_MAX_SECONDS = int(os.getenv("ROUTING_MATRIX_MAX_SECONDS", "7200"))
+
+# عدد عمليات حساب المصفوفة، وأقل عدد نقاط بداية يستحق توزيع الحساب عليها
+MATRIX_WORKERS = int(os.getenv("ROUTING_MATRIX_WORKERS", str(min(os.cpu_count() or 1, 8))))
+MATRIX_PARALLEL_MIN_ORIGINS = int(os.getenv("ROUTING_MATRIX_PARALLEL_MIN_ORIGINS", "32"))
+
+# ==================== CACHE SETTINGS ====================
+
+# دقة geohash لخلايا مفتاح كاش البحث (7 ≈ 153 متر، 6 ≈ 1.2 كم)
+SEARCH_CACHE_GEOHASH_PRECISION = int(os.getenv("ROUTING_CACHE_GEOHASH_PRECISION", "7"))
+
+# مدة صلاحية نتائج البحث في الكاش (ثانية)
+SEARCH_CACHE_TTL_SECONDS = int(os.getenv("ROUTING_CACHE_TTL_SECONDS", "120"))
+
+# دقة geohash لوسم نتائج الكاش بمنطقتي البداية والنهاية، لإبطالها عند تعديل خط قريب (5 ≈ 4.9 كم)
+SEARCH_CACHE_AREA_PRECISION = int(os.getenv("ROUTING_CACHE_AREA_PRECISION", "5"))
+
+# تسخين الكاش قبل الذروة: عدد أزواج الخلايا الأكثر بحثاً لكل ساعة، وأيام السجلات المستخدمة،
+# ومدة صلاحية النتائج المسخنة (أطول من صلاحية البحث العادي لتبقى حتى نهاية الذروة)
+WARMUP_TOP_PAIRS = int(os.getenv("ROUTING_WARMUP_TOP_PAIRS", "200"))
+WARMUP_HISTORY_DAYS = int(os.getenv("ROUTING_WARMUP_HISTORY_DAYS", "28"))
+WARMUP_TTL_SECONDS = int(os.getenv("ROUTING_WARMUP_TTL_SECONDS", "7200"))
+
+# ==================== SEARCH LOG SETTINGS ====================
+
+# تسجيل عمليات البحث في search_logs (للوحة التحكم)
+SEARCH_LOG_ENABLED = os.getenv("ROUTING_SEARCH_LOG_ENABLED", "true").lower() == "true"
+
+# أقصى عدد سجلات تنتظر الكتابة في الذاكرة؛ ما يزيد عنه يسقط ويعد
+SEARCH_LOG_QUEUE_SIZE = int(os.getenv("ROUTING_SEARCH_LOG_QUEUE_SIZE", "10000"))
+
+# حجم دفعة الكتابة، وأقصى مدة انتظار قبل كتابة دفعة غير ممتلئة (ثانية)
+SEARCH_LOG_BATCH_SIZE = int(os.getenv("ROUTING_SEARCH_LOG_BATCH_SIZE", "500"))
+SEARCH_LOG_FLUSH_SECONDS = float(os.getenv("ROUTING_SEARCH_LOG_FLUSH_SECONDS", "2.0"))
+
+# ==================== TRAFFIC SETTINGS ====================
+
+# المهلة الإجمالية لكل طلبات الازدحام في البحث الواحد (ثانية)
+TRAFFIC_DEADLINE_SECONDS = float(os.getenv("ROUTING_TRAFFIC_DEADLINE_SECONDS", "2.0"))
+
+# مدة صلاحية زمن الازدحام المخزن لكل مقطع بين موقفين (ثانية)
+TRAFFIC_CACHE_TTL_SECONDS = int(os.getenv("ROUTING_TRAFFIC_CACHE_TTL_SECONDS", "300"))
+
+# عدد الطلبات المتوازية لمزود الازدحام
+TRAFFIC_MAX_WORKERS = int(os.getenv("ROUTING_TRAFFIC_MAX_WORKERS", "16"))
+
+# ملف الازدحام التاريخي (ساعة الأسبوع) المبني من سجلات makro_locations
+TRAFFIC_PROFILE_PATH = os.getenv("ROUTING_TRAFFIC_PROFILE_PATH", "data/traffic_profile.npz")
+
+# فرق التوقيت المحلي عن UTC لحساب ساعة الأسبوع
+TRAFFIC_PROFILE_UTC_OFFSET_HOURS = int(os.getenv("ROUTING_TRAFFIC_PROFILE_UTC_OFFSET_HOURS", str(LOCAL_UTC_OFFSET_HOURS)))
+
+# ==================== NETWORK SETTINGS ====================
+
+# حجم خلية الفهرس المكاني للمواقف بالدرجات (0.005 درجة ≈ 550 متر)
+STOP_INDEX_CELL_DEG = float(os.getenv("ROUTING_STOP_INDEX_CELL_DEG", "0.005"))
+
+# أقصى بعد لموقف عن مسار خطه حتى تقاس مسافة الركوب على المسار (وإلا تقاس بخطوط مستقيمة بين المواقف)
+PATH_SNAP_MAX_METERS = float(os.getenv("ROUTING_PATH_SNAP_MAX_METERS", "150"))
+
+# مدة صلاحية الشبكة المحملة في الذاكرة قبل إعادة بنائها من قاعدة البيانات؛ تعديلات الواجهة تصل كتحديثات
+# جزئية (NETWORK_UPDATES_CHANNEL)، فإعادة البناء تلتقط فقط التعديلات المباشرة على قاعدة البيانات
+NETWORK_TTL_SECONDS = int(os.getenv("ROUTING_NETWORK_TTL_SECONDS", "3600"))
+
+# قناة Redis لأحداث تعديل الخطوط والمواقف
+NETWORK_UPDATES_CHANNEL = os.getenv("ROUTING_NETWORK_UPDATES_CHANNEL", "network_updates")
+
+# لقطة الشبكة الثنائية (scripts/network_snapshot.py export)؛ إن وجدت تحمّل منها الشبكة عند بدء العملية
+NETWORK_SNAPSHOT_PATH = os.getenv("ROUTING_NETWORK_SNAPSHOT_PATH", "data/network.snapshot")
+
+# ==================== NEARBY STOPS SETTINGS ====================
+
+# عدد المواقف في صفحة /stops/nearby (الافتراضي والأقصى)
+NEARBY_DEFAULT_LIMIT = int(os.getenv("ROUTING_NEARBY_DEFAULT_LIMIT", "50"))
+NEARBY_MAX_LIMIT = int(os.getenv("ROUTING_NEARBY_MAX_LIMIT", "500"))
+
+# خدمة /stops/nearby من فهرس المواقف في الذاكرة (stop_geohash_index) بدل PostGIS
+NEARBY_IN_MEMORY = os.getenv("ROUTING_NEARBY_IN_MEMORY", "true").lower() == "true"
+
+# دقة geohash لخلايا فهرس المواقف في الذاكرة (6 ≈ 1.2×0.6 كم)
+STOP_GEOHASH_PRECISION = int(os.getenv("ROUTING_STOP_GEOHASH_PRECISION", "6"))
+
+# عدد الاقتراحات في /stops/suggest (الافتراضي والأقصى)
+SUGGEST_DEFAULT_LIMIT = int(os.getenv("ROUTING_SUGGEST_DEFAULT_LIMIT", "10"))
+SUGGEST_MAX_LIMIT = int(os.getenv("ROUTING_SUGGEST_MAX_LIMIT", "50"))
+
+# ==================== IMPORT SETTINGS ====================
+
+# عدد الصفوف في كل دفعة تكتب إلى جداول الاستيراد المؤقتة (COPY أو executemany)
+IMPORT_CHUNK_ROWS = int(os.getenv("ROUTING_IMPORT_CHUNK_ROWS", "20000"))
+
+# ==================== GTFS EXPORT SETTINGS ====================
+
+# مجلد ملف GTFS المصدّر (scripts/export_gtfs.py و /gtfs/feed.zip)؛ يعاد توليده عند تغير رقم تعديل الشبكة
+GTFS_EXPORT_DIR = os.getenv("ROUTING_GTFS_EXPORT_DIR", "data/gtfs")
+
+# بيانات الجهة المشغلة في agency.txt؛ agency_url مطلوب في GTFS، والتصدير يرفض دونه (يضبط عند النشر)
+GTFS_AGENCY_NAME = os.getenv("ROUTING_GTFS_AGENCY_NAME", "Makroji")
+GTFS_AGENCY_URL = os.getenv("ROUTING_GTFS_AGENCY_URL", "")
+GTFS_AGENCY_TIMEZONE = os.getenv("ROUTING_GTFS_AGENCY_TIMEZONE", "Asia/Damascus")
+
+# المكروهات بلا جداول مواعيد: رحلة نموذجية لكل اتجاه تتكرر كل GTFS_HEADWAY_SECONDS خلال ساعات العمل
+# (الانتظار المتوقع نصفها، أي TRANSFER_PENALTY_SECONDS)
+GTFS_HEADWAY_SECONDS = int(os.getenv("ROUTING_GTFS_HEADWAY_SECONDS", str(2 * TRANSFER_PENALTY_SECONDS)))
@@ -12,6 +12,7 @@ from src.routers import traffic
 from src.routers import auth, friendship, location_share, dashboard
 from fastapi.responses import JSONResponse
 from src.routers import complaints, feedback
+from src.routers import network_import, gtfs
 from fastapi.responses import RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -84,6 +85,8 @@ app.include_router(location_share.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(complaints.router, prefix="/api/v1")
 app.include_router(feedback.router, prefix="/api/v1")
+app.include_router(network_import.router, prefix="/api/v1")
+app.include_router(gtfs.router, prefix="/api/v1")
 
 health_router = APIRouter()
 @health_router.get("/health")
@@ -97,4 +100,19 @@ def custom_docs():
 
 @app.get("/api/v1/redoc")
 def custom_redoc():
-    return RedirectResponse(url="/redoc")
\ No newline at end of file
+    return RedirectResponse(url="/redoc")
+
+@app.on_event("startup")
+def warm_stop_index():
+    """تحميل الشبكة وبناء فهرسي المواقف والأسماء في الذاكرة بعد بدء العملية، دون تأخير قبول الطلبات"""
+    import threading
+    from src.services.stop_geohash_index import get_stop_geohash_index
+    from src.services.name_suggest import get_name_suggest_index
+
+    def build():
+        try:
+            get_stop_geohash_index()
+            get_name_suggest_index()
+        except Exception as e:
+            logging.warning(f"Stop index warmup failed: {e}")
+    threading.Thread(target=build, name="stop-index-warmup", daemon=True).start()
@@ -61,6 +61,15 @@ class RoutePath(Base):
     # علاقات
     route = relationship('Route', back_populates='paths')
 
+class StopFootpath(Base):
+    # ممر مشي محسوب مسبقاً بين موقفين قريبين للتبديل بين الخطوط (scripts/build_footpaths.py)
+    __tablename__ = 'stop_footpaths'
+    id = Column(Integer, primary_key=True, index=True)
+    from_stop_id = Column(Integer, ForeignKey('stops.id', ondelete='CASCADE'), nullable=False, index=True)
+    to_stop_id = Column(Integer, ForeignKey('stops.id', ondelete='CASCADE'), nullable=False)
+    distance_meters = Column(Float, nullable=False)
+    walk_seconds = Column(Integer, nullable=False)
+
 class Feedback(Base):
     __tablename__ = 'feedback'
     id = Column(Integer, primary_key=True, index=True)
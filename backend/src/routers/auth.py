@@ -15,6 +15,7 @@ import shutil
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -41,6 +42,17 @@ def get_current_user(
             detail="Invalid authentication credentials"
         )
 
+def get_optional_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[int]:
+    """معرف المستخدم من التوكن إن وجد وكان صالحاً، دون استعلام قاعدة البيانات (للمسارات العامة)"""
+    if credentials is None:
+        return None
+    try:
+        return verify_token(credentials.credentials).user_id
+    except HTTPException:
+        return None
+
 def get_current_admin(
     current_user: UserResponse = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import FileResponse
+
+from src.services.gtfs_export import get_feed
+
+router = APIRouter(prefix="/gtfs", tags=["GTFS"])
+
+
+@router.get("/feed.zip")
+def download_gtfs_feed(if_none_match: Optional[str] = Header(None)):
+    """الشبكة بصيغة GTFS؛ يعاد توليد الملف فقط عند تعديل الشبكة، ومع If-None-Match مطابق يعاد 304"""
+    try:
+        feed = get_feed()
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=f"تصدير GTFS غير مهيأ: {e}")
+    etag = f'"{feed["etag"]}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(feed["path"], media_type="application/zip", filename="gtfs.zip", headers=headers)
@@ -0,0 +1,42 @@
+import io
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..routers.auth import get_current_admin
+from ..schemas.auth import UserResponse
+from src.services.network_import import detect_format, import_records, read_csv, read_geojson, read_gtfs
+
+router = APIRouter(prefix="/import", tags=["Import"])
+
+
+@router.post("/network")
+def import_network(
+    file: UploadFile = File(..., description="CSV أو GeoJSON أو GTFS (zip)"),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|geojson|gtfs)$",
+                                       description="صيغة الملف؛ تستنتج من الامتداد إذا لم تحدد"),
+    update_existing: bool = Query(False, description="تحديث المواقف والخطوط الموجودة بنفس الاسم"),
+    current_admin: UserResponse = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """استيراد مواقف وخطوط دفعة واحدة؛ يعيد عدد الصفوف المقروءة والمضافة والمحدثة لكل جدول"""
+    try:
+        file_format = file_format or detect_format(file.filename or "")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="صيغة الملف غير معروفة: حدد format")
+    if file_format == "gtfs":
+        records = read_gtfs(file.file)
+    else:
+        reader = read_csv if file_format == "csv" else read_geojson
+        records = reader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+
+    def progress(kind: str, staged: int):
+        logging.info(f"Import {file.filename}: {staged} {kind} rows staged")
+
+    try:
+        return import_records(db, records, update_existing=update_existing, progress=progress)
+    except (ValueError, KeyError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"ملف الاستيراد غير صالح: {e}")
@@ -4,6 +4,7 @@ from src.schemas.route_path import RoutePathCreate, RoutePathRead, RoutePathUpda
 from src.models import models
 from config.database import SessionLocal
 from src.routers.auth import get_current_user
+from src.services.network_updates import publish_network_change
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/route-paths", tags=["RoutePaths"])
@@ -35,6 +36,7 @@ def create_route_path(route_path: RoutePathCreate, db: Session = Depends(get_db)
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail="خطأ في حفظ نقطة المسار: تأكد من صحة البيانات المدخلة وعدم تكرار النقطة")
+    publish_network_change(route_ids=[db_route_path.route_id])
     return db_route_path
 
 @router.get("/", response_model=list[RoutePathRead])
@@ -53,11 +55,13 @@ def update_route_path(route_path_id: int, route_path: RoutePathUpdate, db: Sessi
     db_route_path = db.query(models.RoutePath).filter(models.RoutePath.id == route_path_id).first()
     if not db_route_path:
         raise HTTPException(status_code=404, detail="RoutePath not found")
+    old_route_id = db_route_path.route_id
     for var, value in vars(route_path).items():
         if value is not None:
             setattr(db_route_path, var, value)
     db.commit()
     db.refresh(db_route_path)
+    publish_network_change(route_ids=[old_route_id, db_route_path.route_id])
     return db_route_path
 
 @router.delete("/{route_path_id}")
@@ -65,6 +69,8 @@ def delete_route_path(route_path_id: int, db: Session = Depends(get_db), current
     db_route_path = db.query(models.RoutePath).filter(models.RoutePath.id == route_path_id).first()
     if not db_route_path:
         raise HTTPException(status_code=404, detail="RoutePath not found")
+    route_id = db_route_path.route_id
     db.delete(db_route_path)
     db.commit()
+    publish_network_change(route_ids=[route_id])
     return {"ok": True} 
\ No newline at end of file
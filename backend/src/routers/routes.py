@@ -11,6 +11,7 @@ from shapely.geometry import Point
 from src.routers.auth import get_current_user
 from src.services.cache_service import cache_get, cache_set
 from src.services.cache_service import redis_client
+from src.services.network_updates import publish_network_change
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/routes", tags=["Routes"])
@@ -35,10 +36,9 @@ def create_route(route: RouteCreate, db: Session = Depends(get_db)):
         operating_hours=route.operating_hours
     )
     db.add(db_route)
-    db.commit()
-    db.refresh(db_route)
+    db.flush()
 
-    # إضافة المحطات
+    # إضافة المحطات (حفظ واحد للخط ومحطاته ومساراته)
     stop_objs = []
     if route.stops:
         for stop in route.stops:
@@ -49,13 +49,13 @@ def create_route(route: RouteCreate, db: Session = Depends(get_db)):
                 geom=from_shape(Point(stop.lng, stop.lat), srid=4326)
             )
             db.add(stop_obj)
-            db.commit()
-            db.refresh(stop_obj)
-            # ربط المحطة بالخط عبر RouteStop
-            route_stop = models.RouteStop(route_id=db_route.id, stop_id=stop_obj.id)
-            db.add(route_stop)
             stop_objs.append(stop_obj)
-        db.commit()
+        db.flush()
+        # ربط المحطات بالخط عبر RouteStop بترتيبها في الطلب
+        db.add_all([
+            models.RouteStop(route_id=db_route.id, stop_id=stop_obj.id, stop_order=order)
+            for order, stop_obj in enumerate(stop_objs, start=1)
+        ])
 
     # إضافة المسارات
     path_objs = []
@@ -70,7 +70,7 @@ def create_route(route: RouteCreate, db: Session = Depends(get_db)):
             )
             db.add(path_obj)
             path_objs.append(path_obj)
-        db.commit()
+    db.commit()
 
     # إعادة تحميل الخط مع العلاقات
     db.refresh(db_route)
@@ -89,6 +89,7 @@ def create_route(route: RouteCreate, db: Session = Depends(get_db)):
     )
     cache_set(f"routes:{db_route.id}", route_data.model_dump(), ttl=300)
     redis_client.delete("routes:all")
+    publish_network_change(route_ids=[db_route.id])
     return route_data
 
 @router.get("/{route_id}/stops", response_model=List[StopRead])
@@ -139,6 +140,7 @@ def optimize_route(route_id: int, db: Session = Depends(get_db), current_user=De
     
     db.commit()
     redis_client.delete(f"routes:{route_id}")
+    publish_network_change(route_ids=[route_id])
     
     return {
         "message": "Route optimized successfully",
@@ -223,6 +225,7 @@ def update_route(route_id: int, route: RouteUpdate, db: Session = Depends(get_db
     )
     cache_set(f"routes:{db_route.id}", route_data.model_dump(), ttl=300)
     redis_client.delete("routes:all")
+    publish_network_change(route_ids=[db_route.id])
     return route_data
 
 @router.delete("/{route_id}")
@@ -237,4 +240,5 @@ def delete_route(route_id: int, db: Session = Depends(get_db), current_user=Depe
     db.commit()
     redis_client.delete(f"routes:{route_id}")
     redis_client.delete("routes:all")
+    publish_network_change(route_ids=[route_id])
     return {"ok": True} 
\ No newline at end of file
@@ -1,11 +1,25 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from src.schemas.search import SearchRouteRequest, SearchRouteResponse
-from src.services.route_search import search_routes
+import json
+import logging
+from typing import List, Optional
+from src.schemas.search import (
+    SearchRouteRequest, SearchRouteResponse, IsochroneResponse, MatrixRequest, MatrixResponse
+)
+from src.services.route_search import search_routes, search_routes_batch, search_routes_stream
+from src.services.search_log import log_search
+from src.services.isochrone import compute_isochrone
+from src.services.travel_matrix import compute_matrix
+from src.services.transit_network import get_network
+from src.services import search_metrics
+from src.config.routing_config import (
+    MAX_BATCH_REQUESTS, SEARCH_CACHE_GEOHASH_PRECISION, MAX_ISOCHRONE_BANDS, MAX_ISOCHRONE_MINUTES,
+    MAX_MATRIX_POINTS, MAX_MATRIX_CELLS, MATRIX_MAX_SECONDS
+)
 from src.models.models import SearchLog
 from config.database import SessionLocal
-from src.routers.auth import get_current_admin
+from src.routers.auth import get_current_admin, get_optional_user_id
 
 router = APIRouter(prefix="/search-route", tags=["SearchRoute"])
 
@@ -17,8 +31,74 @@ def get_db():
         db.close()
 
 @router.post("/", response_model=SearchRouteResponse)
-def search_route(request: SearchRouteRequest):
-    return search_routes(request)
+def search_route(request: SearchRouteRequest, user_id: Optional[int] = Depends(get_optional_user_id)):
+    response = search_routes(request)
+    log_search(request, response, user_id)
+    return response
+
+@router.post("/stream")
+def search_route_stream(request: SearchRouteRequest, user_id: Optional[int] = Depends(get_optional_user_id)):
+    """نفس البحث مع بث النتائج كسطور NDJSON: أول نتيجة (دون ازدحام) فور إيجادها، ثم تحسينات مع وصول
+    أزمنة الازدحام، وآخر سطر phase=final هو نتيجة /search-route/. كل سطر: {"phase": ..., "routes": [...]}"""
+    def lines():
+        try:
+            for phase, response in search_routes_stream(request):
+                if phase == "final":
+                    log_search(request, response, user_id)
+                yield json.dumps({"phase": phase, **response.model_dump()}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # الحالة أرسلت مع السطر الأول، فالخطأ يبث كسطر أخير
+            logging.error(f"Streaming search failed: {e}")
+            yield json.dumps({"phase": "error", "detail": "تعذر إكمال البحث"}, ensure_ascii=False) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/batch", response_model=List[SearchRouteResponse])
+def search_route_batch(requests: List[SearchRouteRequest], user_id: Optional[int] = Depends(get_optional_user_id)):
+    """تنفيذ عدة طلبات بحث دفعة واحدة، والنتائج بنفس ترتيب الطلبات"""
+    if len(requests) > MAX_BATCH_REQUESTS:
+        raise HTTPException(status_code=413, detail=f"الحد الأقصى لعدد الطلبات في الدفعة هو {MAX_BATCH_REQUESTS}")
+    responses = search_routes_batch(requests)
+    for request, response in zip(requests, responses):
+        log_search(request, response, user_id)
+    return responses
+
+@router.get("/isochrone", response_model=IsochroneResponse)
+def get_isochrone(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    minutes: str = Query("15,30,45", description="الفترات الزمنية بالدقائق مفصولة بفواصل")
+):
+    """المواقف والمنطقة التي يمكن الوصول إليها من نقطة خلال كل فترة زمنية (مكرو + مشي)"""
+    try:
+        bands = [int(m) for m in minutes.split(",") if m.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="صيغة الدقائق غير صحيحة، مثال: 15,30,45")
+    if not bands or len(bands) > MAX_ISOCHRONE_BANDS or not all(0 < m <= MAX_ISOCHRONE_MINUTES for m in bands):
+        raise HTTPException(
+            status_code=400,
+            detail=f"حتى {MAX_ISOCHRONE_BANDS} فترات، كل منها بين 1 و {MAX_ISOCHRONE_MINUTES} دقيقة"
+        )
+    return compute_isochrone(get_network(), lat, lng, bands)
+
+@router.post("/matrix", response_model=MatrixResponse)
+def get_travel_matrix(request: MatrixRequest):
+    """مصفوفة أزمنة الرحلة (مكرو + مشي) بين عدة نقاط بداية وعدة وجهات"""
+    n, m = len(request.origins), len(request.destinations)
+    if not n or not m:
+        raise HTTPException(status_code=400, detail="يجب تحديد نقطة بداية ووجهة واحدة على الأقل")
+    if max(n, m) > MAX_MATRIX_POINTS or n * m > MAX_MATRIX_CELLS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"الحد الأقصى {MAX_MATRIX_POINTS} نقطة في كل جهة و {MAX_MATRIX_CELLS} خلية في المصفوفة"
+        )
+    max_seconds = min(request.max_minutes * 60, MATRIX_MAX_SECONDS) if request.max_minutes else MATRIX_MAX_SECONDS
+    durations = compute_matrix(
+        get_network(),
+        [(p.lat, p.lng) for p in request.origins],
+        [(p.lat, p.lng) for p in request.destinations],
+        max_seconds=max_seconds
+    )
+    return {"origins": n, "destinations": m, "durations": durations}
 
 @router.get("/logs", response_model=List[dict])
 def get_search_logs(
@@ -40,4 +120,24 @@ def get_search_logs(
             "timestamp": log.timestamp
         }
         for log in logs
-    ] 
\ No newline at end of file
+    ] 
+
+@router.get("/metrics")
+def get_search_metrics(current_admin = Depends(get_current_admin)):
+    """عدادات أداء البحث ونسبة إصابة الكاش (للمديرين فقط)"""
+    metrics = search_metrics.get_metrics()
+    hits = metrics.get("cache_hits", 0)
+    lookups = hits + metrics.get("cache_misses", 0)
+    ranked = metrics.get("ranked_searches", 0)
+    return {
+        "counters": metrics,
+        "cache_hit_ratio": round(hits / lookups, 4) if lookups else None,
+        "routes_pruned_per_search": round(metrics.get("routes_pruned", 0) / ranked, 2) if ranked else None,
+        "cache_geohash_precision": SEARCH_CACHE_GEOHASH_PRECISION
+    }
+
+@router.delete("/metrics")
+def reset_search_metrics(current_admin = Depends(get_current_admin)):
+    """تصفير العدادات (مثلاً بعد تغيير دقة خلايا الكاش)"""
+    search_metrics.reset_metrics()
+    return {"ok": True}
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List
-from src.schemas.stop import StopCreate, StopRead, StopUpdate
+from typing import List, Optional
+from src.schemas.stop import NameSuggestion, NearbyStop, StopCreate, StopRead, StopUpdate
 from src.models import models
 from config.database import SessionLocal
 from src.routers.auth import get_current_user
 from src.services.cache_service import cache_get, cache_set, redis_client
+from src.services.network_updates import publish_network_change
+from src.services.nearby_stops import find_nearby
+from src.services.stop_geohash_index import get_stop_geohash_index
+from src.services.name_suggest import get_name_suggest_index
+from src.config.routing_config import NEARBY_DEFAULT_LIMIT, NEARBY_MAX_LIMIT, SUGGEST_DEFAULT_LIMIT, SUGGEST_MAX_LIMIT
 from sqlalchemy.exc import IntegrityError
 
 router = APIRouter(prefix="/stops", tags=["Stops"])
@@ -24,7 +29,7 @@ def create_stop(stop: StopCreate, db: Session = Depends(get_db)):
     existing = db.query(models.Stop).filter(models.Stop.name == stop.name).first()
     if existing:
         raise HTTPException(status_code=400, detail="اسم المحطة مستخدم مسبقًا")
-    db_stop = models.Stop(**stop.dict())
+    db_stop = models.Stop(**stop.dict(), geom=f'POINT({stop.lng} {stop.lat})')
     db.add(db_stop)
     try:
         db.commit()
@@ -34,63 +39,85 @@ def create_stop(stop: StopCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="خطأ في حفظ المحطة: تأكد من صحة البيانات المدخلة وعدم تكرار اسم المحطة")
     redis_client.delete("stops:all")
     redis_client.delete(f"stops:{db_stop.id}")
+    publish_network_change(stop_ids=[db_stop.id])
     return db_stop
 
 @router.post("/bulk", response_model=List[StopRead])
 def create_stops_bulk(stops: List[StopCreate], db: Session = Depends(get_db), current_user=Depends(get_current_user)):
-    """إنشاء عدة محطات دفعة واحدة"""
+    """إنشاء عدة محطات دفعة واحدة (للملفات الكبيرة استخدم /import/network)"""
+    # الأسماء الموجودة باستعلام واحد بدل استعلام لكل محطة
+    existing = {name for (name,) in db.query(models.Stop.name).filter(models.Stop.name.in_({s.name for s in stops}))}
     created_stops = []
     for stop_data in stops:
-        if db.query(models.Stop).filter(models.Stop.name == stop_data.name).first():
+        if stop_data.name in existing:
             continue  # Skip if stop already exists
-        db_stop = models.Stop(
+        existing.add(stop_data.name)
+        created_stops.append(models.Stop(
             name=stop_data.name,
             lat=stop_data.lat,
             lng=stop_data.lng,
             geom=f'POINT({stop_data.lng} {stop_data.lat})'
-        )
-        db.add(db_stop)
-        created_stops.append(db_stop)
-    
+        ))
+    db.add_all(created_stops)
+    db.flush()
+    # قبل commit حتى لا يعاد تحميل كل محطة منفردة
+    result = [StopRead.model_validate(stop, from_attributes=True) for stop in created_stops]
     db.commit()
-    for stop in created_stops:
-        db.refresh(stop)
-    
+
     redis_client.delete("stops:all")
-    return created_stops
+    publish_network_change(stop_ids=[stop.id for stop in result])
+    return result
 
-@router.get("/nearby", response_model=List[StopRead])
+@router.get("/nearby", response_model=List[NearbyStop])
 def get_nearby_stops(
-    lat: float = Query(..., description="خط العرض"),
-    lng: float = Query(..., description="خط الطول"),
-    radius: float = Query(1.0, description="نصف القطر بالكيلومترات"),
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90, description="خط العرض"),
+    lng: float = Query(..., ge=-180, le=180, description="خط الطول"),
+    radius: float = Query(1.0, gt=0, le=50, description="نصف القطر بالكيلومترات"),
+    limit: int = Query(NEARBY_DEFAULT_LIMIT, ge=1, le=NEARBY_MAX_LIMIT, description="عدد المواقف في الصفحة"),
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية من ترويسة X-Next-Cursor"),
     db: Session = Depends(get_db)
 ):
-    """البحث عن المحطات القريبة من نقطة معينة"""
-    # Simple distance calculation using Haversine formula
-    # In a real application, you'd use PostGIS ST_DWithin for better performance
-    stops = db.query(models.Stop).all()
-    nearby_stops = []
-    
-    for stop in stops:
-        # Calculate distance using Haversine formula
-        import math
-        R = 6371  # Earth's radius in kilometers
-        
-        lat1, lon1 = math.radians(lat), math.radians(lng)
-        lat2, lon2 = math.radians(stop.lat), math.radians(stop.lng)
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        distance = R * c
-        
-        if distance <= radius:
-            nearby_stops.append(stop)
-    
-    return nearby_stops
+    """المحطات القريبة من نقطة مرتبة من الأقرب مع المسافة بالمتر. إذا بقيت محطات بعد الصفحة
+    يعاد مؤشرها في ترويسة X-Next-Cursor"""
+    try:
+        stops, next_cursor = find_nearby(db, lat, lng, radius * 1000, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return stops
+
+@router.get("/nearest", response_model=List[NearbyStop])
+def get_nearest_stops(
+    lat: float = Query(..., ge=-90, le=90, description="خط العرض"),
+    lng: float = Query(..., ge=-180, le=180, description="خط الطول"),
+    k: int = Query(1, ge=1, le=50, description="عدد المواقف")
+):
+    """أقرب k محطات إلى نقطة مهما بعدت، من فهرس المواقف في الذاكرة"""
+    return get_stop_geohash_index().nearest(lat, lng, k)
+
+@router.get("/bbox", response_model=List[StopRead])
+def get_stops_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    limit: int = Query(NEARBY_MAX_LIMIT, ge=1, le=5000, description="أقصى عدد للمحطات")
+):
+    """المحطات داخل مربع الخريطة المعروض، من فهرس المواقف في الذاكرة"""
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="حدود المربع غير صحيحة")
+    return get_stop_geohash_index().bbox(min_lat, min_lng, max_lat, max_lng, limit)
+
+@router.get("/suggest", response_model=List[NameSuggestion])
+def suggest_names(
+    q: str = Query(..., min_length=1, max_length=100, description="ما كتبه المستخدم من الاسم"),
+    limit: int = Query(SUGGEST_DEFAULT_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+    kind: Optional[str] = Query(None, pattern="^(stop|route)$", description="المحطات أو الخطوط فقط")
+):
+    """إكمال أسماء المحطات والخطوط أثناء الكتابة، دون تمييز الهمزات والتاء المربوطة والتشكيل"""
+    return get_name_suggest_index().suggest(q, limit, kind)
 
 @router.get("/", response_model=list[StopRead])
 def read_stops(db: Session = Depends(get_db)):
@@ -124,10 +151,13 @@ def update_stop(stop_id: int, stop: StopUpdate, db: Session = Depends(get_db), c
     for var, value in vars(stop).items():
         if value is not None:
             setattr(db_stop, var, value)
+    if stop.lat is not None or stop.lng is not None:
+        db_stop.geom = f'POINT({db_stop.lng} {db_stop.lat})'
     db.commit()
     db.refresh(db_stop)
     redis_client.delete("stops:all")
     redis_client.delete(f"stops:{stop_id}")
+    publish_network_change(stop_ids=[stop_id])
     return db_stop
 
 @router.delete("/{stop_id}")
@@ -139,4 +169,5 @@ def delete_stop(stop_id: int, db: Session = Depends(get_db), current_user=Depend
     db.commit()
     redis_client.delete("stops:all")
     redis_client.delete(f"stops:{stop_id}")
+    publish_network_change(stop_ids=[stop_id])
     return {"ok": True} 
\ No newline at end of file
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import List, Optional
 
 class SearchRouteRequest(BaseModel):
@@ -6,7 +7,8 @@ class SearchRouteRequest(BaseModel):
     start_lng: float
     end_lat: float
     end_lng: float
-    filter_type: Optional[str] = "fastest"  # fastest, cheapest, least_transfers
+    filter_type: Optional[str] = "fastest"  # fastest, cheapest, least_transfers, pareto (كل المفاضلات)
+    departure_time: Optional[datetime] = None  # وقت الانطلاق (الافتراضي الآن)، لاستبعاد الخطوط المتوقفة
 
 class RouteSegment(BaseModel):
     type: str  # walk or makro
@@ -26,4 +28,32 @@ class SuggestedRoute(BaseModel):
     total_estimated_cost: int
 
 class SearchRouteResponse(BaseModel):
-    routes: List[SuggestedRoute] 
\ No newline at end of file
+    routes: List[SuggestedRoute]
+
+class IsochroneStop(BaseModel):
+    stop_id: int
+    name: str
+    lat: float
+    lng: float
+    arrival_seconds: int
+
+class IsochroneResponse(BaseModel):
+    origin: dict
+    minutes: List[int]
+    stops: List[IsochroneStop]
+    geojson: dict  # FeatureCollection: مضلع MultiPolygon لكل فترة زمنية
+
+class MatrixPoint(BaseModel):
+    lat: float
+    lng: float
+
+class MatrixRequest(BaseModel):
+    origins: List[MatrixPoint]
+    destinations: List[MatrixPoint]
+    max_minutes: Optional[int] = Field(None, ge=1)  # الأزمنة الأطول تعاد null
+
+class MatrixResponse(BaseModel):
+    # durations[i][j]: زمن الرحلة بالثواني من origins[i] إلى destinations[j]، أو null إذا تعذر الوصول
+    origins: int
+    destinations: int
+    durations: List[List[Optional[int]]]
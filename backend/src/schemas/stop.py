@@ -1,5 +1,5 @@
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import Literal, Optional
 
 class StopBase(BaseModel):
     name: str
@@ -35,4 +35,16 @@ class StopUpdate(StopBase):
 class StopRead(StopBase):
     id: int
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+
+class NearbyStop(StopRead):
+    distance_meters: float
+
+
+class NameSuggestion(BaseModel):
+    kind: Literal["stop", "route"]
+    id: int
+    name: str
+    lat: Optional[float] = None
+    lng: Optional[float] = None
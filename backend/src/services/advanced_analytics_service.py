@@ -15,6 +15,7 @@ import logging
 
 from models.models import User, Route, RoutePath, SearchLog, Complaint, LocationShare, MakroLocation
 from src.config.dashboard_config import get_analytics_config
+from src.services.geo_math import bounding_box, haversine_one_to_many
 
 class AdvancedAnalyticsService:
     """خدمة التحليلات المتقدمة"""
@@ -889,23 +890,27 @@ class AdvancedAnalyticsService:
     
     def _find_nearby_routes(self, lat: float, lng: float, radius_km: float = 2) -> List[Route]:
         """البحث عن خطوط قريبة من نقطة معينة"""
-        # حساب حدود البحث (تقريب بسيط)
-        lat_delta = radius_km / 111.0  # تقريباً 111 كم لكل درجة عرض
-        lng_delta = radius_km / (111.0 * math.cos(math.radians(lat)))
+        radius_m = radius_km * 1000
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_m)
         
-        # البحث في RoutePath بدلاً من Route مباشرة
-        nearby_routes = self.db.query(Route).join(
-            RoutePath, Route.id == RoutePath.route_id
-        ).filter(
+        # تصفية أولية لنقاط المسار داخل المستطيل، ثم حساب المسافة الفعلية دفعة واحدة
+        points = self.db.query(RoutePath.route_id, RoutePath.lat, RoutePath.lng).filter(
             and_(
-                RoutePath.lat >= lat - lat_delta,
-                RoutePath.lat <= lat + lat_delta,
-                RoutePath.lng >= lng - lng_delta,
-                RoutePath.lng <= lng + lng_delta
+                RoutePath.lat >= min_lat,
+                RoutePath.lat <= max_lat,
+                RoutePath.lng >= min_lng,
+                RoutePath.lng <= max_lng
             )
-        ).distinct().all()
+        ).all()
+        if not points:
+            return []
+        
+        distances = haversine_one_to_many(lat, lng, [p.lat for p in points], [p.lng for p in points])
+        route_ids = {p.route_id for p, meters in zip(points, distances.tolist()) if meters <= radius_m}
+        if not route_ids:
+            return []
         
-        return nearby_routes
+        return self.db.query(Route).filter(Route.id.in_(route_ids)).all()
     
     def _generate_system_recommendations(self, db_status: str, error_rate: float) -> List[str]:
         """توليد توصيات النظام"""
@@ -15,6 +15,20 @@ def cache_get(key):
             return value
     return None
 
+def cache_get_many(keys):
+    if not keys:
+        return []
+    values = []
+    for value in redis_client.mget(keys):
+        if value is None:
+            values.append(None)
+            continue
+        try:
+            values.append(json.loads(value))
+        except Exception:
+            values.append(value)
+    return values
+
 def cache_set(key, value, ttl=300):
     try:
         redis_client.set(key, json.dumps(value), ex=ttl)
@@ -25,4 +39,36 @@ def delete_pattern(pattern):
     for key in redis_client.scan_iter(match=pattern):
         redis_client.delete(key)
 
-__all__ = ["cache_get", "cache_set", "redis_client", "delete_pattern"] 
\ No newline at end of file
+# إضافة مفتاح إلى وسم مع تمديد صلاحية الوسم فقط (لا تقصيرها)، بعملية واحدة ذرية.
+# يعمل على كل نسخ Redis بخلاف EXPIRE ... GT (Redis 7+، ولا يضبط صلاحية مجموعة جديدة بلا صلاحية)
+_TAG_SCRIPT = redis_client.register_script("""
+redis.call('SADD', KEYS[1], ARGV[1])
+if redis.call('TTL', KEYS[1]) < tonumber(ARGV[2]) then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+""")
+
+def cache_tag(key, tags, ttl=300):
+    """ربط مفتاح بوسوم (مجموعات Redis) لإبطاله لاحقاً دون المرور على كل المفاتيح.
+    صلاحية الوسم تبقى الأطول بين مفاتيحه، فلا يضيع مفتاح طويل الصلاحية بانتهاء وسم قصّره مفتاح أقصر"""
+    try:
+        pipe = redis_client.pipeline()
+        for tag in tags:
+            _TAG_SCRIPT(keys=[tag], args=[key, ttl], client=pipe)
+        pipe.execute()
+    except Exception:
+        pass
+
+def invalidate_tags(tags):
+    """حذف كل المفاتيح المرتبطة بأي من الوسوم، مع الوسوم نفسها؛ تعيد عدد المفاتيح"""
+    tags = list(tags)
+    if not tags:
+        return 0
+    try:
+        keys = redis_client.sunion(tags)
+        redis_client.delete(*keys, *tags)
+        return len(keys)
+    except Exception:
+        return 0
+
+__all__ = ["cache_get", "cache_get_many", "cache_set", "redis_client", "delete_pattern", "cache_tag", "invalidate_tags"] 
\ No newline at end of file
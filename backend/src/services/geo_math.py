@@ -0,0 +1,136 @@
+"""
+Geo Math
+دوال مسافات جغرافية موحّدة تعمل على مصفوفات NumPy دفعة واحدة
+(نقطة مع نقطة، نقطة مع عدة نقاط، وعدة نقاط مع عدة نقاط) بدل استدعاء geopy لكل زوج
+"""
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+
+def as_coords(values) -> np.ndarray:
+    """تحويل قائمة إحداثيات إلى مصفوفة float64 دون نسخ إن كانت كذلك أصلاً"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """مسافة الدائرة العظمى بالمتر، تقبل أعداداً أو مصفوفات قابلة للبث (broadcasting)"""
+    lat1, lng1, lat2, lng2 = (np.radians(as_coords(v)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_one_to_many(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """المسافات من نقطة واحدة إلى كل النقاط: مصفوفة بطول len(lats)"""
+    return haversine(lat, lng, lats, lngs)
+
+
+def haversine_many_to_many(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    """مصفوفة مسافات (n, m) بين n نقطة و m نقطة"""
+    lats1, lngs1 = as_coords(lats1)[:, None], as_coords(lngs1)[:, None]
+    return haversine(lats1, lngs1, as_coords(lats2)[None, :], as_coords(lngs2)[None, :])
+
+
+def equirectangular(lat1, lng1, lat2, lng2):
+    """تقريب مستوٍ أسرع من haversine، دقيق لمسافات المشي داخل المدينة (خطأ أقل من 0.1% تحت 10 كم)"""
+    lat1, lng1, lat2, lng2 = (np.radians(as_coords(v)) for v in (lat1, lng1, lat2, lng2))
+    x = (lng2 - lng1) * np.cos((lat1 + lat2) / 2)
+    y = lat2 - lat1
+    return EARTH_RADIUS_M * np.sqrt(x * x + y * y)
+
+
+def equirectangular_one_to_many(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    return equirectangular(lat, lng, lats, lngs)
+
+
+def equirectangular_many_to_many(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    lats1, lngs1 = as_coords(lats1)[:, None], as_coords(lngs1)[:, None]
+    return equirectangular(lats1, lngs1, as_coords(lats2)[None, :], as_coords(lngs2)[None, :])
+
+
+def consecutive_distances(lats, lngs) -> np.ndarray:
+    """المسافات بين كل نقطتين متتاليتين في مسار (طولها n-1)"""
+    lats, lngs = as_coords(lats), as_coords(lngs)
+    return haversine(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+
+
+def project_onto_path(lats, lngs, path_lats, path_lngs, chunk: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+    """إسقاط نقاط على خط متعدد الأجزاء (مسار): (المسافة على المسار من بدايته، البعد العمودي عنه) بالمتر
+
+    الإسقاط يتم في مستوٍ محلي (equirectangular) حول المسار، وهو دقيق داخل المدينة.
+    """
+    lats, lngs = np.atleast_1d(as_coords(lats)), np.atleast_1d(as_coords(lngs))
+    path_lats, path_lngs = as_coords(path_lats), as_coords(path_lngs)
+    scale_x = np.cos(np.radians(path_lats.mean())) * METERS_PER_DEG_LAT
+    px, py = path_lngs * scale_x, path_lats * METERS_PER_DEG_LAT
+    if len(px) < 2:
+        # مسار من نقطة واحدة: البعد هو المسافة إليها
+        offsets = haversine(lats, lngs, path_lats[0], path_lngs[0]) if len(px) else np.full(len(lats), np.inf)
+        return np.zeros(len(lats)), offsets
+    ax, ay = px[:-1], py[:-1]
+    dx, dy = px[1:] - ax, py[1:] - ay
+    length_sq = np.maximum(dx * dx + dy * dy, 1e-12)
+    cum = np.concatenate(([0.0], np.cumsum(consecutive_distances(path_lats, path_lngs))))
+    along = np.empty(len(lats))
+    offsets = np.empty(len(lats))
+    for start in range(0, len(lats), chunk):
+        x = (lngs[start:start + chunk] * scale_x)[:, None]
+        y = (lats[start:start + chunk] * METERS_PER_DEG_LAT)[:, None]
+        t = np.clip(((x - ax) * dx + (y - ay) * dy) / length_sq, 0.0, 1.0)
+        dist = np.hypot(x - (ax + t * dx), y - (ay + t * dy))
+        seg = dist.argmin(axis=1)
+        rows = np.arange(len(seg))
+        along[start:start + chunk] = cum[seg] + t[rows, seg] * (cum[seg + 1] - cum[seg])
+        offsets[start:start + chunk] = dist[rows, seg]
+    return along, offsets
+
+
+def bounding_box(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """مستطيل (min_lat, min_lng, max_lat, max_lng) يحيط بدائرة نصف قطرها radius_m"""
+    dlat = radius_m / METERS_PER_DEG_LAT
+    dlng = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+# ==================== GEOHASH ====================
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 7) -> str:
+    """ترميز geohash: طول الرمز يحدد حجم الخلية (الدقة 7 ≈ 153×153 متر)"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_range[0] = mid
+            else:
+                bits <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
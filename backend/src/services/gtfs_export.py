@@ -0,0 +1,222 @@
+"""
+GTFS Export
+تصدير الشبكة كملف GTFS (zip) للجهات الخارجية: agency، stops، routes، calendar، trips، stop_times،
+frequencies، shapes. المكروهات بلا جداول مواعيد، فلكل خط رحلة نموذجية لكل اتجاه (عكس تسلسل المواقف
+مع BIDIRECTIONAL_ROUTES) أزمنتها من المسافة بسرعة المكرو، وتتكرر كل GTFS_HEADWAY_SECONDS خلال ساعات عمله.
+
+الكتابة متدفقة: كل جدول يقرأ مرتباً على دفعات (yield_per) ويكتب مباشرة في ملف داخل الأرشيف، ولا يبقى
+في الذاكرة إلا مواقف أو مسار خط واحد. الأرشيف حتمي (تواريخ ثابتة للملفات)، فبصمته (ETag) لا تتغير ما لم
+تتغير البيانات. يعاد التوليد عند تغير رقم آخر تعديل منشور (network_updates) أو بعد NETWORK_TTL_SECONDS
+لالتقاط التعديلات المباشرة على قاعدة البيانات، مثل الشبكة المحملة نفسها.
+"""
+
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.models import models
+from src.services.geo_math import haversine
+from src.services.network_updates import current_seq
+from src.services.transit_network import MINUTES_PER_DAY, parse_operating_hours
+from src.config.routing_config import (
+    BIDIRECTIONAL_ROUTES, GTFS_AGENCY_NAME, GTFS_AGENCY_TIMEZONE, GTFS_AGENCY_URL, GTFS_EXPORT_DIR,
+    GTFS_HEADWAY_SECONDS, MAKRO_SPEED_MPS, NETWORK_TTL_SECONDS
+)
+
+AGENCY_ID = "1"
+SERVICE_ID = "daily"
+# نوع الخط في routes.txt: حافلة
+ROUTE_TYPE_BUS = 3
+# تاريخ ثابت لملفات الأرشيف حتى تكون بصمته حتمية
+ZIP_DATE = (1980, 1, 1, 0, 0, 0)
+# الملفات السابقة تبقى هذه المدة لطلبات بدأت بتنزيلها
+KEEP_OLD_FEEDS_SECONDS = 600
+
+_lock = threading.Lock()
+
+
+def _time(seconds: float) -> str:
+    """HH:MM:SS (الساعات قد تتجاوز 24 في GTFS)"""
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+@contextmanager
+def _table(archive: zipfile.ZipFile, name: str, header):
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    with archive.open(info, "w", force_zip64=True) as raw:
+        stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        writer = csv.writer(stream)
+        writer.writerow(header)
+        yield writer
+        stream.detach()
+
+
+def _directions() -> tuple:
+    """direction_id للرحلات: الذهاب، والإياب (تسلسل معكوس) إذا كانت الخطوط ثنائية الاتجاه"""
+    return (0, 1) if BIDIRECTIONAL_ROUTES else (0,)
+
+
+def write_feed(db: Session, path: str, year: Optional[int] = None) -> dict:
+    """كتابة الأرشيف إلى path؛ تعيد عدد الصفوف في كل ملف. ValueError إذا لم يضبط GTFS_AGENCY_URL،
+    لأن agency_url مطلوب والملف دونه مرفوض من أدوات التحقق"""
+    if not GTFS_AGENCY_URL:
+        raise ValueError("ROUTING_GTFS_AGENCY_URL is not set: agency_url is required in GTFS agency.txt")
+    year = year or datetime.now().year
+    counts = {}
+    # الخطوط التي لها موقفان على الأقل (رحلة صالحة) والتي لها مسار؛ مجموعات معرفات صغيرة
+    routed = {route_id for (route_id,) in db.query(models.RouteStop.route_id).join(models.Stop).group_by(
+        models.RouteStop.route_id).having(func.count() >= 2)}
+    shaped = {route_id for (route_id,) in db.query(models.RoutePath.route_id).distinct()}
+    service_hours = {}
+
+    with zipfile.ZipFile(path, "w") as archive:
+        with _table(archive, "agency.txt", ["agency_id", "agency_name", "agency_url", "agency_timezone"]) as out:
+            out.writerow([AGENCY_ID, GTFS_AGENCY_NAME, GTFS_AGENCY_URL, GTFS_AGENCY_TIMEZONE])
+
+        with _table(archive, "stops.txt", ["stop_id", "stop_name", "stop_lat", "stop_lon"]) as out:
+            rows = db.query(models.Stop.id, models.Stop.name, models.Stop.lat, models.Stop.lng).order_by(
+                models.Stop.id).yield_per(10000)
+            counts["stops"] = 0
+            for row in rows:
+                out.writerow(row)
+                counts["stops"] += 1
+
+        with _table(archive, "routes.txt", ["route_id", "agency_id", "route_long_name", "route_desc",
+                                            "route_type"]) as out:
+            counts["routes"] = 0
+            for route_id, name, description, hours in db.query(
+                    models.Route.id, models.Route.name, models.Route.description, models.Route.operating_hours
+            ).order_by(models.Route.id).yield_per(10000):
+                out.writerow([route_id, AGENCY_ID, name, description, ROUTE_TYPE_BUS])
+                counts["routes"] += 1
+                if route_id in routed:
+                    service_hours[route_id] = parse_operating_hours(hours) or ((0, MINUTES_PER_DAY),)
+
+        with _table(archive, "calendar.txt", ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday",
+                                              "saturday", "sunday", "start_date", "end_date"]) as out:
+            out.writerow([SERVICE_ID] + [1] * 7 + [f"{year}0101", f"{year + 1}1231"])
+
+        trips = [(route_id, direction) for route_id in sorted(service_hours) for direction in _directions()]
+        with _table(archive, "trips.txt", ["route_id", "service_id", "trip_id", "direction_id", "shape_id"]) as out:
+            for route_id, direction in trips:
+                trip_id = f"{route_id}_{direction}"
+                out.writerow([route_id, SERVICE_ID, trip_id, direction, trip_id if route_id in shaped else ""])
+        counts["trips"] = len(trips)
+
+        with _table(archive, "stop_times.txt", ["trip_id", "arrival_time", "departure_time", "stop_id",
+                                                "stop_sequence"]) as out:
+            counts["stop_times"] = 0
+            rows = db.query(models.RouteStop.route_id, models.Stop.id, models.Stop.lat, models.Stop.lng).join(
+                models.Stop).order_by(models.RouteStop.route_id, models.RouteStop.stop_order.is_(None),
+                                      models.RouteStop.stop_order, models.RouteStop.id).yield_per(10000)
+            for route_id, stops in groupby(rows, key=lambda row: row[0]):
+                if route_id not in service_hours:
+                    continue
+                stops = list(stops)
+                for direction in _directions():
+                    seconds, previous = 0.0, None
+                    for sequence, (_, stop_id, lat, lng) in enumerate(stops[::-1] if direction else stops, start=1):
+                        if previous is not None:
+                            seconds += haversine(previous[0], previous[1], lat, lng) / MAKRO_SPEED_MPS
+                        previous = (lat, lng)
+                        out.writerow([f"{route_id}_{direction}", _time(seconds), _time(seconds), stop_id, sequence])
+                        counts["stop_times"] += 1
+
+        with _table(archive, "frequencies.txt", ["trip_id", "start_time", "end_time", "headway_secs",
+                                                 "exact_times"]) as out:
+            for route_id, direction in trips:
+                for start, end in service_hours[route_id]:
+                    out.writerow([f"{route_id}_{direction}", _time(start * 60), _time(end * 60),
+                                  GTFS_HEADWAY_SECONDS, 0])
+
+        with _table(archive, "shapes.txt", ["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"]) as out:
+            counts["shapes"] = 0
+            rows = db.query(models.RoutePath.route_id, models.RoutePath.lat, models.RoutePath.lng).order_by(
+                models.RoutePath.route_id, models.RoutePath.point_order.is_(None), models.RoutePath.point_order,
+                models.RoutePath.id).yield_per(10000)
+            for route_id, points in groupby(rows, key=lambda row: row[0]):
+                if route_id not in service_hours:
+                    continue
+                points = list(points)
+                for direction in _directions():
+                    for sequence, (_, lat, lng) in enumerate(points[::-1] if direction else points, start=1):
+                        out.writerow([f"{route_id}_{direction}", lat, lng, sequence])
+                        counts["shapes"] += 1
+    return counts
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_meta(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, "feed.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cached_feed(directory: str = GTFS_EXPORT_DIR) -> Optional[dict]:
+    """بيانات الملف المصدّر إذا كان ما زال مطابقاً للشبكة، وإلا None"""
+    meta = _read_meta(directory)
+    if (meta is None or meta["seq"] != current_seq() or time.time() - meta["generated_at"] >= NETWORK_TTL_SECONDS
+            or not os.path.exists(meta["path"])):
+        return None
+    return meta
+
+
+def export_feed(db_factory=None, directory: str = GTFS_EXPORT_DIR) -> dict:
+    """توليد الملف في directory باسم بصمته وتحديث feed.json؛ تعيد {seq، etag، path، generated_at، counts}"""
+    if db_factory is None:
+        from config.database import SessionLocal as db_factory
+    # الرقم قبل القراءة: تعديل أثناء التوليد يجعل الملف قديماً فيعاد توليده في الطلب التالي
+    seq = current_seq()
+    os.makedirs(directory, exist_ok=True)
+    partial = os.path.join(directory, f".feed-{os.getpid()}-{threading.get_ident()}.zip")
+    db = db_factory()
+    try:
+        counts = write_feed(db, partial)
+    finally:
+        db.close()
+    etag = _sha256(partial)[:32]
+    path = os.path.join(directory, f"feed-{etag}.zip")
+    os.replace(partial, path)
+
+    meta = {"seq": seq, "etag": etag, "path": path, "generated_at": time.time(), "counts": counts}
+    with open(partial + ".json", "w") as f:
+        json.dump(meta, f)
+    os.replace(partial + ".json", os.path.join(directory, "feed.json"))
+
+    for old in glob.glob(os.path.join(directory, "feed-*.zip")):
+        if old != path and time.time() - os.path.getmtime(old) > KEEP_OLD_FEEDS_SECONDS:
+            os.remove(old)
+    return meta
+
+
+def get_feed(db_factory=None, directory: str = GTFS_EXPORT_DIR) -> dict:
+    """الملف المصدّر الحالي، مولداً عند الحاجة (مرة واحدة في العملية مهما تزامنت الطلبات)"""
+    meta = cached_feed(directory)
+    if meta is not None:
+        return meta
+    with _lock:
+        return cached_feed(directory) or export_feed(db_factory, directory)
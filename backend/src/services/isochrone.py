@@ -0,0 +1,90 @@
+"""
+Isochrone
+المنطقة التي يمكن الوصول إليها من نقطة خلال عدة دقائق (مكرو + مشي):
+بحث RAPTOR من نقطة إلى كل المواقف، ثم اتحاد دوائر المشي حول كل موقف بالزمن المتبقي
+"""
+
+from typing import Dict, List
+
+import numpy as np
+from shapely.geometry import Point, mapping
+from shapely.ops import unary_union
+
+from src.services.transit_network import TransitNetwork
+from src.services.raptor import earliest_arrivals
+from src.services.geo_math import METERS_PER_DEG_LAT
+from src.config.routing_config import WALK_SPEED_MPS, MAX_WALK_METERS
+
+# عدد الأضلاع لكل ربع دائرة في المضلع، ودقة تبسيط الحدود (متر)
+CIRCLE_QUAD_SEGMENTS = 6
+SIMPLIFY_METERS = 20.0
+
+
+def _band_polygon(lat: float, lng: float, stop_x: np.ndarray, stop_y: np.ndarray,
+                  radii: np.ndarray, origin_radius: float, scale_x: float) -> dict:
+    """اتحاد دوائر المشي في مستوٍ محلي بالمتر، ثم إعادته إلى خطوط الطول والعرض بصيغة GeoJSON"""
+    circles = [Point(x, y).buffer(r, quad_segs=CIRCLE_QUAD_SEGMENTS) for x, y, r in zip(stop_x, stop_y, radii)]
+    if origin_radius > 0:
+        circles.append(Point(0.0, 0.0).buffer(origin_radius, quad_segs=CIRCLE_QUAD_SEGMENTS))
+    area = unary_union(circles).simplify(SIMPLIFY_METERS)
+    geometry = mapping(area)
+
+    def to_lnglat(ring):
+        return [[lng + x / scale_x, lat + y / METERS_PER_DEG_LAT] for x, y in ring]
+
+    if geometry["type"] == "Polygon":
+        coordinates = [[to_lnglat(ring) for ring in geometry["coordinates"]]]
+    elif geometry["type"] == "MultiPolygon":
+        coordinates = [[to_lnglat(ring) for ring in polygon] for polygon in geometry["coordinates"]]
+    else:
+        coordinates = []
+    return {"type": "MultiPolygon", "coordinates": coordinates}
+
+
+def compute_isochrone(network: TransitNetwork, lat: float, lng: float, minutes: List[int]) -> Dict:
+    """المواقف الممكن الوصول إليها مع زمن الوصول، ومضلع GeoJSON لكل فترة زمنية"""
+    bands = sorted(set(minutes))
+    limit = bands[-1] * 60
+    index = network.spatial_index
+    access = {
+        stop: meters / WALK_SPEED_MPS
+        for meters, stop in index.within(lat, lng, min(MAX_WALK_METERS, limit * WALK_SPEED_MPS))
+    }
+    best = np.asarray(earliest_arrivals(network, access, max_seconds=limit))
+    reached = np.flatnonzero(best <= limit)
+    arrivals = best[reached]
+
+    # إحداثيات محلية بالمتر حول نقطة البداية
+    scale_x = np.cos(np.radians(lat)) * METERS_PER_DEG_LAT
+    stop_x = (index.lngs[reached] - lng) * scale_x
+    stop_y = (index.lats[reached] - lat) * METERS_PER_DEG_LAT
+
+    features = []
+    for band in bands:
+        seconds = band * 60
+        inside = arrivals < seconds
+        radii = np.minimum((seconds - arrivals[inside]) * WALK_SPEED_MPS, MAX_WALK_METERS)
+        origin_radius = min(seconds * WALK_SPEED_MPS, MAX_WALK_METERS)
+        features.append({
+            "type": "Feature",
+            "properties": {"minutes": band, "stops": int(inside.sum())},
+            "geometry": _band_polygon(lat, lng, stop_x[inside], stop_y[inside], radii, origin_radius, scale_x),
+        })
+
+    order = np.argsort(arrivals, kind="stable")
+    stops = [
+        {
+            "stop_id": network.stop_ids[stop],
+            "name": network.stop_names[stop],
+            "lat": network.stop_lats[stop],
+            "lng": network.stop_lngs[stop],
+            "arrival_seconds": int(arrival),
+        }
+        for stop, arrival in zip(reached[order].tolist(), arrivals[order].tolist())
+    ]
+    return {
+        "origin": {"lat": lat, "lng": lng},
+        "minutes": bands,
+        "stops": stops,
+        "geojson": {"type": "FeatureCollection", "features": features},
+    }
@@ -0,0 +1,174 @@
+"""
+Name Suggest
+إكمال أسماء المواقف والخطوط أثناء الكتابة، من فهرس في الذاكرة مبني من الشبكة المحملة.
+الأسماء والاستعلام يوحدان (normalize_arabic): الهمزات وأشكال الألف، التاء المربوطة والهاء، الألف المقصورة
+والياء، التشكيل والتطويل، والأرقام العربية. البحث بـ bisect عن مدى البادئة في قائمتين مرتبتين:
+الأسماء كاملة (الاسم يبدأ بالاستعلام، أفضل ترتيب)، وكلمات الأسماء مع نسخها دون "ال" ولكل كلمة مصفوفة
+الأسماء التي تحتويها (كل كلمة من الاستعلام بادئة لكلمة في الاسم بأي ترتيب، والتقاطع بأقنعة numpy).
+الكلمات العامة (موقف، محطة، خط...) تهمل إذا لم يطابق الاسم بها.
+
+القياس (scripts/benchmark_name_suggest.py، 100 ألف اسم): البناء ~1.5 ثانية والذاكرة ~17 MB،
+والاستعلام 10-30 ميكروثانية للبادئات و 80-150 لعدة كلمات نادرة التقاطع، مقابل ilike '%q%' بمسح كامل.
+يعاد بناؤه في خيط خلفي عند استبدال الشبكة (~0.7 ثانية لـ 50 ألف اسم)، ويبقى الفهرس السابق يخدم الطلبات
+حتى يجهز؛ البناء في الطلب فقط إذا لم يكن هناك فهرس بعد.
+"""
+
+import logging
+import re
+import threading
+from bisect import bisect_left
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# التشكيل، الألف الخنجرية، التطويل
+_DIACRITICS = re.compile("[\u064B-\u065F\u0670\u0640\u06D6-\u06ED]")
+_NON_WORD = re.compile(r"[^\w]+")
+_TRANSLATE = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و", "ئ": "ي", "ى": "ي", "ة": "ه",
+    **{arabic: str(digit) for digit, arabic in enumerate("٠١٢٣٤٥٦٧٨٩")},
+})
+
+# كلمات عامة يكتبها المستخدم قبل الاسم ("موقف المرجة") ولا تكون غالباً جزءاً منه
+GENERIC_WORDS = {"موقف", "محطه", "خط", "كراج", "مكرو", "سرفيس"}
+
+KINDS = ("stop", "route")
+
+
+def normalize_arabic(text: Optional[str]) -> str:
+    """صيغة المقارنة: دون تشكيل، بأشكال موحدة للحروف، بأحرف صغيرة وكلمات مفصولة بمسافة واحدة"""
+    text = _DIACRITICS.sub("", (text or "").translate(_TRANSLATE)).lower()
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _word_keys(word: str) -> List[str]:
+    """الكلمة ونسختها دون "ال" التعريف"""
+    if word.startswith("ال") and len(word) > 3:
+        return [word, word[2:]]
+    return [word]
+
+
+def _prefix_range(keys: List[str], prefix: str) -> Tuple[int, int]:
+    # \uffff أكبر من أي حرف في الأسماء
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + "\uffff")
+
+
+class NameSuggestIndex:
+    """entries: [(النوع، المعرف، الاسم، lat، lng)]؛ النوع "stop" أو "route" (الخطوط دون إحداثيات)"""
+
+    def __init__(self, entries: Sequence[tuple]):
+        self.entries = list(entries)
+        self.kinds = np.array([KINDS.index(entry[0]) for entry in self.entries], dtype=np.int8)
+        normalized = [normalize_arabic(entry[2]) for entry in self.entries]
+        full = sorted((name, i) for i, name in enumerate(normalized) if name)
+        self.full_keys = [name for name, _ in full]
+        self.full_ids = np.array([i for _, i in full], dtype=np.int32)
+        # لكل كلمة (ونسختها دون "ال") الأسماء التي تحتويها، مرتبة حسب الكلمة ثم ترتيب الاسم
+        postings = {}
+        for i, name in enumerate(normalized):
+            for word in name.split():
+                for key in _word_keys(word):
+                    postings.setdefault(key, set()).add(i)
+        self.keys = sorted(postings)
+        lists = [sorted(postings[key]) for key in self.keys]
+        self.key_starts = np.cumsum([0] + [len(ids) for ids in lists]).astype(np.int64)
+        self.token_ids = np.fromiter(chain.from_iterable(lists), dtype=np.int32, count=int(self.key_starts[-1]))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _row(self, i: int) -> dict:
+        kind, entry_id, name, lat, lng = self.entries[i]
+        return {"kind": kind, "id": entry_id, "name": name, "lat": lat, "lng": lng}
+
+    def _word_ids(self, word: str) -> np.ndarray:
+        """الأسماء التي فيها كلمة تبدأ بـ word (قد يتكرر الاسم)"""
+        start, end = _prefix_range(self.keys, word)
+        return self.token_ids[self.key_starts[start]:self.key_starts[end]]
+
+    def _matching(self, words: List[str]) -> np.ndarray:
+        """الأسماء التي لكل كلمة من words بادئة فيها، بترتيب مدى أندر كلمة"""
+        ranges = sorted((self._word_ids(word) for word in words), key=len)
+        candidates = ranges[0]
+        for ids in ranges[1:]:
+            if not len(candidates):
+                break
+            mask = np.zeros(len(self.entries), dtype=bool)
+            mask[ids] = True
+            candidates = candidates[mask[candidates]]
+        return candidates
+
+    def suggest(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[dict]:
+        """الأسماء المطابقة: ما يبدأ بالاستعلام أولاً، ثم ما تطابق كلماته كلمات الاستعلام"""
+        query = normalize_arabic(query)
+        if not query or limit <= 0:
+            return []
+        words = query.split()
+        specific = [word for word in words if word not in GENERIC_WORDS]
+
+        def groups():
+            start, end = _prefix_range(self.full_keys, query)
+            yield self.full_ids[start:end]
+            yield self._matching(words)
+            if specific and specific != words:
+                yield self._matching(specific)
+
+        found, seen = [], set()
+        for ids in groups():
+            if kind is not None:
+                ids = ids[self.kinds[ids] == KINDS.index(kind)]
+            for i in ids.tolist() if len(ids) <= 4 * limit else ids:
+                i = int(i)
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+                    if len(found) >= limit:
+                        return [self._row(i) for i in found]
+        return [self._row(i) for i in found]
+
+    @classmethod
+    def from_network(cls, network) -> "NameSuggestIndex":
+        """المواقف والخطوط الحالية في الشبكة (دون المحذوفة بتعديلات جزئية)"""
+        entries = [("stop", network.stop_ids[s], network.stop_names[s], network.stop_lats[s], network.stop_lngs[s])
+                   for s in network.stop_index.values()]
+        entries += [("route", route_id, network.route_names[r], None, None)
+                    for route_id, r in network.route_index.items()]
+        return cls(entries)
+
+
+_index: Optional[NameSuggestIndex] = None
+_index_network = None
+_builder: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _rebuild(network):
+    global _index, _index_network, _builder
+    try:
+        index = NameSuggestIndex.from_network(network)
+        with _lock:
+            _index, _index_network = index, network
+    except Exception as e:
+        logging.error(f"Name suggest index rebuild failed: {e}")
+    finally:
+        with _lock:
+            _builder = None
+
+
+def get_name_suggest_index() -> NameSuggestIndex:
+    """فهرس أسماء الشبكة الحالية؛ بعد استبدال الشبكة يعاد الفهرس السابق حتى ينتهي بناء الجديد في الخلفية"""
+    global _index, _index_network, _builder
+    from src.services.transit_network import get_network
+    network = get_network()
+    if _index_network is network:
+        return _index
+    with _lock:
+        if _index is None:
+            _index = NameSuggestIndex.from_network(network)
+            _index_network = network
+        elif _builder is None and _index_network is not network:
+            _builder = threading.Thread(target=_rebuild, args=(network,), name="name-suggest-build", daemon=True)
+            _builder.start()
+        return _index
@@ -0,0 +1,80 @@
+"""
+Nearby Stops
+المواقف ضمن نصف قطر من نقطة مرتبة من الأقرب، مع المسافة وترقيم الصفحات بمؤشر (cursor).
+افتراضياً من فهرس المواقف في الذاكرة (stop_geohash_index) دون استعلام قاعدة البيانات، ومع
+ROUTING_NEARBY_IN_MEMORY=false على PostgreSQL/PostGIS: ST_DWithin على geography مع ترتيب KNN (<->)
+يستخدم فهرس ix_stops_geog. قواعد البيانات الأخرى (الاختبارات، SQLite) تستخدم الفهرس في الذاكرة دائماً.
+المؤشر هو (المسافة، معرف الموقف) لآخر موقف في الصفحة، فالصفحة التالية تبدأ بعده مباشرة.
+"""
+
+import base64
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.services.stop_geohash_index import GeohashStopIndex, get_stop_geohash_index
+from src.config.routing_config import NEARBY_IN_MEMORY
+
+Cursor = Tuple[float, int]
+
+NEARBY_SQL = text("""
+    SELECT s.id, s.name, s.lat, s.lng, ST_Distance(s.geom::geography, o.pt, false) AS distance
+    FROM stops s, (SELECT ST_SetSRID(ST_MakePoint(:lng, :lat), 4326)::geography AS pt) o
+    WHERE ST_DWithin(s.geom::geography, o.pt, :radius, false)
+      AND (CAST(:after_distance AS double precision) IS NULL
+           OR (ST_Distance(s.geom::geography, o.pt, false), s.id) > (:after_distance, :after_id))
+    ORDER BY s.geom::geography <-> o.pt, s.id
+    LIMIT :limit
+""")
+
+
+def encode_cursor(meters: float, stop_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{meters!r}:{stop_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """ValueError إذا لم يكن المؤشر من encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        meters, stop_id = raw.split(":")
+        return float(meters), int(stop_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def _page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """rows حتى limit + 1 صف: الصف الزائد يعني وجود صفحة تالية"""
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]["distance_meters"], page[-1]["id"]) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def nearby_postgis(db: Session, lat: float, lng: float, radius_m: float, limit: int,
+                   after: Optional[Cursor] = None) -> Tuple[List[dict], Optional[str]]:
+    result = db.execute(NEARBY_SQL, {
+        "lat": lat, "lng": lng, "radius": radius_m, "limit": limit + 1,
+        "after_distance": after[0] if after else None, "after_id": after[1] if after else None,
+    })
+    rows = [
+        {"id": row.id, "name": row.name, "lat": row.lat, "lng": row.lng, "distance_meters": float(row.distance)}
+        for row in result
+    ]
+    return _page(rows, limit)
+
+
+def nearby_in_memory(index: GeohashStopIndex, lat: float, lng: float, radius_m: float, limit: int,
+                     after: Optional[Cursor] = None) -> Tuple[List[dict], Optional[str]]:
+    found = index.within(lat, lng, radius_m)
+    if after is not None:
+        found = [(meters, position) for meters, position in found if (meters, int(index.ids[position])) > after]
+    return _page([index.row(position, meters) for meters, position in found[:limit + 1]], limit)
+
+
+def find_nearby(db: Session, lat: float, lng: float, radius_m: float, limit: int,
+                cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """صفحة المواقف القريبة ومؤشر الصفحة التالية (None إذا كانت الأخيرة)"""
+    after = decode_cursor(cursor) if cursor else None
+    if not NEARBY_IN_MEMORY and db.get_bind().dialect.name == "postgresql":
+        return nearby_postgis(db, lat, lng, radius_m, limit, after)
+    return nearby_in_memory(get_stop_geohash_index(), lat, lng, radius_m, limit, after)
@@ -0,0 +1,451 @@
+"""
+Network Import
+استيراد المواقف والخطوط دفعة واحدة من CSV أو GeoJSON أو GTFS (ملف zip أو مجلد).
+القراءة متدفقة: تتحول الملفات إلى سجلات تكتب على دفعات في جداول مؤقتة (COPY على PostgreSQL،
+و executemany على غيرها)، ثم تدمج بعبارات SQL على مستوى المجموعات بدل استعلام لكل صف:
+- المواقف والخطوط حسب الاسم: أول ظهور للاسم في الملف، والأسماء الموجودة في قاعدة البيانات تتجاهل
+  (أو تحدّث مع update_existing).
+- مواقف ومسارات كل خط مستورد تستبدل كاملة بما في الملف.
+كل ذلك في معاملة واحدة، ثم ينشر التعديل للعمليات الأخرى (network_updates).
+
+السجلات (tuples):
+    ("stop", name, lat, lng)
+    ("route", name, description, price, operating_hours)
+    ("route_stop", route_name, stop_name, stop_order)
+    ("route_path", route_name, lat, lng, point_order)
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import time
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.services.cache_service import redis_client
+from src.services.network_updates import publish_network_change
+from src.config.routing_config import IMPORT_CHUNK_ROWS
+
+Progress = Callable[[str, int], None]
+
+# نوع السجل -> (الجدول المؤقت، الأعمدة بعد seq، أنواعها)
+STAGING = {
+    "stop": ("import_stops", ("name", "lat", "lng"), ("text", "double precision", "double precision")),
+    "route": ("import_routes", ("name", "description", "price", "operating_hours"),
+              ("text", "text", "integer", "text")),
+    "route_stop": ("import_route_stops", ("route_name", "stop_name", "stop_order"), ("text", "text", "integer")),
+    "route_path": ("import_route_paths", ("route_name", "lat", "lng", "point_order"),
+                   ("text", "double precision", "double precision", "integer")),
+}
+
+# أسماء الأعمدة المقبولة في CSV (بما فيها أسماء stops.txt في GTFS)
+CSV_COLUMNS = {
+    "name": ("name", "stop_name"),
+    "lat": ("lat", "latitude", "stop_lat"),
+    "lng": ("lng", "lon", "longitude", "stop_lon"),
+    "route": ("route", "route_name"),
+    "stop_order": ("stop_order", "order"),
+}
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def _name(value) -> str:
+    """توحيد المسافات في الاسم حتى يتطابق التكرار"""
+    return " ".join(str(value or "").split())
+
+
+# ==================== PARSERS ====================
+
+def read_csv(stream: TextIO) -> Iterator[tuple]:
+    """صف لكل موقف: name,lat,lng مع عمودي route و stop_order اختيارياً لربط الموقف بخط
+    (دون stop_order يؤخذ ترتيب الصفوف)"""
+    reader = csv.DictReader(stream)
+    header = {field.strip().lower(): field for field in reader.fieldnames or []}
+    columns = {key: next((header[alias] for alias in aliases if alias in header), None)
+               for key, aliases in CSV_COLUMNS.items()}
+    if not (columns["name"] and columns["lat"] and columns["lng"]):
+        raise ValueError("CSV needs name, lat and lng columns")
+    last_order: Dict[str, int] = {}
+    for row in reader:
+        name = row[columns["name"]]
+        yield ("stop", name, _float(row[columns["lat"]]), _float(row[columns["lng"]]))
+        route = _name(row[columns["route"]]) if columns["route"] else ""
+        if not route:
+            continue
+        if route not in last_order:
+            last_order[route] = 0
+            yield ("route", route, None, None, None)
+        order = _int(row[columns["stop_order"]]) if columns["stop_order"] else None
+        last_order[route] = order if order is not None else last_order[route] + 1
+        yield ("route_stop", route, name, last_order[route])
+
+
+def read_geojson(stream: TextIO) -> Iterator[tuple]:
+    """FeatureCollection: نقاط Point مواقف (name، و route و stop_order اختيارياً)، و LineString أو
+    MultiLineString خطوط (name، description، price، operating_hours) إحداثياتها مسار الخط"""
+    data = json.load(stream)
+    features = data.get("features", []) if data.get("type") == "FeatureCollection" else [data]
+    last_order: Dict[str, int] = {}
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        kind = geometry.get("type")
+        if kind == "Point":
+            lng, lat = geometry["coordinates"][:2]
+            name = properties.get("name")
+            yield ("stop", name, _float(lat), _float(lng))
+            route = _name(properties.get("route"))
+            if route:
+                if route not in last_order:
+                    last_order[route] = 0
+                    yield ("route", route, None, None, None)
+                order = _int(properties.get("stop_order"))
+                last_order[route] = order if order is not None else last_order[route] + 1
+                yield ("route_stop", route, name, last_order[route])
+        elif kind in ("LineString", "MultiLineString"):
+            route = _name(properties.get("name") or properties.get("route"))
+            last_order.setdefault(route, 0)
+            yield ("route", route, properties.get("description"), _int(properties.get("price")),
+                   properties.get("operating_hours"))
+            lines = geometry["coordinates"] if kind == "MultiLineString" else [geometry["coordinates"]]
+            order = 0
+            for line in lines:
+                for lng, lat, *_ in line:
+                    order += 1
+                    yield ("route_path", route, _float(lat), _float(lng), order)
+
+
+@contextmanager
+def _gtfs_files(source):
+    """دالة تفتح ملف GTFS بالاسم (أو None إذا لم يوجد) من مجلد أو أرشيف zip (مسار أو ملف ثنائي)"""
+    if isinstance(source, (str, os.PathLike)) and os.path.isdir(source):
+        def open_member(name):
+            path = os.path.join(source, name)
+            return open(path, encoding="utf-8-sig", newline="") if os.path.exists(path) else None
+        yield open_member
+        return
+    with zipfile.ZipFile(source) as archive:
+        # الملفات قد تكون داخل مجلد في الأرشيف
+        members = {os.path.basename(member): member for member in archive.namelist()}
+
+        def open_member(name):
+            if name not in members:
+                return None
+            return io.TextIOWrapper(archive.open(members[name]), encoding="utf-8-sig", newline="")
+        yield open_member
+
+
+def _gtfs_rows(open_member, name: str, required: bool = False) -> Iterator[dict]:
+    stream = open_member(name)
+    if stream is None:
+        if required:
+            raise ValueError(f"GTFS feed has no {name}")
+        return
+    with stream:
+        yield from csv.DictReader(stream)
+
+
+def read_gtfs(source) -> Iterator[tuple]:
+    """stops.txt مواقف، وكل خط في routes.txt رحلة ممثلة واحدة من trips.txt (أول رحلة لها shape_id):
+    مواقفها بالترتيب من stop_times.txt ومسارها من shapes.txt، لأن الخط في التطبيق قائمة مواقف واحدة"""
+    with _gtfs_files(source) as open_member:
+        route_names = {}
+        route_descriptions = {}
+        for row in _gtfs_rows(open_member, "routes.txt"):
+            route_names[row["route_id"]] = _name(
+                row.get("route_long_name") or row.get("route_short_name") or row["route_id"])
+            route_descriptions[row["route_id"]] = row.get("route_desc") or None
+
+        # الرحلة الممثلة لكل خط: route_id -> (trip_id، shape_id)
+        chosen = {}
+        for row in _gtfs_rows(open_member, "trips.txt", required=True):
+            route_id, shape_id = row["route_id"], row.get("shape_id") or ""
+            if route_id not in chosen or (shape_id and not chosen[route_id][1]):
+                chosen[route_id] = (row["trip_id"], shape_id)
+
+        for route_id in chosen:
+            route_names.setdefault(route_id, _name(route_id))
+            yield ("route", route_names[route_id], route_descriptions.get(route_id), None, None)
+
+        stop_names = {}
+        for row in _gtfs_rows(open_member, "stops.txt", required=True):
+            # المحطات الأم (location_type=1) ومداخلها ليست مواقف صعود
+            if (row.get("location_type") or "0").strip() not in ("", "0"):
+                continue
+            stop_names[row["stop_id"]] = _name(row.get("stop_name") or row["stop_id"])
+            yield ("stop", stop_names[row["stop_id"]], _float(row.get("stop_lat")), _float(row.get("stop_lon")))
+
+        trip_routes = {trip_id: route_id for route_id, (trip_id, _) in chosen.items()}
+        sequences: Dict[str, list] = {trip_id: [] for trip_id in trip_routes}
+        for row in _gtfs_rows(open_member, "stop_times.txt"):
+            sequence = sequences.get(row["trip_id"])
+            if sequence is not None and row["stop_id"] in stop_names:
+                sequence.append((_int(row.get("stop_sequence")) or 0, row["stop_id"]))
+        for trip_id, sequence in sequences.items():
+            route = route_names[trip_routes[trip_id]]
+            for order, (_, stop_id) in enumerate(sorted(sequence), start=1):
+                yield ("route_stop", route, stop_names[stop_id], order)
+
+        shape_routes: Dict[str, list] = {}
+        for route_id, (_, shape_id) in chosen.items():
+            if shape_id:
+                shape_routes.setdefault(shape_id, []).append(route_names[route_id])
+        for row in _gtfs_rows(open_member, "shapes.txt"):
+            for route in shape_routes.get(row["shape_id"], ()):
+                yield ("route_path", route, _float(row.get("shape_pt_lat")), _float(row.get("shape_pt_lon")),
+                       _int(row.get("shape_pt_sequence")))
+
+
+def read_source(path: str, file_format: Optional[str] = None) -> Iterator[tuple]:
+    """السجلات من ملف حسب الصيغة (csv، geojson، gtfs) أو امتداده؛ المجلد يعامل كـ GTFS"""
+    file_format = file_format or detect_format(path)
+    if file_format == "gtfs":
+        return read_gtfs(path)
+    reader = read_csv if file_format == "csv" else read_geojson
+
+    def records():
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            yield from reader(stream)
+    return records()
+
+
+def detect_format(filename: str) -> str:
+    if os.path.isdir(filename):
+        return "gtfs"
+    extension = os.path.splitext(filename)[1].lower()
+    formats = {".csv": "csv", ".txt": "csv", ".geojson": "geojson", ".json": "geojson", ".zip": "gtfs"}
+    if extension not in formats:
+        raise ValueError(f"Unknown import format for {filename}")
+    return formats[extension]
+
+
+# ==================== STAGING ====================
+
+def _clean(record: tuple) -> Optional[tuple]:
+    """السجل بأسماء موحدة دون نوعه، أو None إذا كان ناقصاً أو إحداثياته غير صالحة"""
+    kind = record[0]
+    if kind == "stop":
+        _, name, lat, lng = record
+        name = _name(name)
+        if not name or lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return None
+        return (name, lat, lng)
+    if kind == "route":
+        _, name, description, price, operating_hours = record
+        name = _name(name)
+        return (name, description or None, price, operating_hours or None) if name else None
+    if kind == "route_stop":
+        _, route, stop, order = record
+        route, stop = _name(route), _name(stop)
+        return (route, stop, order) if route and stop else None
+    if kind == "route_path":
+        _, route, lat, lng, order = record
+        route = _name(route)
+        if not route or lat is None or lng is None or order is None:
+            return None
+        return (route, lat, lng, order)
+    raise ValueError(f"Unknown import record: {kind}")
+
+
+class _Staging:
+    """الجداول المؤقتة في اتصال الجلسة، تملأ على دفعات"""
+
+    def __init__(self, db: Session, chunk_rows: int, progress: Optional[Progress]):
+        self.connection = db.connection()
+        self.postgres = self.connection.dialect.name == "postgresql"
+        self.chunk_rows = chunk_rows
+        self.progress = progress
+        self.buffers = {kind: [] for kind in STAGING}
+        self.counts = dict.fromkeys(STAGING, 0)
+
+    def create(self):
+        for table, columns, types in STAGING.values():
+            self.connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            definition = ", ".join(f"{column} {kind}" for column, kind in zip(columns, types))
+            self.connection.execute(text(f"CREATE TEMP TABLE {table} (seq integer, {definition})"))
+
+    def drop(self):
+        for table, _, _ in STAGING.values():
+            self.connection.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+    def add(self, kind: str, row: tuple):
+        buffer = self.buffers[kind]
+        buffer.append((self.counts[kind],) + row)
+        self.counts[kind] += 1
+        if len(buffer) >= self.chunk_rows:
+            self.flush(kind)
+
+    def flush(self, kind: str):
+        rows, self.buffers[kind] = self.buffers[kind], []
+        if not rows:
+            return
+        table, columns, _ = STAGING[kind]
+        columns = ("seq",) + columns
+        if self.postgres:
+            data = io.StringIO()
+            csv.writer(data).writerows(rows)
+            data.seek(0)
+            cursor = self.connection.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", data)
+            finally:
+                cursor.close()
+        else:
+            self.connection.execute(
+                text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+                [dict(zip(columns, row)) for row in rows])
+        if self.progress:
+            self.progress(kind, self.counts[kind])
+
+    def finish(self):
+        for kind in STAGING:
+            self.flush(kind)
+        # فهارس للدمج (الربط بالاسم واختيار أول ظهور)
+        for table, columns, _ in STAGING.values():
+            self.connection.execute(text(f"CREATE INDEX {table}_key ON {table} ({columns[0]}, seq)"))
+        if self.postgres:
+            for table, _, _ in STAGING.values():
+                self.connection.execute(text(f"ANALYZE {table}"))
+
+
+# ==================== MERGE ====================
+
+# أول ظهور لكل اسم في الملف
+FIRST = "i.seq = (SELECT MIN(d.seq) FROM {table} d WHERE d.{key} = i.{key})"
+
+
+def _point(srid_param: str) -> str:
+    return f"ST_SetSRID(ST_MakePoint(i.lng, i.lat), :{srid_param})"
+
+
+def _merge(connection, postgres: bool, update_existing: bool) -> dict:
+    params = {}
+    if postgres:
+        # نفس SRID عمود geom أياً كان (انظر هجرة ix_stops_geog)
+        for table in ("stops", "route_paths"):
+            params[f"{table}_srid"] = connection.execute(
+                text("SELECT Find_SRID(current_schema()::text, :table, 'geom')"), {"table": table}).scalar()
+
+    def run(sql: str) -> int:
+        return connection.execute(text(sql), params).rowcount
+
+    report = {"stops": {}, "routes": {}, "route_stops": {}, "route_paths": {}}
+    first_stop = FIRST.format(table="import_stops", key="name")
+    first_route = FIRST.format(table="import_routes", key="name")
+
+    if update_existing:
+        report["stops"]["updated"] = run(f"""
+            UPDATE stops SET
+                lat = (SELECT i.lat FROM import_stops i WHERE i.name = stops.name AND {first_stop}),
+                lng = (SELECT i.lng FROM import_stops i WHERE i.name = stops.name AND {first_stop})
+            WHERE name IN (SELECT name FROM import_stops)""")
+        if postgres:
+            run("""UPDATE stops SET geom = ST_SetSRID(ST_MakePoint(lng, lat), :stops_srid)
+                   WHERE name IN (SELECT name FROM import_stops)""")
+        report["routes"]["updated"] = run(f"""
+            UPDATE routes SET
+                description = COALESCE((SELECT i.description FROM import_routes i
+                                        WHERE i.name = routes.name AND {first_route}), description),
+                price = COALESCE((SELECT i.price FROM import_routes i
+                                  WHERE i.name = routes.name AND {first_route}), price),
+                operating_hours = COALESCE((SELECT i.operating_hours FROM import_routes i
+                                            WHERE i.name = routes.name AND {first_route}), operating_hours)
+            WHERE name IN (SELECT name FROM import_routes)""")
+
+    geom_column, geom_value = (", geom", ", " + _point("stops_srid")) if postgres else ("", "")
+    report["stops"]["inserted"] = run(f"""
+        INSERT INTO stops (name, lat, lng{geom_column})
+        SELECT i.name, i.lat, i.lng{geom_value} FROM import_stops i
+        WHERE {first_stop} AND NOT EXISTS (SELECT 1 FROM stops s WHERE s.name = i.name)""")
+    report["routes"]["inserted"] = run(f"""
+        INSERT INTO routes (name, description, price, operating_hours)
+        SELECT i.name, i.description, i.price, i.operating_hours FROM import_routes i
+        WHERE {first_route} AND NOT EXISTS (SELECT 1 FROM routes r WHERE r.name = i.name)""")
+
+    # مواقف ومسارات الخطوط الواردة في الملف تستبدل كاملة
+    report["route_stops"]["replaced"] = run("""
+        DELETE FROM route_stops WHERE route_id IN (
+            SELECT r.id FROM routes r WHERE r.name IN (SELECT route_name FROM import_route_stops))""")
+    report["route_stops"]["inserted"] = run("""
+        INSERT INTO route_stops (route_id, stop_id, stop_order)
+        SELECT r.id, s.id, i.stop_order FROM import_route_stops i
+        JOIN routes r ON r.name = i.route_name
+        JOIN stops s ON s.name = i.stop_name""")
+    geom_column, geom_value = (", geom", ", " + _point("route_paths_srid")) if postgres else ("", "")
+    report["route_paths"]["replaced"] = run("""
+        DELETE FROM route_paths WHERE route_id IN (
+            SELECT r.id FROM routes r WHERE r.name IN (SELECT route_name FROM import_route_paths))""")
+    report["route_paths"]["inserted"] = run(f"""
+        INSERT INTO route_paths (route_id, lat, lng, point_order{geom_column})
+        SELECT r.id, i.lat, i.lng, i.point_order{geom_value} FROM import_route_paths i
+        JOIN routes r ON r.name = i.route_name""")
+
+    report["route_ids"] = [row[0] for row in connection.execute(text(
+        "SELECT id FROM routes WHERE name IN (SELECT name FROM import_routes)"))]
+    report["stop_ids"] = [row[0] for row in connection.execute(text(
+        "SELECT id FROM stops WHERE name IN (SELECT name FROM import_stops)"))]
+    return report
+
+
+def import_records(db: Session, records: Iterable[tuple], update_existing: bool = False,
+                   progress: Optional[Progress] = None, chunk_rows: int = IMPORT_CHUNK_ROWS) -> dict:
+    """استيراد السجلات في معاملة واحدة ثم نشر التعديل. يعيد تقريراً بعدد الصفوف المقروءة والمضافة
+    والمحدثة لكل جدول؛ progress(kind, staged) تستدعى بعد كل دفعة"""
+    started = time.perf_counter()
+    staging = _Staging(db, chunk_rows, progress)
+    invalid = dict.fromkeys(STAGING, 0)
+    try:
+        staging.create()
+        for record in records:
+            row = _clean(record)
+            if row is None:
+                invalid[record[0]] += 1
+            else:
+                staging.add(record[0], row)
+        staging.finish()
+        merged = _merge(staging.connection, staging.postgres, update_existing)
+        staging.drop()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    route_ids, stop_ids = merged.pop("route_ids"), merged.pop("stop_ids")
+    for kind, table in (("stop", "stops"), ("route", "routes"), ("route_stop", "route_stops"),
+                        ("route_path", "route_paths")):
+        merged[table].update(read=staging.counts[kind], invalid=invalid[kind])
+    for table in ("route_stops", "route_paths"):
+        # صفوف لم تجد موقفها (اسم غير موجود)
+        merged[table]["unmatched"] = merged[table]["read"] - merged[table]["inserted"]
+    merged["seconds"] = round(time.perf_counter() - started, 3)
+
+    _publish(route_ids, stop_ids)
+    return merged
+
+
+def _publish(route_ids, stop_ids):
+    try:
+        redis_client.delete("stops:all", "routes:all")
+    except Exception as e:
+        logging.warning(f"Import cache invalidation failed: {e}")
+    if route_ids or stop_ids:
+        publish_network_change(route_ids=route_ids, stop_ids=stop_ids)
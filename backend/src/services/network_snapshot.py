@@ -0,0 +1,232 @@
+"""
+Network Snapshot
+لقطة ثنائية للشبكة المبنية (مصفوفات مسطحة: إحداثيات المواقف، تسلسل مواقف الأنماط، المسافات التراكمية
+على المسارات، ممرات المشي) تقرأ عبر mmap، فتجهز العملية دون استعلامات قاعدة البيانات ودون إعادة إسقاط
+المواقف على المسارات، وتتشارك العمليات صفحات الملف نفسه
+
+صيغة الملف:
+    MAGIC (8 بايت) | رقم الصيغة uint32 | طول الترويسة uint32 | ترويسة JSON | المصفوفات (بمحاذاة 64 بايت)
+الترويسة تحمل لكل مصفوفة: [dtype، الشكل، الإزاحة من بداية الملف]
+"""
+
+import json
+import os
+import struct
+import time
+from collections.abc import Sequence as SequenceABC
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.stop_index import StopIndex
+from src.services.transit_network import TransitNetwork, parse_operating_hours
+
+MAGIC = b"MAKRONET"
+SNAPSHOT_FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def _encode_strings(values: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """نصوص متتالية بترميز UTF-8: (البايتات، بداية كل نص أو -1 لـ None، حدود النصوص)"""
+    blobs = [value.encode("utf-8") if value is not None else b"" for value in values]
+    offsets = np.zeros(len(blobs) + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(blob) for blob in blobs])
+    missing = np.array([value is None for value in values], dtype=bool)
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8), np.where(missing, -1, offsets[:-1]), offsets
+
+
+def _decode_strings(data: np.ndarray, starts: np.ndarray, offsets: np.ndarray) -> List[Optional[str]]:
+    raw = data.tobytes()
+    ends = offsets[1:].tolist()
+    return [None if start < 0 else raw[start:end].decode("utf-8") for start, end in zip(starts.tolist(), ends)]
+
+
+def _flatten(groups: Sequence[Sequence], dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """قوائم متداخلة إلى (قيم مسطحة، بداية كل مجموعة) بصيغة CSR"""
+    offsets = np.zeros(len(groups) + 1, dtype="<i8")
+    offsets[1:] = np.cumsum([len(group) for group in groups])
+    values = np.fromiter((v for group in groups for v in group), dtype=dtype, count=int(offsets[-1]))
+    return values, offsets
+
+
+class CSRView(SequenceABC):
+    """مجموعات بصيغة CSR على مصفوفات اللقطة دون نسخ: العنصر i هو memoryview على مقطعه في الملف المشترك،
+    وفهرسته تعيد أعداد بايثون مثل القوائم (أسرع من عناصر numpy في حلقات RAPTOR)"""
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self._values = memoryview(values)
+        self._bounds = memoryview(offsets)
+
+    def __len__(self):
+        return len(self._bounds) - 1
+
+    def _slice(self, values: memoryview, i: int):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return values[self._bounds[i]:self._bounds[i + 1]]
+
+    def __getitem__(self, i: int):
+        return self._slice(self._values, i)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __eq__(self, other):
+        if not isinstance(other, (SequenceABC, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(list(ours) == list(theirs) for ours, theirs in zip(self, other))
+
+
+class CSRPairsView(CSRView):
+    """مثل CSRView لمصفوفتين متوازيتين: العنصر i قائمة أزواج [(a، b)] من مقطعيهما"""
+
+    def __init__(self, first: np.ndarray, second: np.ndarray, offsets: np.ndarray):
+        super().__init__(first, offsets)
+        self._second = memoryview(second)
+
+    def __getitem__(self, i: int):
+        return list(zip(self._slice(self._values, i), self._slice(self._second, i)))
+
+
+def _arrays(network: TransitNetwork) -> Dict[str, np.ndarray]:
+    if len(network.stop_index) != len(network.stop_ids) or \
+            sum(len(patterns) for patterns in network.route_patterns) != len(network.pattern_route):
+        # مواقف محذوفة أو أنماط قديمة بعد TransitNetwork.patched
+        raise ValueError("اللقطة تصدر من شبكة مبنية كاملة (load_network)، لا من شبكة معدلة بالتحديثات")
+    arrays = {
+        "stop_ids": np.asarray(network.stop_ids, dtype="<i8"),
+        "stop_lats": np.asarray(network.stop_lats, dtype="<f8"),
+        "stop_lngs": np.asarray(network.stop_lngs, dtype="<f8"),
+        "route_ids": np.asarray(network.route_ids, dtype="<i8"),
+        "route_prices": np.asarray(network.route_prices, dtype="<i8"),
+        "pattern_route": np.asarray(network.pattern_route, dtype="<i4"),
+    }
+    for name, values in (("stop_names", network.stop_names), ("route_names", network.route_names),
+                         ("route_hours", network.route_hours)):
+        arrays[f"{name}_data"], arrays[f"{name}_starts"], arrays[f"{name}_offsets"] = _encode_strings(values)
+
+    path_lats = [[lat for lat, _ in points] for points in network.route_paths]
+    path_lngs = [[lng for _, lng in points] for points in network.route_paths]
+    arrays["path_lats"], arrays["path_offsets"] = _flatten(path_lats, "<f8")
+    arrays["path_lngs"], _ = _flatten(path_lngs, "<f8")
+    arrays["path_meters"], _ = _flatten(network.route_path_meters, "<f8")
+
+    arrays["pattern_stops"], arrays["pattern_offsets"] = _flatten(network.pattern_stops, "<i4")
+    arrays["pattern_cum_meters"], _ = _flatten(network.pattern_cum_meters, "<f8")
+
+    arrays["footpath_to"], arrays["footpath_offsets"] = _flatten(
+        [[other for other, _ in paths] for paths in network.footpaths], "<i4"
+    )
+    arrays["footpath_meters"], _ = _flatten([[meters for _, meters in paths] for paths in network.footpaths], "<f8")
+    return arrays
+
+
+def save_snapshot(network: TransitNetwork, path: str):
+    """كتابة اللقطة في ملف مؤقت ثم استبداله، فالعمليات التي تقرأ النسخة السابقة لا ترى ملفاً ناقصاً"""
+    arrays = _arrays(network)
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = [array.dtype.str, list(array.shape), offset]
+        offset += array.nbytes
+
+    header = json.dumps({
+        "network_version": network.version,
+        "update_seq": network.update_seq,
+        "bidirectional": network.bidirectional,
+        "built_at": network.built_at,
+        "exported_at": time.time(),
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = -(-(_PREAMBLE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, SNAPSHOT_FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name][2])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temp_path, path)
+
+
+def _open(path: str) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """قراءة الترويسة، وإرجاع كل مصفوفة كنافذة على الملف المفتوح بـ mmap (دون نسخ)"""
+    with open(path, "rb") as f:
+        magic, version, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"ليس ملف لقطة شبكة: {path}")
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"صيغة لقطة الشبكة غير مدعومة: {version}")
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    data_start = -(-(_PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, (dtype, shape, offset) in header["arrays"].items():
+        dtype = np.dtype(dtype)
+        start = data_start + offset
+        count = int(np.prod(shape))
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(shape)
+    return header, arrays
+
+
+def load_snapshot(path: str, version: Optional[int] = None) -> TransitNetwork:
+    """بناء الشبكة من اللقطة. تسلسل مواقف الأنماط ومسافاتها التراكمية وممرات المشي ونقاط المسارات تبقى
+    نوافذ CSR على الملف المشترك بين العمليات (CSRView)، وكذلك إحداثيات الفهرس المكاني ومسافات المسارات.
+    قوائم بايثون تنشأ عمداً فقط لما يعدله TransitNetwork.patched بالإضافة والاستبدال أو يفهرس بالمعرف:
+    بيانات المواقف والخطوط (معرفات، أسماء، إحداثيات، أسعار، ساعات)، وstop_patterns المشتق من الأنماط"""
+    header, a = _open(path)
+    # صلاحية الشبكة (NETWORK_TTL_SECONDS) تحسب من وقت التحميل كما عند البناء من قاعدة البيانات
+    network = TransitNetwork(version=header["network_version"] if version is None else version)
+    network.update_seq = header["update_seq"]
+    network.bidirectional = header["bidirectional"]
+
+    network.stop_ids = a["stop_ids"].tolist()
+    network.stop_names = _decode_strings(a["stop_names_data"], a["stop_names_starts"], a["stop_names_offsets"])
+    network.stop_lats = a["stop_lats"].tolist()
+    network.stop_lngs = a["stop_lngs"].tolist()
+    network.stop_index = {stop_id: i for i, stop_id in enumerate(network.stop_ids)}
+
+    network.route_ids = a["route_ids"].tolist()
+    network.route_names = _decode_strings(a["route_names_data"], a["route_names_starts"], a["route_names_offsets"])
+    network.route_prices = a["route_prices"].tolist()
+    network.route_hours = _decode_strings(a["route_hours_data"], a["route_hours_starts"], a["route_hours_offsets"])
+    network.route_service = [parse_operating_hours(hours) for hours in network.route_hours]
+    network.route_index = {route_id: i for i, route_id in enumerate(network.route_ids)}
+
+    network.route_paths = CSRPairsView(a["path_lats"], a["path_lngs"], a["path_offsets"])
+    bounds = a["path_offsets"].tolist()
+    network.route_path_meters = [a["path_meters"][s:e] for s, e in zip(bounds, bounds[1:])]
+
+    network.pattern_route = a["pattern_route"].tolist()
+    network.pattern_stops = CSRView(a["pattern_stops"], a["pattern_offsets"])
+    network.pattern_cum_meters = CSRView(a["pattern_cum_meters"], a["pattern_offsets"])
+    network.route_patterns = [[] for _ in network.route_ids]
+    for pattern, route in enumerate(network.pattern_route):
+        network.route_patterns[route].append(pattern)
+    network.stop_patterns = [[] for _ in network.stop_ids]
+    stops, bounds = a["pattern_stops"].tolist(), a["pattern_offsets"].tolist()
+    for pattern in range(len(network.pattern_route)):
+        for pos, stop in enumerate(stops[bounds[pattern]:bounds[pattern + 1]]):
+            network.stop_patterns[stop].append((pattern, pos))
+
+    network.footpaths = CSRPairsView(a["footpath_to"], a["footpath_meters"], a["footpath_offsets"])
+
+    stop_routes = [
+        tuple(sorted({network.pattern_route[pattern] for pattern, _ in patterns}))
+        for patterns in network.stop_patterns
+    ]
+    network.spatial_index = StopIndex(a["stop_lats"], a["stop_lngs"], stop_routes)
+    return network
+
+
+def snapshot_info(path: str) -> dict:
+    """ترويسة اللقطة (دون بناء الشبكة)"""
+    header, _ = _open(path)
+    return {key: value for key, value in header.items() if key != "arrays"}
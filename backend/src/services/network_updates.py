@@ -0,0 +1,141 @@
+"""
+Network Updates
+نشر تعديلات الخطوط والمواقف عبر Redis pub/sub، وتطبيقها في كل عملية على نسختها من الشبكة دون إعادة بنائها:
+كل حدث يحمل رقماً تسلسلياً متزايداً (INCR) ومعرفات الخطوط والمواقف المعدلة فقط، فتقرأ العملية صفوفها
+وتبني نسخة معدلة من الشبكة والفهرس المكاني (TransitNetwork.patched)، ثم تبطل نتائج البحث المتأثرة.
+فجوة في الأرقام (حدث فائت أثناء انقطاع الاتصال) تعيد بناء الشبكة كاملة.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from src.services import search_metrics
+from src.services.cache_service import redis_client
+from src.services.transit_network import (
+    TransitNetwork, invalidate_network, load_changes, peek_network, swap_network
+)
+from src.config.routing_config import NETWORK_UPDATES_CHANNEL
+
+UPDATE_SEQ_KEY = "network:update_seq"
+
+# إعادة الاشتراك بعد انقطاع Redis (ثانية)
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 60
+
+
+def current_seq() -> int:
+    """رقم آخر تعديل منشور (0 إذا تعذر الوصول إلى Redis)"""
+    try:
+        return int(redis_client.get(UPDATE_SEQ_KEY) or 0)
+    except Exception:
+        return 0
+
+
+def publish_network_change(route_ids: Iterable[int] = (), stop_ids: Iterable[int] = ()):
+    """نشر تعديل خطوط أو مواقف بعد حفظه (commit). إذا تعذر النشر تعاد بناء شبكة هذه العملية فقط،
+    وتلتقط باقي العمليات التعديل عند انتهاء صلاحية شبكتها"""
+    event = {"routes": sorted(set(route_ids)), "stops": sorted(set(stop_ids))}
+    try:
+        event["seq"] = int(redis_client.incr(UPDATE_SEQ_KEY))
+        redis_client.publish(NETWORK_UPDATES_CHANNEL, json.dumps(event))
+    except Exception as e:
+        logging.warning(f"Network update not published ({e}); rebuilding the local network instead")
+        invalidate_network()
+
+
+def _points(network: TransitNetwork, route_ids, stop_ids) -> List[Tuple[float, float]]:
+    """إحداثيات مواقف الخطوط والمواقف المعطاة في نسخة من الشبكة"""
+    stops = {network.stop_index[stop_id] for stop_id in stop_ids if stop_id in network.stop_index}
+    for route_id in route_ids:
+        route = network.route_index.get(route_id)
+        if route is not None and network.route_patterns[route]:
+            stops.update(network.pattern_stops[network.route_patterns[route][0]])
+    return [network.stop_coords(stop) for stop in stops]
+
+
+def apply_event(event: dict, db_factory=None) -> bool:
+    """تطبيق حدث تعديل على الشبكة الحالية؛ تعيد True إذا تغيرت الشبكة"""
+    network = peek_network()
+    seq = event["seq"]
+    if network is None or seq <= network.update_seq:
+        # لا شبكة بعد (ستبنى كاملة)، أو التعديل متضمن فيها
+        return False
+    if seq != network.update_seq + 1:
+        logging.warning(f"Network updates {network.update_seq + 1}..{seq - 1} missed; rebuilding")
+        invalidate_network()
+        return False
+
+    if db_factory is None:
+        from config.database import SessionLocal as db_factory
+    db = db_factory()
+    try:
+        changes = load_changes(db, event["routes"], event["stops"])
+    finally:
+        db.close()
+    patched = network.patched(**changes)
+    patched.update_seq = seq
+    if not swap_network(network, patched):
+        # أعيد بناء الشبكة أثناء القراءة
+        return apply_event(event, db_factory)
+
+    # الخطوط المارة بالمواقف المعدلة تتغير أيضاً
+    route_ids = set(event["routes"])
+    for stop_id in event["stops"]:
+        stop = network.stop_index.get(stop_id)
+        if stop is not None:
+            route_ids.update(network.route_ids[route] for route in network.spatial_index.routes_for(stop))
+    points = _points(network, route_ids, event["stops"]) + _points(patched, route_ids, event["stops"])
+    # كل عملية تبطل بعد تطبيق التعديل، فنتيجة خزنتها عملية لم تطبقه بعد تحذف عند تطبيقه فيها
+    from src.services.route_search import invalidate_search_cache
+    invalidate_search_cache(route_ids, points)
+    search_metrics.incr("network_updates")
+    logging.info(f"Network update {seq} applied: routes={event['routes']} stops={event['stops']}")
+    return True
+
+
+def _handle(data):
+    try:
+        apply_event(json.loads(data))
+    except Exception as e:
+        logging.error(f"Network update failed ({e}); rebuilding")
+        invalidate_network()
+
+
+def _catch_up():
+    """بعد (إعادة) الاشتراك: الأحداث المنشورة أثناء الانقطاع لن تصل، فتعاد بناء الشبكة إن فات شيء"""
+    network = peek_network()
+    if network is not None and current_seq() > network.update_seq:
+        invalidate_network()
+
+
+def _listen():
+    delay = RECONNECT_MIN_SECONDS
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(NETWORK_UPDATES_CHANNEL)
+            _catch_up()
+            delay = RECONNECT_MIN_SECONDS
+            for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _handle(message["data"])
+        except Exception as e:
+            logging.warning(f"Network updates subscription lost ({e}); retrying in {delay}s")
+            time.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+
+
+_listener: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """بدء الاستماع لأحداث التعديل مرة واحدة في كل عملية"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            _listener = threading.Thread(target=_listen, name="network-updates", daemon=True)
+            _listener.start()
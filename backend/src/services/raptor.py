@@ -0,0 +1,298 @@
+"""
+RAPTOR (Round-bAsed Public Transit Optimized Router)
+بحث على جولات فوق شبكة المكروهات في الذاكرة: الجولة k تجد أفضل زمن وصول بـ k ركوب (k-1 تبديل).
+المكروهات لا تعمل بجدول مواعيد، لذلك زمن الركوب يحسب من المسافة على الخط والسرعة التقديرية.
+بعد كل جولة يمكن التبديل مشياً إلى موقف قريب على خط آخر عبر ممرات المشي المحسوبة مسبقاً.
+"""
+
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+from src.services.transit_network import TransitNetwork
+from src.config.routing_config import MAKRO_SPEED_MPS, MAX_TRANSFERS, TRANSFER_PENALTY_SECONDS, WALK_SPEED_MPS
+
+INF = float("inf")
+
+
+class Leg:
+    """مقطع ركوب واحد: نمط الخط وموقعا الصعود والنزول"""
+
+    __slots__ = ("pattern", "board_pos", "alight_pos")
+
+    def __init__(self, pattern: int, board_pos: int, alight_pos: int):
+        self.pattern = pattern
+        self.board_pos = board_pos
+        self.alight_pos = alight_pos
+
+
+class Journey:
+    """رحلة مرشحة من موقف الصعود الأول إلى موقف النزول الأخير"""
+
+    def __init__(self, legs: List[Leg], arrival_seconds: float, total_seconds: float):
+        self.legs = legs
+        self.arrival_seconds = arrival_seconds  # الوصول إلى آخر موقف (يشمل المشي الأول)
+        self.total_seconds = total_seconds  # يشمل المشي إلى الوجهة
+
+    def route_sequence(self, network: TransitNetwork) -> Tuple[int, ...]:
+        return tuple(network.pattern_route[leg.pattern] for leg in self.legs)
+
+    def access_stop(self, network: TransitNetwork) -> int:
+        first = self.legs[0]
+        return network.pattern_stops[first.pattern][first.board_pos]
+
+    def egress_stop(self, network: TransitNetwork) -> int:
+        last = self.legs[-1]
+        return network.pattern_stops[last.pattern][last.alight_pos]
+
+
+def _trace_legs(network: TransitNetwork, parents: List[Dict[int, Tuple[int, int, int]]],
+                walk_parents: List[Dict[int, int]], round_no: int, leg: Leg) -> Optional[List[Leg]]:
+    """إعادة بناء مقاطع الرحلة بالرجوع عبر جولات البحث"""
+    legs = [leg]
+    k = round_no
+    while True:
+        board_stop = network.pattern_stops[legs[0].pattern][legs[0].board_pos]
+        # أحدث جولة سابقة حسّنت وقت الوصول لموقف الصعود، وإلا فهو موقف بداية (مشي)
+        origin_round = next(
+            (j for j in range(k - 1, 0, -1) if board_stop in parents[j] or board_stop in walk_parents[j]), 0
+        )
+        if origin_round == 0:
+            return legs
+        # الوصول بالمشي من موقف نزول قريب يسبق الوصول بالركوب في نفس الجولة
+        alight_stop = walk_parents[origin_round].get(board_stop, board_stop)
+        pattern, board_pos, alight_pos = parents[origin_round][alight_stop]
+        legs.insert(0, Leg(pattern, board_pos, alight_pos))
+        k = origin_round
+
+
+def _rounds(network: TransitNetwork, access: Dict[int, float], egress: Dict[int, float],
+            max_transfers: int, speed_mps: float, transfer_penalty: float, walk_speed_mps: float,
+            max_seconds: float = INF, pattern_delays: Optional[Sequence[Sequence[float]]] = None,
+            closed_routes: AbstractSet[int] = frozenset()) -> Tuple[List[float], Dict[Tuple[int, ...], Journey]]:
+    """جولات RAPTOR: أبكر وصول لكل موقف، وأفضل رحلة إلى مواقف النهاية لكل تسلسل خطوط.
+    الوصول بعد max_seconds لا يعتبر تحسيناً، فيتوقف التوسع عنده.
+    pattern_delays: زمن ازدحام تراكمي (ثانية) عند كل موقع في كل نمط يضاف إلى زمن الركوب.
+    closed_routes: الخطوط المتوقفة وقت الانطلاق، لا يركب أي نمط منها."""
+    best = [INF] * len(network.stop_ids)
+    for stop, seconds in access.items():
+        best[stop] = min(best[stop], seconds)
+    marked = set(access)
+
+    parents: List[Dict[int, Tuple[int, int, int]]] = [{}]
+    walk_parents: List[Dict[int, int]] = [{}]
+    candidates: Dict[Tuple[int, ...], Journey] = {}
+
+    for round_no in range(1, max_transfers + 2):
+        if not marked:
+            break
+        # أبكر موقع صعود لكل نمط يمر بموقف تحسّن في الجولة السابقة
+        queue: Dict[int, int] = {}
+        for stop in marked:
+            for pattern, pos in network.stop_patterns[stop]:
+                if pos < queue.get(pattern, INF) and network.pattern_route[pattern] not in closed_routes:
+                    queue[pattern] = pos
+
+        tau_prev = best[:]
+        penalty = 0 if round_no == 1 else transfer_penalty
+        round_parents: Dict[int, Tuple[int, int, int]] = {}
+        marked = set()
+
+        for pattern, start_pos in queue.items():
+            sequence = network.pattern_stops[pattern]
+            cum = network.pattern_cum_meters[pattern]
+            delays = pattern_delays[pattern] if pattern_delays is not None else None
+            board_pos = -1
+            board_time = INF
+            for pos in range(start_pos, len(sequence)):
+                stop = sequence[pos]
+                arrival = INF
+                if board_pos >= 0:
+                    arrival = board_time + (cum[pos] - cum[board_pos]) / speed_mps
+                    if delays is not None:
+                        arrival += delays[pos] - delays[board_pos]
+                    if arrival < best[stop] and arrival <= max_seconds:
+                        best[stop] = arrival
+                        round_parents[stop] = (pattern, board_pos, pos)
+                        marked.add(stop)
+                    if stop in egress:
+                        legs = _trace_legs(network, parents, walk_parents, round_no, Leg(pattern, board_pos, pos))
+                        journey = Journey(legs, arrival, arrival + egress[stop])
+                        key = journey.route_sequence(network)
+                        current = candidates.get(key)
+                        if current is None or journey.total_seconds < current.total_seconds:
+                            candidates[key] = journey
+                # الصعود من هذا الموقف إن كان الوصول إليه في الجولة السابقة أبكر
+                if tau_prev[stop] + penalty < arrival:
+                    board_pos = pos
+                    board_time = tau_prev[stop] + penalty
+
+        # التبديل مشياً من مواقف النزول في هذه الجولة (ممر واحد فقط بعد كل ركوب)
+        walks: Dict[int, Tuple[float, int]] = {}
+        for stop in round_parents:
+            for other, meters in network.footpaths[stop]:
+                arrival = best[stop] + meters / walk_speed_mps
+                if arrival < best[other] and arrival <= max_seconds and arrival < walks.get(other, (INF,))[0]:
+                    walks[other] = (arrival, stop)
+        round_walks: Dict[int, int] = {}
+        for other, (arrival, stop) in walks.items():
+            best[other] = arrival
+            round_walks[other] = stop
+            marked.add(other)
+
+        parents.append(round_parents)
+        walk_parents.append(round_walks)
+
+    return best, candidates
+
+
+def raptor_search(network: TransitNetwork, access: Dict[int, float], egress: Dict[int, float],
+                  max_transfers: int = MAX_TRANSFERS, speed_mps: float = MAKRO_SPEED_MPS,
+                  transfer_penalty: float = TRANSFER_PENALTY_SECONDS,
+                  walk_speed_mps: float = WALK_SPEED_MPS, closed_routes: AbstractSet[int] = frozenset()) -> List[Journey]:
+    """البحث عن رحلات من مواقف البداية إلى مواقف النهاية
+
+    access: {فهرس موقف: زمن المشي إليه بالثواني}
+    egress: {فهرس موقف: زمن المشي منه إلى الوجهة بالثواني}
+    تعيد أفضل رحلة لكل تسلسل خطوط، مع إبقاء الرحلات ذات التبديلات فقط إذا كانت أسرع
+    من كل الرحلات ذات التبديلات الأقل.
+    """
+    _, candidates = _rounds(network, access, egress, max_transfers, speed_mps, transfer_penalty, walk_speed_mps,
+                            closed_routes=closed_routes)
+
+    # استبعاد ركوب نفس الخط مرتين، والرحلات الأبطأ من بدائل بتبديلات أقل
+    journeys = [j for key, j in candidates.items() if all(a != b for a, b in zip(key, key[1:]))]
+    journeys.sort(key=lambda j: (len(j.legs), j.total_seconds))
+    result = []
+    best_with_fewer = INF
+    current_legs = 0
+    best_in_group = INF
+    for journey in journeys:
+        if len(journey.legs) != current_legs:
+            best_with_fewer = min(best_with_fewer, best_in_group)
+            best_in_group = INF
+            current_legs = len(journey.legs)
+        if current_legs == 1 or journey.total_seconds < best_with_fewer:
+            result.append(journey)
+            best_in_group = min(best_in_group, journey.total_seconds)
+    return result
+
+
+def earliest_arrivals(network: TransitNetwork, access: Dict[int, float], max_seconds: float = INF,
+                      max_transfers: int = MAX_TRANSFERS, speed_mps: float = MAKRO_SPEED_MPS,
+                      transfer_penalty: float = TRANSFER_PENALTY_SECONDS,
+                      walk_speed_mps: float = WALK_SPEED_MPS,
+                      pattern_delays: Optional[Sequence[Sequence[float]]] = None,
+                      closed_routes: AbstractSet[int] = frozenset()) -> List[float]:
+    """بحث من نقطة إلى كل المواقف: أبكر زمن وصول لكل موقف (INF إن لم يصل خلال max_seconds)"""
+    best, _ = _rounds(network, access, {}, max_transfers, speed_mps, transfer_penalty, walk_speed_mps,
+                      max_seconds, pattern_delays, closed_routes)
+    return best
+
+
+# ==================== PARETO (McRAPTOR) ====================
+
+class _Label:
+    """وسم في بحث متعدد المعايير: زمن الوصول والأجرة المتراكمة، مع الوسم السابق لإعادة بناء الرحلة"""
+
+    __slots__ = ("arrival", "fare", "prev", "leg")
+
+    def __init__(self, arrival: float, fare: int, prev: Optional["_Label"] = None, leg: Optional[Leg] = None):
+        self.arrival = arrival
+        self.fare = fare
+        self.prev = prev
+        self.leg = leg  # None للوصول مشياً (بداية أو ممر تبديل)
+
+    def legs(self) -> List[Leg]:
+        legs = []
+        label = self
+        while label is not None:
+            if label.leg is not None:
+                legs.append(label.leg)
+            label = label.prev
+        return legs[::-1]
+
+
+def _dominated(bag: List[_Label], arrival: float, fare: int) -> bool:
+    return any(label.arrival <= arrival and label.fare <= fare for label in bag)
+
+
+def _insert(bag: List[_Label], label: _Label) -> bool:
+    """إضافة وسم إلى مجموعة باريتو (زمن، أجرة) وحذف ما يهيمن عليه؛ تعيد False إن كان مهيمناً عليه"""
+    if _dominated(bag, label.arrival, label.fare):
+        return False
+    bag[:] = [other for other in bag if not (label.arrival <= other.arrival and label.fare <= other.fare)]
+    bag.append(label)
+    return True
+
+
+def pareto_search(network: TransitNetwork, access: Dict[int, float], egress: Dict[int, float],
+                  max_transfers: int = MAX_TRANSFERS, speed_mps: float = MAKRO_SPEED_MPS,
+                  transfer_penalty: float = TRANSFER_PENALTY_SECONDS,
+                  walk_speed_mps: float = WALK_SPEED_MPS, closed_routes: AbstractSet[int] = frozenset()) -> List[Journey]:
+    """بحث متعدد المعايير (McRAPTOR): كل الرحلات غير المهيمن عليها في (الزمن، الأجرة، عدد التبديلات)
+
+    كل موقف يحمل مجموعة أوسام باريتو على (زمن الوصول، الأجرة)، وعدد التبديلات هو رقم الجولة.
+    """
+    # الأوسام المضافة في الجولة السابقة، ومجموعة كل الأوسام حتى الآن لكل موقف
+    round_bags: Dict[int, List[_Label]] = {stop: [_Label(seconds, 0)] for stop, seconds in access.items()}
+    best_bags: Dict[int, List[_Label]] = {stop: list(bag) for stop, bag in round_bags.items()}
+    found: List[Tuple[float, int, int, _Label]] = []
+
+    for round_no in range(1, max_transfers + 2):
+        if not round_bags:
+            break
+        queue: Dict[int, int] = {}
+        for stop in round_bags:
+            for pattern, pos in network.stop_patterns[stop]:
+                if pos < queue.get(pattern, INF) and network.pattern_route[pattern] not in closed_routes:
+                    queue[pattern] = pos
+
+        penalty = 0 if round_no == 1 else transfer_penalty
+        new_bags: Dict[int, List[_Label]] = {}
+
+        for pattern, start_pos in queue.items():
+            sequence = network.pattern_stops[pattern]
+            cum = network.pattern_cum_meters[pattern]
+            price = network.route_prices[network.pattern_route[pattern]]
+            # أوسام الركوب على هذا النمط: (زمن الصعود ناقص زمن الركوب حتى موقع الصعود، الأجرة، الوسم، موقع الصعود)
+            riding: List[Tuple[float, int, _Label, int]] = []
+            for pos in range(start_pos, len(sequence)):
+                stop = sequence[pos]
+                offset = cum[pos] / speed_mps
+                for key, fare, board_label, board_pos in riding:
+                    label = _Label(key + offset, fare, board_label, Leg(pattern, board_pos, pos))
+                    if _dominated(best_bags.get(stop, []), label.arrival, fare):
+                        continue
+                    _insert(best_bags.setdefault(stop, []), label)
+                    _insert(new_bags.setdefault(stop, []), label)
+                    if stop in egress:
+                        found.append((label.arrival + egress[stop], fare, round_no, label))
+                for board_label in round_bags.get(stop, []):
+                    key = board_label.arrival + penalty - offset
+                    fare = board_label.fare + price
+                    if not any(k <= key and f <= fare for k, f, _, _ in riding):
+                        riding = [r for r in riding if not (key <= r[0] and fare <= r[1])]
+                        riding.append((key, fare, board_label, pos))
+
+        # التبديل مشياً من مواقف النزول في هذه الجولة
+        for stop, labels in [(stop, list(labels)) for stop, labels in new_bags.items()]:
+            for other, meters in network.footpaths[stop]:
+                for label in labels:
+                    walked = _Label(label.arrival + meters / walk_speed_mps, label.fare, label)
+                    if _insert(best_bags.setdefault(other, []), walked):
+                        _insert(new_bags.setdefault(other, []), walked)
+
+        round_bags = new_bags
+
+    # الفلترة النهائية على (الزمن الكلي، الأجرة، عدد الركوب) مع استبعاد ركوب نفس الخط مرتين متتاليتين
+    journeys = []
+    for total, fare, rides, label in sorted(found, key=lambda item: (item[0], item[1], item[2])):
+        if any(t <= total and f <= fare and r <= rides for t, f, r, _ in journeys):
+            continue
+        journeys.append((total, fare, rides, label))
+    result = []
+    for total, fare, rides, label in journeys:
+        journey = Journey(label.legs(), label.arrival, total)
+        key = journey.route_sequence(network)
+        if all(a != b for a, b in zip(key, key[1:])):
+            result.append(journey)
+    return result
@@ -1,101 +1,415 @@
 from src.schemas.search import SearchRouteRequest, SearchRouteResponse, SuggestedRoute, RouteSegment
-from src.models import models
-from sqlalchemy.orm import Session
-from config.database import SessionLocal
-from shapely.geometry import Point
-from geopy.distance import geodesic
-from src.services.traffic import get_traffic_data
-from src.services.cache_service import cache_get, cache_set
+from src.services.transit_network import TransitNetwork, get_network
+from src.services.raptor import Journey, Leg, pareto_search, raptor_search
+from src.services.geo_math import bounding_box, geohash_encode, haversine_one_to_many
+from src.config.routing_config import (
+    WALK_SPEED_MPS, MAKRO_SPEED_MPS, MAX_WALK_METERS, FALLBACK_NEAREST_STOPS,
+    MIN_WALK_SEGMENT_METERS, MAX_SUGGESTIONS, MAX_PARETO_SUGGESTIONS, TRANSFER_PENALTY_SECONDS,
+    SEARCH_CACHE_GEOHASH_PRECISION, SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_AREA_PRECISION, LOCAL_UTC_OFFSET_HOURS
+)
+from src.services.traffic import TrafficSegment, current_provider, get_traffic_delays
+from src.services.cache_service import cache_get, cache_get_many, cache_set, cache_tag, invalidate_tags
+from src.services import search_metrics
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
 import hashlib
-import json
 
-# منطق بحث مبسط: يبحث عن أقرب خط مكرو يمر بالقرب من نقطة البداية والنهاية
+# البحث يتم على شبكة المكروهات المحملة في الذاكرة (دون استعلامات لقاعدة البيانات)
+# ويدعم رحلات بخط واحد أو أكثر مع تبديلات في المواقف المشتركة.
+# الكاش يخزن الرحلات المرشحة لكل خليتي (بداية، نهاية)، ومقاطع المشي تحسب دائماً للنقطة الدقيقة.
 
-def search_routes(request: SearchRouteRequest) -> SearchRouteResponse:
-    # استخدم الكاش إذا كان الطلب مكرر
-    cache_key = "route_search:" + hashlib.sha256(json.dumps(request.model_dump(), sort_keys=True).encode()).hexdigest()
-    cached = cache_get(cache_key)
-    if cached:
-        return SearchRouteResponse(**cached)
+# رحلة مرشحة مع زمن الازدحام الإضافي لكل مقطع ركوب
+Candidate = Tuple[Journey, List[int]]
+
+# التصفيات التي يدخل زمن الازدحام في نتيجتها
+TRAFFIC_FILTERS = ("fastest", "pareto")
+
+def _walking_candidates(network: TransitNetwork, point: Tuple[float, float]) -> Dict[int, float]:
+    """المواقف المخدومة ضمن مسافة المشي {فهرس الموقف: المسافة بالمتر}، وإلا أقرب المواقف"""
+    index = network.spatial_index
+    found = index.within(point[0], point[1], MAX_WALK_METERS, served_only=True)
+    if not found:
+        found = index.nearest(point[0], point[1], k=FALLBACK_NEAREST_STOPS, served_only=True)
+    return {stop: meters for meters, stop in found}
+
+def _traffic_segment(network: TransitNetwork, leg: Leg) -> TrafficSegment:
+    board = network.pattern_stops[leg.pattern][leg.board_pos]
+    alight = network.pattern_stops[leg.pattern][leg.alight_pos]
+    return TrafficSegment(
+        network.route_ids[network.pattern_route[leg.pattern]],
+        network.stop_ids[board], network.stop_ids[alight],
+        *network.stop_coords(board), *network.stop_coords(alight)
+    )
+
+def _traffic_for(network: TransitNetwork, journeys: List[Journey], at: Optional[datetime] = None) -> List[List[int]]:
+    """زمن الازدحام لكل مقطع ركوب في كل رحلة، بطلب واحد متوازٍ لكل المقاطع (وقت at إن عرفه المزود، وإلا الآن)"""
+    segments = [_traffic_segment(network, leg) for journey in journeys for leg in journey.legs]
+    delays = iter(get_traffic_delays(segments, at=at))
+    return [[next(delays) for _ in journey.legs] for journey in journeys]
+
+def _lower_bound(journey: Journey) -> float:
+    """حد أدنى لزمن الرحلة النهائي: زمن RAPTOR (مشي + ركوب بالسرعة التقديرية + تبديلات) دون ازدحام،
+    مطروحاً منه ثانية لكل مقطع (ركوب ومشي) لأن _build_suggestion يقرب زمن كل مقطع للأسفل"""
+    return journey.total_seconds - (2 * len(journey.legs) + 1)
+
+def _best_first_waves(network: TransitNetwork, journeys: List[Journey], k: int = MAX_SUGGESTIONS,
+                      at: Optional[datetime] = None) -> Iterator[List[Candidate]]:
+    """تقييم الرحلات بترتيب الحد الأدنى على دفعات من k رحلة، وطلب الازدحام فقط للرحلات
+    التي يمكن أن تتفوق على الرحلة رقم k بين ما قيّم حتى الآن. بعد كل دفعة تعاد الرحلات المقيّمة حتى الآن
+    (للبث التدريجي)، وآخرها النتيجة النهائية"""
+    pending = sorted(journeys, key=_lower_bound)
+    evaluated: List[Tuple[float, Candidate]] = []
+    kth_best = float("inf")
+    while pending:
+        wave, pending = pending[:k], pending[k:]
+        for journey, traffic in zip(wave, _traffic_for(network, wave, at)):
+            evaluated.append((journey.total_seconds + sum(traffic), (journey, traffic)))
+        evaluated.sort(key=lambda item: item[0])
+        if len(evaluated) >= k:
+            kth_best = evaluated[k - 1][0]
+        # القائمة مرتبة حسب الحد الأدنى، فالرحلات التي لا يمكن أن تتفوق تقع في نهايتها
+        pending = [journey for journey in pending if _lower_bound(journey) < kth_best]
+        yield [candidate for _, candidate in evaluated]
+    search_metrics.incr("ranked_searches")
+    search_metrics.incr("routes_evaluated", len(evaluated))
+    search_metrics.incr("routes_pruned", len(journeys) - len(evaluated))
+
+def _best_first_traffic(network: TransitNetwork, journeys: List[Journey], k: int = MAX_SUGGESTIONS,
+                        at: Optional[datetime] = None) -> List[Candidate]:
+    candidates: List[Candidate] = []
+    for candidates in _best_first_waves(network, journeys, k, at):
+        pass
+    return candidates
+
+def _departure_minute(request: SearchRouteRequest) -> float:
+    """دقيقة الانطلاق من بداية اليوم بالتوقيت المحلي؛ الوقت بدون منطقة زمنية يعتبر محلياً، والافتراضي الآن"""
+    moment = request.departure_time or datetime.now(timezone.utc)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None) + timedelta(hours=LOCAL_UTC_OFFSET_HOURS)
+    return moment.hour * 60 + moment.minute + moment.second / 60
+
+def _departure_utc(request: SearchRouteRequest) -> Optional[datetime]:
+    """وقت الانطلاق بتوقيت UTC (الوقت بدون منطقة زمنية يعتبر محلياً)، أو None إذا لم يحدد"""
+    moment = request.departure_time
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = (moment - timedelta(hours=LOCAL_UTC_OFFSET_HOURS)).replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+def _closed_routes(network: TransitNetwork, request: SearchRouteRequest) -> FrozenSet[int]:
+    """الخطوط المتوقفة وقت الانطلاق حسب ساعات العمل المحللة عند تحميل الشبكة"""
+    return network.closed_routes(_departure_minute(request))
 
-    db: Session = SessionLocal()
-    start = (request.start_lat, request.start_lng)
-    end = (request.end_lat, request.end_lng)
+def _search_journeys(network: TransitNetwork, request: SearchRouteRequest,
+                     walking_candidates: Callable[[Tuple[float, float]], Dict[int, float]]) -> List[Journey]:
+    # المواقف الممكن الوصول إليها مشياً من البداية، والمواقف القريبة من الوجهة
+    access = walking_candidates((request.start_lat, request.start_lng))
+    egress = walking_candidates((request.end_lat, request.end_lng))
+    access = {stop: meters / WALK_SPEED_MPS for stop, meters in access.items()}
+    egress = {stop: meters / WALK_SPEED_MPS for stop, meters in egress.items()}
+    closed = _closed_routes(network, request)
+    if (request.filter_type or "fastest") == "pareto":
+        return pareto_search(network, access, egress, closed_routes=closed)
+    return raptor_search(network, access, egress, closed_routes=closed)
+
+def _find_candidates(network: TransitNetwork, request: SearchRouteRequest,
+                     walking_candidates: Callable[[Tuple[float, float]], Dict[int, float]],
+                     traffic_at: Optional[datetime] = None) -> List[Candidate]:
+    journeys = _search_journeys(network, request, walking_candidates)
     filter_type = request.filter_type or "fastest"
+    if filter_type == "pareto":
+        # مجموعة باريتو صغيرة، فيطلب الازدحام لكل رحلاتها ثم تعاد فلترتها في _rank
+        return list(zip(journeys, _traffic_for(network, journeys, traffic_at)))
+    # دمج زمن الازدحام إذا كان البحث عن أسرع طريق فقط
+    if filter_type == "fastest":
+        return _best_first_traffic(network, journeys, at=traffic_at)
+    return [(journey, [0] * len(journey.legs)) for journey in journeys]
 
-    # جلب جميع الخطوط
-    routes = db.query(models.Route).all()
-    suggestions = []
-    for route in routes:
-        # جلب محطات الخط
-        stops = db.query(models.Stop).join(models.RouteStop).filter(models.RouteStop.route_id == route.id).all()
-        if not stops:
-            continue
-        # إيجاد أقرب محطة للبداية وأقرب محطة للنهاية
-        start_stop = min(stops, key=lambda s: geodesic((s.lat, s.lng), start).meters)
-        end_stop = min(stops, key=lambda s: geodesic((s.lat, s.lng), end).meters)
-        # حساب المسافة بين البداية وأقرب محطة، وبين النهاية وأقرب محطة
-        walk_to_start = geodesic(start, (start_stop.lat, start_stop.lng)).meters
-        walk_from_end = geodesic((end_stop.lat, end_stop.lng), end).meters
-        # تقدير زمن المشي (سرعة 5 كم/س)
-        walk_to_start_time = int(walk_to_start / (5000/3600))
-        walk_from_end_time = int(walk_from_end / (5000/3600))
-        # تقدير زمن الرحلة داخل المكرو (سرعة 20 كم/س)
-        makro_distance = geodesic((start_stop.lat, start_stop.lng), (end_stop.lat, end_stop.lng)).meters
-        makro_time = int(makro_distance / (20000/3600))
-        # دمج زمن الازدحام إذا كان البحث عن أسرع طريق فقط
-        traffic_extra = 0
-        if filter_type == "fastest":
-            traffic_extra = get_traffic_data(start_stop.lat, start_stop.lng, end_stop.lat, end_stop.lng)
-        makro_time_with_traffic = makro_time + traffic_extra
-        # بناء المسار المقترح
-        segments = []
-        if walk_to_start > 30:
+def _serialize_candidates(network: TransitNetwork, candidates: List[Candidate]) -> List[dict]:
+    """تخزين الرحلات بمعرفات قاعدة البيانات حتى تبقى صالحة بين العمليات ونسخ الشبكة"""
+    payload = []
+    for journey, traffic in candidates:
+        legs = []
+        for leg, traffic_seconds in zip(journey.legs, traffic):
+            legs.append({
+                "route_id": network.route_ids[network.pattern_route[leg.pattern]],
+                "board_stop_id": network.stop_ids[network.pattern_stops[leg.pattern][leg.board_pos]],
+                "alight_stop_id": network.stop_ids[network.pattern_stops[leg.pattern][leg.alight_pos]],
+                "traffic_seconds": traffic_seconds
+            })
+        payload.append({"legs": legs})
+    return payload
+
+def _restore_candidates(network: TransitNetwork, payload) -> Optional[List[Candidate]]:
+    """إعادة بناء الرحلات من الكاش؛ تعيد None إذا لم تعد تطابق الشبكة الحالية"""
+    if not isinstance(payload, list):
+        return None
+    candidates = []
+    for item in payload:
+        legs = []
+        traffic = []
+        for leg in item.get("legs", []):
+            route = network.route_index.get(leg["route_id"])
+            board = network.stop_index.get(leg["board_stop_id"])
+            alight = network.stop_index.get(leg["alight_stop_id"])
+            found = network.find_leg(route, board, alight) if None not in (route, board, alight) else None
+            if found is None:
+                return None
+            legs.append(Leg(*found))
+            traffic.append(leg["traffic_seconds"])
+        if not legs:
+            return None
+        candidates.append((Journey(legs, 0, 0), traffic))
+    return candidates
+
+def _build_suggestion(network: TransitNetwork, journey: Journey, traffic: List[int],
+                      walk_to_start: float, walk_from_end: float) -> SuggestedRoute:
+    segments = []
+    first_stop = journey.access_stop(network)
+    last_stop = journey.egress_stop(network)
+
+    walk_to_start_time = int(walk_to_start / WALK_SPEED_MPS)
+    if walk_to_start > MIN_WALK_SEGMENT_METERS:
+        segments.append(RouteSegment(
+            type="walk",
+            distance_meters=walk_to_start,
+            duration_seconds=walk_to_start_time,
+            instructions=f"امشِ إلى أقرب موقف: {network.stop_names[first_stop]}",
+            start_stop_id=None,
+            end_stop_id=str(network.stop_ids[first_stop])
+        ))
+
+    total_time = walk_to_start_time
+    total_cost = 0
+    previous_alight = None
+    for i, (leg, traffic_extra) in enumerate(zip(journey.legs, traffic)):
+        route = network.pattern_route[leg.pattern]
+        board = network.pattern_stops[leg.pattern][leg.board_pos]
+        alight = network.pattern_stops[leg.pattern][leg.alight_pos]
+        if previous_alight is not None and previous_alight != board:
+            # التبديل مشياً إلى موقف قريب على الخط التالي
+            transfer_walk = network.transfer_meters(previous_alight, board)
+            transfer_walk_time = int(transfer_walk / WALK_SPEED_MPS)
             segments.append(RouteSegment(
                 type="walk",
-                distance_meters=walk_to_start,
-                duration_seconds=walk_to_start_time,
-                instructions=f"امشِ إلى أقرب موقف: {start_stop.name}",
-                start_stop_id=None,
-                end_stop_id=str(start_stop.id)
+                distance_meters=transfer_walk,
+                duration_seconds=transfer_walk_time,
+                instructions=f"امشِ من موقف {network.stop_names[previous_alight]} إلى موقف {network.stop_names[board]}",
+                start_stop_id=str(network.stop_ids[previous_alight]),
+                end_stop_id=str(network.stop_ids[board])
             ))
+            total_time += transfer_walk_time
+        previous_alight = alight
+        makro_distance = network.ride_meters(leg.pattern, leg.board_pos, leg.alight_pos)
+        makro_time = int(makro_distance / MAKRO_SPEED_MPS)
+        if i > 0:
+            makro_time += TRANSFER_PENALTY_SECONDS
+        makro_time_with_traffic = makro_time + traffic_extra
         segments.append(RouteSegment(
             type="makro",
             distance_meters=makro_distance,
             duration_seconds=makro_time_with_traffic,
-            instructions=f"اركب المكرو من {start_stop.name} إلى {end_stop.name}",
-            makro_id=str(route.id),
-            start_stop_id=str(start_stop.id),
-            end_stop_id=str(end_stop.id),
-            estimated_cost=route.price
+            instructions=f"اركب المكرو من {network.stop_names[board]} إلى {network.stop_names[alight]}",
+            makro_id=str(network.route_ids[route]),
+            start_stop_id=str(network.stop_ids[board]),
+            end_stop_id=str(network.stop_ids[alight]),
+            estimated_cost=network.route_prices[route]
         ))
-        if walk_from_end > 30:
-            segments.append(RouteSegment(
-                type="walk",
-                distance_meters=walk_from_end,
-                duration_seconds=walk_from_end_time,
-                instructions=f"امشِ من موقف {end_stop.name} إلى وجهتك النهائية",
-                start_stop_id=str(end_stop.id),
-                end_stop_id=None
-            ))
-        total_time = walk_to_start_time + makro_time_with_traffic + walk_from_end_time
-        total_cost = route.price
-        suggestions.append(SuggestedRoute(
-            route_id=str(route.id),
-            description=route.name,
-            segments=segments,
-            total_estimated_time_seconds=total_time,
-            total_estimated_cost=total_cost
+        total_time += makro_time_with_traffic
+        total_cost += network.route_prices[route]
+
+    walk_from_end_time = int(walk_from_end / WALK_SPEED_MPS)
+    if walk_from_end > MIN_WALK_SEGMENT_METERS:
+        segments.append(RouteSegment(
+            type="walk",
+            distance_meters=walk_from_end,
+            duration_seconds=walk_from_end_time,
+            instructions=f"امشِ من موقف {network.stop_names[last_stop]} إلى وجهتك النهائية",
+            start_stop_id=str(network.stop_ids[last_stop]),
+            end_stop_id=None
         ))
+    total_time += walk_from_end_time
+
+    routes = journey.route_sequence(network)
+    return SuggestedRoute(
+        route_id=str(network.route_ids[routes[0]]),
+        description=" ثم ".join(network.route_names[r] for r in routes),
+        segments=segments,
+        total_estimated_time_seconds=total_time,
+        total_estimated_cost=total_cost
+    )
+
+def _makro_count(route: SuggestedRoute) -> int:
+    return len([s for s in route.segments if s.type == "makro"])
+
+def _pareto_front(suggestions: List[SuggestedRoute]) -> List[SuggestedRoute]:
+    """المسارات غير المهيمن عليها في (الزمن، الأجرة، عدد التبديلات) بعد دمج الازدحام، مرتبة حسب الزمن"""
+    def criteria(route):
+        return route.total_estimated_time_seconds, route.total_estimated_cost, _makro_count(route)
+    front = []
+    for route in sorted(suggestions, key=criteria):
+        if not any(all(a <= b for a, b in zip(criteria(kept), criteria(route))) for kept in front):
+            front.append(route)
+    return front
+
+def _rank(network: TransitNetwork, candidates: List[Candidate], request: SearchRouteRequest) -> SearchRouteResponse:
+    """حساب مقاطع المشي للنقطتين الدقيقتين ثم ترتيب الرحلات حسب نوع التصفية"""
+    if not candidates:
+        return SearchRouteResponse(routes=[])
+    first_stops = [journey.access_stop(network) for journey, _ in candidates]
+    last_stops = [journey.egress_stop(network) for journey, _ in candidates]
+    walks_to_start = haversine_one_to_many(
+        request.start_lat, request.start_lng,
+        [network.stop_lats[s] for s in first_stops], [network.stop_lngs[s] for s in first_stops]
+    ).tolist()
+    walks_from_end = haversine_one_to_many(
+        request.end_lat, request.end_lng,
+        [network.stop_lats[s] for s in last_stops], [network.stop_lngs[s] for s in last_stops]
+    ).tolist()
+    suggestions = [
+        _build_suggestion(network, journey, traffic, walk_to_start, walk_from_end)
+        for (journey, traffic), walk_to_start, walk_from_end in zip(candidates, walks_to_start, walks_from_end)
+    ]
+
     # التصفية
+    filter_type = request.filter_type or "fastest"
+    if filter_type == "pareto":
+        return SearchRouteResponse(routes=_pareto_front(suggestions)[:MAX_PARETO_SUGGESTIONS])
     if filter_type == "cheapest":
         suggestions.sort(key=lambda r: r.total_estimated_cost)
     elif filter_type == "least_transfers":
-        suggestions.sort(key=lambda r: len([s for s in r.segments if s.type == "makro"]))
+        suggestions.sort(key=_makro_count)
     else:  # fastest
         suggestions.sort(key=lambda r: r.total_estimated_time_seconds)
     # إعادة فقط أفضل 3 مسارات
-    db.close()
-    response = SearchRouteResponse(routes=suggestions[:3])
-    cache_set(cache_key, response.model_dump(), ttl=120)
-    return response 
\ No newline at end of file
+    return SearchRouteResponse(routes=suggestions[:MAX_SUGGESTIONS])
+
+def _cache_key(network: TransitNetwork, request: SearchRouteRequest) -> str:
+    """مفتاح الكاش من خليتي geohash للبداية والنهاية، فالطلبات المتقاربة تشترك في النتيجة،
+    ومن مجموعة الخطوط المتوقفة وقت الانطلاق، فكل الأوقات التي تعمل فيها نفس الخطوط تشترك أيضاً.
+    نتائج أسرع طريق وباريتو مع مزود يعرف الازدحام حسب الوقت تفصل أيضاً بساعة الانطلاق (UTC)"""
+    start_cell = geohash_encode(request.start_lat, request.start_lng, SEARCH_CACHE_GEOHASH_PRECISION)
+    end_cell = geohash_encode(request.end_lat, request.end_lng, SEARCH_CACHE_GEOHASH_PRECISION)
+    closed = sorted(network.route_ids[r] for r in _closed_routes(network, request))
+    service = hashlib.md5(",".join(map(str, closed)).encode()).hexdigest()[:8] if closed else "all"
+    filter_type = request.filter_type or "fastest"
+    key = f"route_search:{start_cell}:{end_cell}:{filter_type}:{service}"
+    if filter_type in TRAFFIC_FILTERS and current_provider().time_aware:
+        moment = _departure_utc(request) or datetime.now(timezone.utc)
+        key += f":{moment:%Y%m%d%H}"
+    return key
+
+def _area_tag(lat: float, lng: float) -> str:
+    return f"route_search:area:{geohash_encode(lat, lng, SEARCH_CACHE_AREA_PRECISION)}"
+
+def _store(key: str, request: SearchRouteRequest, payload: List[dict], ttl: int = SEARCH_CACHE_TTL_SECONDS):
+    """تخزين الرحلات مع وسمها بخطوطها وبمنطقتي البداية والنهاية، لإبطالها عند تعديل الشبكة"""
+    cache_set(key, payload, ttl=ttl)
+    tags = {f"route_search:route:{leg['route_id']}" for item in payload for leg in item["legs"]}
+    tags.update((_area_tag(request.start_lat, request.start_lng), _area_tag(request.end_lat, request.end_lng)))
+    cache_tag(key, tags, ttl=ttl)
+
+def invalidate_search_cache(route_ids, points) -> int:
+    """حذف نتائج البحث التي تستخدم الخطوط المعدلة، أو تبدأ أو تنتهي ضمن مسافة المشي من نقاط معدلة
+    (مواقف جديدة أو منقولة أو محذوفة). خلية المنطقة أكبر من مسافة المشي، فزوايا المربع حول كل نقطة تكفي.
+    الرحلات التي قد يحسنها خط جديد في منتصفها فقط تنتظر انتهاء صلاحيتها."""
+    tags = {f"route_search:route:{route_id}" for route_id in route_ids}
+    for lat, lng in points:
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, MAX_WALK_METERS)
+        tags.update(_area_tag(a, b) for a in (min_lat, max_lat) for b in (min_lng, max_lng))
+    return invalidate_tags(tags)
+
+def search_routes(request: SearchRouteRequest) -> SearchRouteResponse:
+    network = get_network()
+    # استخدم الكاش إذا سبق البحث من نفس الخليتين
+    cache_key = _cache_key(network, request)
+    cached = cache_get(cache_key)
+    candidates = _restore_candidates(network, cached) if cached is not None else None
+    search_metrics.incr("cache_hits" if candidates is not None else "cache_misses")
+    if candidates is None:
+        candidates = _find_candidates(network, request, lambda point: _walking_candidates(network, point),
+                                      traffic_at=_departure_utc(request))
+        _store(cache_key, request, _serialize_candidates(network, candidates))
+    return _rank(network, candidates, request)
+
+def precompute_search(request: SearchRouteRequest, ttl: int) -> str:
+    """حساب نتيجة طلب وتخزينها في الكاش مسبقاً (تسخين الكاش)؛ تعيد computed، أو already_cached إذا كانت مخزنة صالحة،
+    أو skipped إذا كانت النتيجة تعتمد على ازدحام لا يعرفه المزود إلا الآن (لا تصلح لساعة قادمة).
+    أزمنة الازدحام تحسب لوقت انطلاق الطلب، فلا تمدد نتيجة بحث عادي بازدحام وقت حسابها بل يعاد حسابها"""
+    network = get_network()
+    traffic_dependent = (request.filter_type or "fastest") in TRAFFIC_FILTERS
+    if traffic_dependent and not current_provider().time_aware:
+        return "skipped"
+    cache_key = _cache_key(network, request)
+    cached = cache_get(cache_key)
+    if not traffic_dependent and cached is not None and _restore_candidates(network, cached) is not None:
+        # نتيجة حديثة من بحث عادي لا تتغير بالوقت (ما دامت نفس الخطوط تعمل): تمدد صلاحيتها فقط
+        _store(cache_key, request, cached, ttl=ttl)
+        return "already_cached"
+    candidates = _find_candidates(network, request, lambda point: _walking_candidates(network, point),
+                                  traffic_at=_departure_utc(request))
+    _store(cache_key, request, _serialize_candidates(network, candidates), ttl=ttl)
+    return "computed"
+
+def search_routes_stream(request: SearchRouteRequest) -> Iterator[Tuple[str, SearchRouteResponse]]:
+    """البحث على مراحل للبث التدريجي: (المرحلة، النتيجة) حيث المرحلة initial ثم refined ثم final.
+    initial: الرحلات مرتبة دون ازدحام فور انتهاء RAPTOR، قبل أي طلب لمزود الازدحام.
+    refined: بعد كل دفعة أزمنة ازدحام (أسرع طريق)، بين الرحلات المقيّمة حتى الآن.
+    final: نفس نتيجة search_routes، وتخزن في الكاش. إصابة الكاش أو مزود ازدحام محلي تعطي final فقط."""
+    network = get_network()
+    cache_key = _cache_key(network, request)
+    cached = cache_get(cache_key)
+    candidates = _restore_candidates(network, cached) if cached is not None else None
+    search_metrics.incr("cache_hits" if candidates is not None else "cache_misses")
+    if candidates is None:
+        filter_type = request.filter_type or "fastest"
+        walking = lambda point: _walking_candidates(network, point)
+        if filter_type not in TRAFFIC_FILTERS or current_provider().is_local:
+            candidates = _find_candidates(network, request, walking, traffic_at=_departure_utc(request))
+        else:
+            journeys = _search_journeys(network, request, walking)
+            yield "initial", _rank(network, [(journey, [0] * len(journey.legs)) for journey in journeys], request)
+            if filter_type == "pareto":
+                candidates = list(zip(journeys, _traffic_for(network, journeys, _departure_utc(request))))
+            else:
+                # كل دفعة ترسل عند وصول التالية، فالأخيرة هي النهائية
+                candidates = []
+                for wave in _best_first_waves(network, journeys, at=_departure_utc(request)):
+                    if candidates:
+                        yield "refined", _rank(network, candidates, request)
+                    candidates = wave
+        _store(cache_key, request, _serialize_candidates(network, candidates))
+    yield "final", _rank(network, candidates, request)
+
+def search_routes_batch(requests: List[SearchRouteRequest]) -> List[SearchRouteResponse]:
+    """تنفيذ عدة طلبات بحث على نفس نسخة الشبكة، مع إعادة استخدام المواقف القريبة لكل نقطة مكررة"""
+    network = get_network()
+    nearby: Dict[Tuple[float, float], Dict[int, float]] = {}
+
+    def walking_candidates(point):
+        if point not in nearby:
+            nearby[point] = _walking_candidates(network, point)
+        return nearby[point]
+
+    keys = [_cache_key(network, request) for request in requests]
+    cached = cache_get_many(keys)
+    candidates_by_key: Dict[str, List[Candidate]] = {}
+    hits = 0
+    results = []
+    for request, key, payload in zip(requests, keys, cached):
+        if key not in candidates_by_key:
+            candidates = _restore_candidates(network, payload) if payload is not None else None
+            if candidates is not None:
+                hits += 1
+            else:
+                candidates = _find_candidates(network, request, walking_candidates,
+                                              traffic_at=_departure_utc(request))
+                _store(key, request, _serialize_candidates(network, candidates))
+            candidates_by_key[key] = candidates
+        else:
+            hits += 1
+        results.append(_rank(network, candidates_by_key[key], request))
+    search_metrics.incr("cache_hits", hits)
+    search_metrics.incr("cache_misses", len(requests) - hits)
+    return results
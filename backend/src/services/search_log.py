@@ -0,0 +1,161 @@
+"""
+Search Log Writer
+تسجيل عمليات البحث في search_logs دون إبطاء البحث: كل بحث يضاف إلى طابور محدود في الذاكرة،
+وخيط خلفي يكتب الطابور دفعات (bulk insert) عند امتلاء الدفعة أو مرور مهلة الكتابة.
+امتلاء الطابور (قاعدة البيانات بطيئة أو متوقفة) يسقط السجلات الجديدة ويعدها بدل استهلاك الذاكرة.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from src.models.models import SearchLog
+from src.schemas.search import SearchRouteRequest, SearchRouteResponse
+from src.services import search_metrics
+from src.config.routing_config import (
+    SEARCH_LOG_ENABLED, SEARCH_LOG_QUEUE_SIZE, SEARCH_LOG_BATCH_SIZE, SEARCH_LOG_FLUSH_SECONDS
+)
+
+
+class SearchLogWriter:
+    """طابور محدود مع خيط كتابة واحد؛ العدادات تنشر في search_metrics مع كل دفعة"""
+
+    def __init__(self, session_factory: Callable, max_queue: int = SEARCH_LOG_QUEUE_SIZE,
+                 batch_size: int = SEARCH_LOG_BATCH_SIZE, flush_seconds: float = SEARCH_LOG_FLUSH_SECONDS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[dict]" = queue.Queue(maxsize=max_queue)
+        self._dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, row: dict) -> bool:
+        """إضافة سجل دون انتظار؛ تعيد False إذا كان الطابور ممتلئاً وأسقط السجل"""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="search-log-writer", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0):
+        """كتابة ما تبقى في الطابور ثم إيقاف الخيط (عند إغلاق العملية)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self) -> List[dict]:
+        """سجلات حتى حجم الدفعة، أو ما وصل خلال مهلة الكتابة"""
+        batch: List[dict] = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> int:
+        """كتابة دفعة واحدة؛ تعيد عدد السجلات المكتوبة"""
+        batch = self._next_batch()
+        written = self._write(batch) if batch else 0
+        with self._lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped:
+            search_metrics.incr("search_logs_dropped", dropped)
+        return written
+
+    def _write(self, batch: List[dict]) -> int:
+        db = self.session_factory()
+        try:
+            try:
+                db.bulk_insert_mappings(SearchLog, batch)
+                db.commit()
+                written = len(batch)
+            except IntegrityError:
+                # سجل يشير إلى خط حذف بعد البحث: تعاد الكتابة سجلاً سجلاً فلا يسقط إلا هو
+                db.rollback()
+                written = self._write_rows(db, batch)
+        except Exception as e:
+            db.rollback()
+            logging.warning(f"Search log batch of {len(batch)} rows dropped: {e}")
+            search_metrics.incr("search_logs_failed", len(batch))
+            return 0
+        finally:
+            db.close()
+        if written < len(batch):
+            search_metrics.incr("search_logs_failed", len(batch) - written)
+        if written:
+            search_metrics.incr("search_logs_written", written)
+        return written
+
+    @staticmethod
+    def _write_rows(db, batch: List[dict]) -> int:
+        written = 0
+        for row in batch:
+            try:
+                db.bulk_insert_mappings(SearchLog, [row])
+                db.commit()
+                written += 1
+            except IntegrityError as e:
+                db.rollback()
+                logging.warning(f"Search log row dropped: {e.orig}")
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Search log writer error: {e}")
+        while not self._queue.empty():
+            self.flush()
+
+
+_writer: Optional[SearchLogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_writer() -> SearchLogWriter:
+    """كاتب السجلات في العملية الحالية، ويبدأ عند أول بحث"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from config.database import SessionLocal
+                writer = SearchLogWriter(SessionLocal)
+                writer.start()
+                atexit.register(writer.close)
+                _writer = writer
+    return _writer
+
+
+def log_search(request: SearchRouteRequest, response: SearchRouteResponse, user_id: Optional[int] = None):
+    """تسجيل بحث (مع إصابات الكاش) بخط أفضل نتيجة؛ تكلفته إضافة إلى طابور فقط"""
+    if not SEARCH_LOG_ENABLED:
+        return
+    get_writer().submit({
+        "user_id": user_id,
+        "start_lat": request.start_lat,
+        "start_lng": request.start_lng,
+        "end_lat": request.end_lat,
+        "end_lng": request.end_lng,
+        "route_id": int(response.routes[0].route_id) if response.routes else None,
+        "filter_type": request.filter_type or "fastest",
+        "timestamp": datetime.now(timezone.utc),
+    })
@@ -0,0 +1,35 @@
+"""
+Search Metrics
+عدادات أداء البحث عن المسارات، مخزنة في Redis لتكون مشتركة بين كل عمليات الخادم
+"""
+
+from typing import Dict
+
+from src.services.cache_service import redis_client
+
+METRICS_KEY = "route_search:metrics"
+
+
+def incr(name: str, amount: int = 1):
+    """زيادة عداد؛ فشل Redis لا يجب أن يوقف البحث"""
+    if not amount:
+        return
+    try:
+        redis_client.hincrby(METRICS_KEY, name, amount)
+    except Exception:
+        pass
+
+
+def get_metrics() -> Dict[str, int]:
+    try:
+        raw = redis_client.hgetall(METRICS_KEY)
+    except Exception:
+        return {}
+    return {name: int(value) for name, value in raw.items()}
+
+
+def reset_metrics():
+    try:
+        redis_client.delete(METRICS_KEY)
+    except Exception:
+        pass
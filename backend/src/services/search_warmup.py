@@ -0,0 +1,111 @@
+"""
+Search Cache Warmup
+تسخين كاش البحث قبل ساعات الذروة من أكثر الطلبات تكراراً في search_logs: تجمع الطلبات حسب خليتي geohash
+للبداية والنهاية (نفس خلايا مفتاح الكاش) ونوع التصفية وساعة اليوم المحلية، ثم تحسب نتائج أكثر الأزواج تكراراً
+للساعات القادمة وتخزن بصلاحية WARMUP_TTL_SECONDS، فأول طلب في اليوم لها يصيب الكاش.
+نتائج أسرع طريق وباريتو تحسب بازدحام ساعة الانطلاق وتخزن بمفتاح تلك الساعة، فتسخن فقط مع مزود يعرفه
+(الملف التاريخي).
+تشغل دورياً من scripts/warm_search_cache.py (cron).
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.models.models import SearchLog
+from src.schemas.search import SearchRouteRequest
+from src.services import search_metrics
+from src.services.geo_math import geohash_encode
+from src.services.route_search import precompute_search
+from src.config.routing_config import (
+    LOCAL_UTC_OFFSET_HOURS, SEARCH_CACHE_GEOHASH_PRECISION, WARMUP_HISTORY_DAYS, WARMUP_TOP_PAIRS,
+    WARMUP_TTL_SECONDS
+)
+
+
+@dataclass
+class PopularPair:
+    """زوج خلايا مع متوسط النقاط المسجلة فيه (نقطة تمثيلية للبحث) وعدد مرات البحث"""
+    start_lat: float
+    start_lng: float
+    end_lat: float
+    end_lng: float
+    filter_type: str
+    count: int
+
+
+def local_hour(moment: datetime) -> int:
+    """ساعة اليوم بالتوقيت المحلي؛ أوقات السجلات دون منطقة زمنية مخزنة بتوقيت UTC"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment + timedelta(hours=LOCAL_UTC_OFFSET_HOURS)).hour
+
+
+def popular_pairs(rows: Iterable[Tuple[float, float, float, float, Optional[str], datetime]], hours: Sequence[int],
+                  top_n: int = WARMUP_TOP_PAIRS,
+                  precision: int = SEARCH_CACHE_GEOHASH_PRECISION) -> Dict[int, List[PopularPair]]:
+    """أكثر top_n زوج خلايا لكل ساعة من hours، من صفوف (start_lat, start_lng, end_lat, end_lng, filter_type, timestamp)"""
+    wanted = set(hours)
+    # (ساعة، خلية البداية، خلية النهاية، التصفية) -> [مجموع الإحداثيات الأربعة، العدد]
+    groups: Dict[tuple, list] = defaultdict(lambda: [0.0, 0.0, 0.0, 0.0, 0])
+    for start_lat, start_lng, end_lat, end_lng, filter_type, timestamp in rows:
+        hour = local_hour(timestamp)
+        if hour not in wanted:
+            continue
+        key = (hour, geohash_encode(start_lat, start_lng, precision), geohash_encode(end_lat, end_lng, precision),
+               filter_type or "fastest")
+        group = groups[key]
+        group[0] += start_lat
+        group[1] += start_lng
+        group[2] += end_lat
+        group[3] += end_lng
+        group[4] += 1
+
+    by_hour: Dict[int, List[PopularPair]] = {hour: [] for hour in hours}
+    for (hour, _, _, filter_type), (lat1, lng1, lat2, lng2, count) in groups.items():
+        by_hour[hour].append(PopularPair(lat1 / count, lng1 / count, lat2 / count, lng2 / count, filter_type, count))
+    return {hour: sorted(pairs, key=lambda p: -p.count)[:top_n] for hour, pairs in by_hour.items()}
+
+
+def load_popular_pairs(db, hours: Sequence[int], top_n: int = WARMUP_TOP_PAIRS,
+                       days: int = WARMUP_HISTORY_DAYS) -> Dict[int, List[PopularPair]]:
+    """قراءة سجلات آخر days يوماً على دفعات وتجميعها دون تحميلها كلها في الذاكرة"""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    rows = (
+        db.query(SearchLog.start_lat, SearchLog.start_lng, SearchLog.end_lat, SearchLog.end_lng,
+                 SearchLog.filter_type, SearchLog.timestamp)
+        .filter(SearchLog.timestamp >= since)
+        .yield_per(10000)
+    )
+    return popular_pairs(rows, hours, top_n=top_n)
+
+
+def warm_cache(pairs_by_hour: Dict[int, List[PopularPair]], local_now: datetime,
+               ttl: int = WARMUP_TTL_SECONDS) -> Dict[str, int]:
+    """حساب نتائج الأزواج وتخزينها؛ وقت الانطلاق منتصف الساعة في يوم local_now (التوقيت المحلي)،
+    فالخطوط المتوقفة (وبالتالي مفتاح الكاش) تطابق طلبات تلك الساعة. الصلاحية ttl على الأقل وتمتد حتى نهاية الساعة"""
+    counts = {"computed": 0, "already_cached": 0, "skipped": 0, "failed": 0}
+    for hour, pairs in sorted(pairs_by_hour.items()):
+        departure = datetime(local_now.year, local_now.month, local_now.day, hour, 30)
+        hour_ttl = max(ttl, int((departure + timedelta(minutes=30) - local_now).total_seconds()))
+        for pair in pairs:
+            request = SearchRouteRequest(
+                start_lat=pair.start_lat, start_lng=pair.start_lng, end_lat=pair.end_lat, end_lng=pair.end_lng,
+                filter_type=pair.filter_type, departure_time=departure,
+            )
+            try:
+                counts[precompute_search(request, hour_ttl)] += 1
+            except Exception as e:
+                logging.warning(f"Cache warmup failed for {pair}: {e}")
+                counts["failed"] += 1
+    search_metrics.incr("cache_warmed", counts["computed"])
+    return counts
+
+
+def upcoming_hours(ahead: int, now: Optional[datetime] = None) -> Tuple[datetime, List[int]]:
+    """اليوم المحلي والساعات المحلية القادمة بدءاً من الساعة التالية (لا تتجاوز منتصف الليل)"""
+    now = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).replace(tzinfo=None)
+    local = now + timedelta(hours=LOCAL_UTC_OFFSET_HOURS)
+    return local, [hour for hour in range(local.hour + 1, local.hour + 1 + ahead) if hour < 24]
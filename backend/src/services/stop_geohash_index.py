@@ -0,0 +1,188 @@
+"""
+Stop Geohash Index
+فهرس مواقف محلي في كل عملية لواجهات الخريطة والمواقف القريبة دون استعلام قاعدة البيانات.
+المواقف مرتبة حسب رمز geohash لخليتها (كعدد صحيح)، وكل خلية مقطع متصل من المصفوفات، فالاستعلام
+يحسب رموز الخلايا المغطية للمربع ويجد مقاطعها بـ searchsorted ثم يصفي المسافة بدقة.
+
+القياس (scripts/benchmark_stop_index.py، الدقة 6، مدينة تجريبية بنصف قطر 9 كم):
+    الذاكرة ~0.36-0.45 MB لكل 10 آلاف موقف: المصفوفات (id، lat، lng) ‏240 KB، ومؤشرات قائمة الأسماء 80 KB
+    (نصوص الأسماء مشتركة مع الشبكة المحملة)، وجدول الخلايا غير الفارغة ~40 KB.
+    الاستعلام مع 5-20 ألف موقف: المواقف ضمن 500 متر ~80 ميكروثانية، أقرب 5 مواقف ~100-140،
+    مربع خريطة 1×1 كم ~70-170 (يزيد مع عدد المواقف في المربع)، مقابل 1-5 ms لاستعلام قاعدة البيانات.
+يعاد بناؤه (~60 ms لكل 20 ألف موقف) عند تغير نسخة الشبكة، أي بعد تطبيق تعديلات المواقف (network_updates).
+"""
+
+import sys
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.geo_math import GEOHASH_BASE32, haversine_one_to_many, bounding_box
+from src.config.routing_config import STOP_GEOHASH_PRECISION
+
+
+def _spread(value: int) -> int:
+    """توزيع بتات عدد (حتى 32 بت) على المواقع الزوجية: abc -> 0a0b0c"""
+    value &= 0xFFFFFFFF
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
+class GeohashStopIndex:
+    """المواقف مجمعة حسب خلايا geohash بدقة precision"""
+
+    def __init__(self, ids: Sequence[int], names: Sequence[str], lats: Sequence[float], lngs: Sequence[float],
+                 precision: int = STOP_GEOHASH_PRECISION):
+        self.precision = precision
+        bits = 5 * precision
+        # geohash يبدأ ببت خط الطول، فعدد بتات خط الطول أكبر أو مساوٍ
+        self.lng_bits = (bits + 1) // 2
+        self.lat_bits = bits // 2
+        self.cell_h = 180.0 / (1 << self.lat_bits)
+        self.cell_w = 360.0 / (1 << self.lng_bits)
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        codes = self._codes(self._rows(lats), self._cols(lngs))
+        order = np.argsort(codes, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lats = lats[order]
+        self.lngs = lngs[order]
+        self.names = [names[i] for i in order.tolist()]
+        # رموز الخلايا غير الفارغة مرتبة، وبداية كل خلية في المصفوفات (مع نهاية أخيرة)
+        self.cell_codes, starts = np.unique(codes[order], return_index=True)
+        self.cell_starts = np.append(starts, len(order)).astype(np.int64)
+        # للبحث: رمز الخلية -> (بداية، نهاية)
+        bounds = self.cell_starts.tolist()
+        self.cells = {code: (bounds[i], bounds[i + 1]) for i, code in enumerate(self.cell_codes.tolist())}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _rows(self, lats) -> np.ndarray:
+        return np.clip(((np.asarray(lats) + 90.0) / self.cell_h).astype(np.int64), 0, (1 << self.lat_bits) - 1)
+
+    def _cols(self, lngs) -> np.ndarray:
+        return np.clip(((np.asarray(lngs) + 180.0) / self.cell_w).astype(np.int64), 0, (1 << self.lng_bits) - 1)
+
+    def _codes(self, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """رمز geohash الصحيح: تداخل بتات العمود (خط الطول) والصف (خط العرض) بدءاً من الأعلى"""
+        bits = self.lng_bits + self.lat_bits
+        codes = np.zeros(np.broadcast(rows, cols).shape, dtype=np.int64)
+        for k in range(self.lng_bits):
+            codes |= ((cols >> (self.lng_bits - 1 - k)) & 1) << (bits - 1 - 2 * k)
+        for k in range(self.lat_bits):
+            codes |= ((rows >> (self.lat_bits - 1 - k)) & 1) << (bits - 2 - 2 * k)
+        return codes
+
+    def geohash(self, code: int) -> str:
+        """نص geohash لرمز خلية"""
+        return "".join(GEOHASH_BASE32[(code >> (5 * (self.precision - 1 - i))) & 31] for i in range(self.precision))
+
+    def _code(self, row: int, col: int) -> int:
+        """نفس _codes لخلية واحدة بعمليات على أعداد بايثون (أسرع من numpy لخلايا قليلة)"""
+        if self.lng_bits == self.lat_bits:
+            return _spread(col) << 1 | _spread(row)
+        # عدد بتات فردي: آخر بت لخط الطول
+        return _spread(col) | _spread(row) << 1
+
+    def _positions(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> np.ndarray:
+        """مواقع المواقف في الخلايا المغطية للمربع (قبل التصفية الدقيقة)"""
+        max_row, max_col = (1 << self.lat_bits) - 1, (1 << self.lng_bits) - 1
+        row0 = min(max(int((min_lat + 90.0) / self.cell_h), 0), max_row)
+        row1 = min(max(int((max_lat + 90.0) / self.cell_h), 0), max_row)
+        col0 = min(max(int((min_lng + 180.0) / self.cell_w), 0), max_col)
+        col1 = min(max(int((max_lng + 180.0) / self.cell_w), 0), max_col)
+        if (row1 - row0 + 1) * (col1 - col0 + 1) > len(self.cells):
+            # مربع أكبر من عدد الخلايا غير الفارغة: كل المواقف
+            return np.arange(len(self.ids))
+        ranges = [self.cells[code] for code in (
+            self._code(row, col) for row in range(row0, row1 + 1) for col in range(col0, col1 + 1)
+        ) if code in self.cells]
+        if not ranges:
+            return np.empty(0, dtype=np.int64)
+        if len(ranges) == 1:
+            return np.arange(*ranges[0])
+        return np.concatenate([np.arange(start, end) for start, end in ranges])
+
+    def row(self, position: int, meters: Optional[float] = None) -> dict:
+        row = {"id": int(self.ids[position]), "name": self.names[position],
+               "lat": float(self.lats[position]), "lng": float(self.lngs[position])}
+        if meters is not None:
+            row["distance_meters"] = meters
+        return row
+
+    def within(self, lat: float, lng: float, radius_m: float) -> List[Tuple[float, int]]:
+        """[(المسافة بالمتر، موقع الموقف)] ضمن نصف القطر، مرتبة حسب (المسافة، المعرف)"""
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_m)
+        positions = self._positions(min_lat, min_lng, max_lat, max_lng)
+        # تصفية رخيصة بالمربع قبل حساب المسافة، فالخلايا أكبر من المربع
+        lats, lngs = self.lats[positions], self.lngs[positions]
+        positions = positions[(lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)]
+        if not len(positions):
+            return []
+        meters = haversine_one_to_many(lat, lng, self.lats[positions], self.lngs[positions])
+        keep = meters <= radius_m
+        positions, meters = positions[keep], meters[keep]
+        order = np.lexsort((self.ids[positions], meters))
+        return list(zip(meters[order].tolist(), positions[order].tolist()))
+
+    def nearby(self, lat: float, lng: float, radius_m: float) -> List[dict]:
+        return [self.row(position, meters) for meters, position in self.within(lat, lng, radius_m)]
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> List[dict]:
+        """أقرب k مواقف: توسيع نصف القطر بالمضاعفة بدءاً من ارتفاع خلية"""
+        if not len(self) or k <= 0:
+            return []
+        radius = self.cell_h * 111320.0
+        while True:
+            found = self.within(lat, lng, radius)
+            if len(found) >= k or radius > 2.1e7:
+                return [self.row(position, meters) for meters, position in found[:k]]
+            radius *= 2
+
+    def bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+             limit: Optional[int] = None) -> List[dict]:
+        """المواقف داخل مربع الخريطة مرتبة حسب المعرف (حتى limit)"""
+        positions = self._positions(min_lat, min_lng, max_lat, max_lng)
+        lats, lngs = self.lats[positions], self.lngs[positions]
+        positions = positions[(lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)]
+        positions = positions[np.argsort(self.ids[positions], kind="stable")][:limit]
+        return [self.row(position) for position in positions.tolist()]
+
+    def memory_bytes(self) -> int:
+        """ذاكرة الفهرس نفسه (دون نصوص الأسماء المشتركة مع الشبكة)"""
+        arrays = (self.ids, self.lats, self.lngs, self.cell_codes, self.cell_starts)
+        cells = sys.getsizeof(self.cells) + sum(sys.getsizeof(code) + sys.getsizeof(bounds)
+                                                for code, bounds in self.cells.items())
+        return sum(a.nbytes for a in arrays) + sys.getsizeof(self.names) + cells
+
+    @classmethod
+    def from_network(cls, network, precision: int = STOP_GEOHASH_PRECISION) -> "GeohashStopIndex":
+        """المواقف الحالية في الشبكة (دون المحذوفة بتعديلات جزئية)"""
+        stops = list(network.stop_index.values())
+        return cls([network.stop_ids[s] for s in stops], [network.stop_names[s] for s in stops],
+                   [network.stop_lats[s] for s in stops], [network.stop_lngs[s] for s in stops], precision)
+
+
+_index: Optional[GeohashStopIndex] = None
+_index_network = None
+_lock = threading.Lock()
+
+
+def get_stop_geohash_index() -> GeohashStopIndex:
+    """فهرس مواقف الشبكة الحالية؛ يعاد بناؤه عند استبدال الشبكة (إعادة تحميل أو تعديل مواقف)"""
+    global _index, _index_network
+    from src.services.transit_network import get_network
+    network = get_network()
+    if _index_network is not network:
+        with _lock:
+            if _index_network is not network:
+                _index = GeohashStopIndex.from_network(network)
+                _index_network = network
+    return _index
@@ -0,0 +1,125 @@
+"""
+Stop Spatial Index
+فهرس مكاني شبكي (grid) لمواقف المكرو: البحث عن أقرب موقف أو المواقف ضمن نصف قطر
+دون المرور على كل المواقف، مع ربط كل موقف بالخطوط التي تمر به
+"""
+
+import copy
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.geo_math import METERS_PER_DEG_LAT, as_coords, bounding_box, haversine_one_to_many
+from src.config.routing_config import STOP_INDEX_CELL_DEG
+
+
+class StopIndex:
+    """تقسيم المواقف إلى خلايا متساوية بالدرجات، كل خلية تحمل فهارس مواقفها"""
+
+    def __init__(self, lats: Sequence[float], lngs: Sequence[float],
+                 stop_routes: Sequence[Tuple[int, ...]], cell_deg: float = STOP_INDEX_CELL_DEG):
+        self.cell_deg = cell_deg
+        self.lats = as_coords(lats)
+        self.lngs = as_coords(lngs)
+        self.stop_routes = stop_routes
+        self.served = np.array([bool(routes) for routes in stop_routes], dtype=bool)
+        buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for stop, (lat, lng) in enumerate(zip(self.lats.tolist(), self.lngs.tolist())):
+            buckets[self._cell(lat, lng)].append(stop)
+        self.cells = {cell: np.array(stops, dtype=np.int64) for cell, stops in buckets.items()}
+        if len(self.lats):
+            self.bounds = (self.lats.min(), self.lngs.min(), self.lats.max(), self.lngs.max())
+        else:
+            self.bounds = None
+
+    @classmethod
+    def from_network(cls, network) -> "StopIndex":
+        stop_routes = [
+            tuple(sorted({network.pattern_route[pattern] for pattern, _ in patterns}))
+            for patterns in network.stop_patterns
+        ]
+        return cls(network.stop_lats, network.stop_lngs, stop_routes)
+
+    def updated(self, moved: Dict[int, Optional[Tuple[float, float]]],
+                stop_routes: Dict[int, Tuple[int, ...]]) -> "StopIndex":
+        """نسخة من الفهرس بعد نقل مواقف أو إضافتها (إحداثيات جديدة) أو حذفها (None) وتغيير خطوطها.
+        الخلايا التي لم تتغير تتشارك مصفوفاتها مع الفهرس الحالي."""
+        index = copy.copy(self)
+        size = max([len(self.lats)] + [stop + 1 for stop in list(moved) + list(stop_routes)])
+        index.lats = np.resize(self.lats, size) if size != len(self.lats) else self.lats.copy()
+        index.lngs = np.resize(self.lngs, size) if size != len(self.lngs) else self.lngs.copy()
+        index.stop_routes = list(self.stop_routes) + [()] * (size - len(self.stop_routes))
+        for stop, routes in stop_routes.items():
+            index.stop_routes[stop] = routes
+        index.served = np.array([bool(routes) for routes in index.stop_routes], dtype=bool)
+
+        affected = set()
+        for stop, coords in moved.items():
+            if stop < len(self.lats):
+                affected.add(self._cell(self.lats[stop], self.lngs[stop]))
+            if coords is not None:
+                index.lats[stop], index.lngs[stop] = coords
+                affected.add(self._cell(*coords))
+        index.cells = dict(self.cells)
+        for cell in affected:
+            stops = [s for s in self.cells.get(cell, ()) if s not in moved]
+            stops.extend(s for s, coords in moved.items() if coords is not None and self._cell(*coords) == cell)
+            if stops:
+                index.cells[cell] = np.array(sorted(stops), dtype=np.int64)
+            else:
+                index.cells.pop(cell, None)
+        if len(index.lats):
+            index.bounds = (index.lats.min(), index.lngs.min(), index.lats.max(), index.lngs.max())
+        return index
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def _candidates(self, lat: float, lng: float, radius_m: float) -> np.ndarray:
+        min_lat, min_lng, max_lat, max_lng = bounding_box(lat, lng, radius_m)
+        row_min, col_min = self._cell(min_lat, min_lng)
+        row_max, col_max = self._cell(max_lat, max_lng)
+        found = [
+            self.cells[(row, col)]
+            for row in range(row_min, row_max + 1)
+            for col in range(col_min, col_max + 1)
+            if (row, col) in self.cells
+        ]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def routes_for(self, stop: int) -> Tuple[int, ...]:
+        """الخطوط (فهارس داخلية) التي تمر بالموقف"""
+        return self.stop_routes[stop]
+
+    def within(self, lat: float, lng: float, radius_m: float, served_only: bool = False) -> List[Tuple[float, int]]:
+        """المواقف ضمن نصف القطر مرتبة من الأقرب: [(المسافة بالمتر، فهرس الموقف)]"""
+        stops = self._candidates(lat, lng, radius_m)
+        if served_only:
+            stops = stops[self.served[stops]]
+        meters = haversine_one_to_many(lat, lng, self.lats[stops], self.lngs[stops])
+        keep = meters <= radius_m
+        stops, meters = stops[keep], meters[keep]
+        order = np.argsort(meters, kind="stable")
+        return list(zip(meters[order].tolist(), stops[order].tolist()))
+
+    def nearest(self, lat: float, lng: float, k: int = 1, served_only: bool = False) -> List[Tuple[float, int]]:
+        """أقرب k مواقف: توسيع نصف القطر بالمضاعفة حتى إيجاد k مواقف أو تغطية كل المواقف"""
+        if self.bounds is None or k <= 0:
+            return []
+        min_lat, min_lng, max_lat, max_lng = self.bounds
+        max_radius = haversine_one_to_many(
+            lat, lng, [min_lat, min_lat, max_lat, max_lat], [min_lng, max_lng, min_lng, max_lng]
+        ).max()
+        radius = self.cell_deg * METERS_PER_DEG_LAT
+        while True:
+            found = self.within(lat, lng, radius, served_only=served_only)
+            if len(found) >= k or radius > max_radius:
+                return found[:k]
+            radius *= 2
@@ -0,0 +1,185 @@
+"""
+Synthetic City
+توليد مدينة تجريبية قابلة للضبط (مواقف، خطوط تسير بين مواقف متجاورة، نقاط مسار كثيفة)
+وسجلات بحث ومواقع مكروهات بأعداد كبيرة، لقياس أداء البحث ولوحة التحكم على بيانات بحجم حقيقي.
+كل التوليد حتمي حسب البذرة (seed)، والسجلات الكبيرة تولد كمولدات (iterators) دون تحميلها في الذاكرة.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from src.services.geo_math import METERS_PER_DEG_LAT
+from src.services.stop_index import StopIndex
+
+# مركز دمشق تقريباً
+DEFAULT_CENTER = (33.5138, 36.2765)
+
+FILTER_TYPES = ["fastest", "fastest", "fastest", "cheapest", "least_transfers"]
+OPERATING_HOURS = [None, None, "06:00-23:00", "05:30-22:30", "07:00-21:00"]
+
+
+class SyntheticCity:
+    """صفوف المدينة بنفس صيغة TransitNetwork.from_rows، مع معرفات تبدأ من إزاحات قابلة للضبط"""
+
+    def __init__(self, routes, stops, route_stops, route_paths, center: Tuple[float, float], radius_m: float):
+        self.routes = routes            # (id, name, price, operating_hours)
+        self.stops = stops              # (id, name, lat, lng)
+        self.route_stops = route_stops  # (id, route_id, stop_id, stop_order)
+        self.route_paths = route_paths  # (id, route_id, lat, lng, point_order)
+        self.center = center
+        self.radius_m = radius_m
+
+    def stats(self) -> dict:
+        return {
+            "routes": len(self.routes),
+            "stops": len(self.stops),
+            "route_stops": len(self.route_stops),
+            "route_paths": len(self.route_paths),
+        }
+
+    def random_point(self, rng: random.Random) -> Tuple[float, float]:
+        """نقطة عشوائية داخل المدينة، أكثف قرب المركز"""
+        return _offset(self.center, rng.random() * self.radius_m, rng.uniform(0, 2 * math.pi))
+
+
+def _offset(origin: Tuple[float, float], meters: float, bearing: float) -> Tuple[float, float]:
+    lat, lng = origin
+    dlat = meters * math.cos(bearing) / METERS_PER_DEG_LAT
+    dlng = meters * math.sin(bearing) / (METERS_PER_DEG_LAT * math.cos(math.radians(lat)))
+    return lat + dlat, lng + dlng
+
+
+def generate_city(n_stops: int = 5000, n_routes: int = 300, stops_per_route: int = 30,
+                  path_spacing_m: float = 40.0, radius_m: float = 9000.0,
+                  center: Tuple[float, float] = DEFAULT_CENTER, seed: int = 1,
+                  id_offsets: Optional[dict] = None) -> SyntheticCity:
+    """مدينة تجريبية: المواقف موزعة بكثافة أعلى قرب المركز، وكل خط يتقدم من موقف إلى موقف قريب
+    في اتجاه متقارب، ومساره نقاط كل path_spacing_m متر تقريباً بين مواقفه مع انحراف بسيط"""
+    rng = random.Random(seed)
+    offsets = {"routes": 1, "stops": 1, "route_stops": 1, "route_paths": 1, **(id_offsets or {})}
+
+    stops = []
+    for i in range(n_stops):
+        # الجذر التربيعي يعطي توزيعاً منتظماً على المساحة، والأس الأكبر يزيد الكثافة قرب المركز
+        lat, lng = _offset(center, radius_m * rng.random() ** 0.75, rng.uniform(0, 2 * math.pi))
+        stops.append((offsets["stops"] + i, f"موقف تجريبي {offsets['stops'] + i}", round(lat, 6), round(lng, 6)))
+    lats = np.array([s[2] for s in stops])
+    lngs = np.array([s[3] for s in stops])
+    index = StopIndex(lats, lngs, [()] * n_stops)
+    spacing = radius_m * math.sqrt(math.pi / max(n_stops, 1))
+
+    routes, route_stops, route_paths = [], [], []
+    for r in range(n_routes):
+        route_id = offsets["routes"] + r
+        sequence = [rng.randrange(n_stops)]
+        heading = rng.uniform(0, 2 * math.pi)
+        while len(sequence) < stops_per_route:
+            current = sequence[-1]
+            best, best_score = None, None
+            for meters, other in index.within(lats[current], lngs[current], 3 * spacing):
+                if other in sequence or meters < spacing * 0.3:
+                    continue
+                bearing = math.atan2((lngs[other] - lngs[current]) * math.cos(math.radians(lats[current])),
+                                     lats[other] - lats[current])
+                turn = abs((bearing - heading + math.pi) % (2 * math.pi) - math.pi)
+                score = turn + rng.random() * 0.5
+                if turn < math.pi / 3 and (best_score is None or score < best_score):
+                    best, best_score = other, score
+            if best is None:
+                break
+            sequence.append(best)
+            heading = math.atan2((lngs[best] - lngs[current]) * math.cos(math.radians(lats[current])),
+                                 lats[best] - lats[current]) + rng.gauss(0, 0.2)
+        if len(sequence) < 2:
+            sequence.append(index.nearest(lats[sequence[0]], lngs[sequence[0]], k=2)[-1][1])
+
+        routes.append((route_id, f"خط تجريبي {route_id}", rng.choice([200, 300, 400, 500, 700]),
+                       rng.choice(OPERATING_HOURS)))
+        for order, stop in enumerate(sequence, start=1):
+            route_stops.append((offsets["route_stops"] + len(route_stops), route_id, stops[stop][0], order))
+
+        order = 1
+        for a, b in zip(sequence, sequence[1:]):
+            hop = math.hypot((lats[b] - lats[a]) * METERS_PER_DEG_LAT,
+                             (lngs[b] - lngs[a]) * METERS_PER_DEG_LAT * math.cos(math.radians(lats[a])))
+            steps = max(1, int(hop / path_spacing_m))
+            for step in range(steps):
+                t = step / steps
+                jitter = 0.0 if step == 0 else rng.gauss(0, 3e-5)
+                lat = lats[a] + (lats[b] - lats[a]) * t + jitter
+                lng = lngs[a] + (lngs[b] - lngs[a]) * t - jitter
+                route_paths.append((offsets["route_paths"] + len(route_paths), route_id, round(lat, 6), round(lng, 6), order))
+                order += 1
+        last = sequence[-1]
+        route_paths.append((offsets["route_paths"] + len(route_paths), route_id, stops[last][2], stops[last][3], order))
+
+    return SyntheticCity(routes, stops, route_stops, route_paths, center, radius_m)
+
+
+def search_log_rows(city: SyntheticCity, count: int, days: int = 30, seed: int = 2,
+                    end: Optional[datetime] = None) -> Iterator[dict]:
+    """سجلات بحث: نقاط البداية والنهاية قرب مواقف عشوائية (بعض المواقف أكثر شعبية)، موزعة على الأيام
+    مع ذروتين صباحية ومسائية"""
+    rng = random.Random(seed)
+    end = end or datetime.now(timezone.utc)
+    weights = [rng.paretovariate(1.5) for _ in city.stops]
+    cumulative = list(np.cumsum(weights))
+    route_ids = [route[0] for route in city.routes]
+    for _ in range(count):
+        start, finish = rng.choices(city.stops, cum_weights=cumulative, k=2)
+        hour = rng.choice([7, 8, 8, 9, 13, 14, 16, 17, 17, 18, 20, rng.randrange(24)])
+        moment = end - timedelta(days=rng.randrange(days))
+        moment = moment.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60), microsecond=0)
+        yield {
+            "user_id": None,
+            "start_lat": start[2] + rng.gauss(0, 0.002),
+            "start_lng": start[3] + rng.gauss(0, 0.002),
+            "end_lat": finish[2] + rng.gauss(0, 0.002),
+            "end_lng": finish[3] + rng.gauss(0, 0.002),
+            "route_id": rng.choice(route_ids),
+            "filter_type": rng.choice(FILTER_TYPES),
+            "timestamp": moment,
+        }
+
+
+def makro_location_rows(city: SyntheticCity, makros: int, days: int = 7, interval_seconds: int = 30,
+                        service_hours: Tuple[int, int] = (6, 22), seed: int = 3,
+                        end: Optional[datetime] = None) -> Iterator[dict]:
+    """مواقع GPS لمكروهات تسير ذهاباً وإياباً على مسارات الخطوط، بسرعة أقل في ساعات الذروة،
+    مرتبة حسب makro_id ثم الوقت (كما يتوقعها build_profile)"""
+    rng = random.Random(seed)
+    end = (end or datetime.now(timezone.utc)).replace(hour=0, minute=0, second=0, microsecond=0)
+    paths = {}
+    for _, route_id, lat, lng, _ in city.route_paths:
+        paths.setdefault(route_id, []).append((lat, lng))
+    route_ids = [route_id for route_id, points in paths.items() if len(points) > 1]
+    for m in range(makros):
+        points = np.array(paths[rng.choice(route_ids)])
+        hops = np.hypot(np.diff(points[:, 0]) * METERS_PER_DEG_LAT,
+                        np.diff(points[:, 1]) * METERS_PER_DEG_LAT * math.cos(math.radians(points[0, 0])))
+        along = np.concatenate(([0.0], np.cumsum(hops)))
+        length = along[-1]
+        for day in range(days, 0, -1):
+            moment = end - timedelta(days=day) + timedelta(hours=service_hours[0])
+            position = rng.uniform(0, length)
+            direction = rng.choice([1, -1])
+            while moment.hour < service_hours[1]:
+                rush = moment.hour in (7, 8, 13, 14, 17, 18)
+                speed = rng.uniform(2.5, 5.0) if rush else rng.uniform(5.0, 9.0)
+                position += direction * speed * interval_seconds
+                if not 0 <= position <= length:
+                    direction = -direction
+                    position = min(max(position, 0.0), length)
+                lat = float(np.interp(position, along, points[:, 0]))
+                lng = float(np.interp(position, along, points[:, 1]))
+                yield {
+                    "makro_id": f"synthetic-{m + 1}",
+                    "lat": lat + rng.gauss(0, 5e-5),
+                    "lng": lng + rng.gauss(0, 5e-5),
+                    "timestamp": moment,
+                }
+                moment += timedelta(seconds=interval_seconds)
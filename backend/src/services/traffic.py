@@ -1,36 +1,187 @@
+import logging
 import os
+import random
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import List, Optional
+
+from src.services.cache_service import cache_get_many, cache_set
+from src.services import search_metrics
+from src.config.routing_config import (
+    TRAFFIC_DEADLINE_SECONDS, TRAFFIC_CACHE_TTL_SECONDS, TRAFFIC_MAX_WORKERS, TRAFFIC_PROFILE_PATH
+)
+
+
+class TrafficSegment:
+    """مقطع ركوب بين موقفين يطلب له زمن الازدحام الإضافي"""
+
+    __slots__ = ("route_id", "from_stop_id", "to_stop_id", "start_lat", "start_lng", "end_lat", "end_lng")
+
+    def __init__(self, route_id, from_stop_id, to_stop_id, start_lat, start_lng, end_lat, end_lng):
+        self.route_id = route_id
+        self.from_stop_id = from_stop_id
+        self.to_stop_id = to_stop_id
+        self.start_lat = start_lat
+        self.start_lng = start_lng
+        self.end_lat = end_lat
+        self.end_lng = end_lng
+
+    @property
+    def cache_key(self) -> str:
+        return f"traffic:{self.from_stop_id}:{self.to_stop_id}"
+
+
+class TrafficProvider:
+    """واجهة مزود زمن الازدحام: تعيد زمناً إضافياً تقديرياً (بالثواني) لمقطع واحد"""
+
+    # المزود المحلي يجيب مباشرة دون كاش أو طلبات متوازية
+    is_local = False
+    # المزود يعرف الازدحام في وقت آخر غير الآن (get_delay_at)
+    time_aware = False
+
+    def get_delay(self, segment: TrafficSegment) -> int:
+        raise NotImplementedError
+
+    def get_delay_at(self, segment: TrafficSegment, moment: datetime) -> int:
+        """الزمن الإضافي وقت moment؛ المزودات غير time_aware تعيد ازدحام الآن"""
+        return self.get_delay(segment)
+
+
+class GoogleTrafficDelayProvider(TrafficProvider):
+    """زمن الازدحام من Google Directions API (الفرق بين duration_in_traffic و duration)"""
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    def get_delay(self, segment: TrafficSegment) -> int:
+        url = (
+            f"https://maps.googleapis.com/maps/api/directions/json?"
+            f"origin={segment.start_lat},{segment.start_lng}&destination={segment.end_lat},{segment.end_lng}"
+            f"&departure_time=now&key={self.api_key}"
+        )
+        try:
+            resp = requests.get(url, timeout=5)
+            data = resp.json()
+            if data.get("status") == "OK":
+                # نأخذ أول مسار
+                route = data["routes"][0]
+                leg = route["legs"][0]
+                duration = leg["duration"]["value"]  # زمن الرحلة بالثواني (بدون ازدحام)
+                duration_in_traffic = leg.get("duration_in_traffic", {}).get("value", duration)
+                return max(duration_in_traffic - duration, 0)
+            return 0  # إذا فشل الطلب، لا نضيف زمن إضافي
+        except Exception:
+            return 0
+
+
+class RandomTrafficDelayProvider(TrafficProvider):
+    """Mock: زمن إضافي عشوائي بين 0 و 10 دقائق (عند عدم وجود مفتاح API)"""
+
+    def get_delay(self, segment: TrafficSegment) -> int:
+        return random.randint(0, 600)
+
+
+class StubTrafficDelayProvider(TrafficProvider):
+    """مزود محلي ثابت للاختبارات: زمن إضافي ثابت مع تأخير استجابة اختياري"""
+
+    def __init__(self, delay_seconds: int = 0, latency_seconds: float = 0.0):
+        self.delay_seconds = delay_seconds
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def get_delay(self, segment: TrafficSegment) -> int:
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.delay_seconds
+
+
+def get_traffic_provider() -> TrafficProvider:
+    provider = os.getenv("TRAFFIC_DELAY_PROVIDER", "").lower()
+    api_key = os.getenv("GOOGLE_TRAFFIC_API_KEY")
+    if provider == "stub":
+        return StubTrafficDelayProvider()
+    if provider == "profile" or (not provider and os.path.exists(TRAFFIC_PROFILE_PATH)):
+        from src.services.traffic_profile import ProfileTrafficDelayProvider, TrafficProfile
+        try:
+            return ProfileTrafficDelayProvider(TrafficProfile.load(TRAFFIC_PROFILE_PATH))
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Traffic profile unavailable ({TRAFFIC_PROFILE_PATH}): {e}")
+    if provider == "random" or not api_key:
+        return RandomTrafficDelayProvider()
+    return GoogleTrafficDelayProvider(api_key)
+
+
+_provider: Optional[TrafficProvider] = None
+_executor = ThreadPoolExecutor(max_workers=TRAFFIC_MAX_WORKERS, thread_name_prefix="traffic")
+
+
+def current_provider() -> TrafficProvider:
+    global _provider
+    if _provider is None:
+        _provider = get_traffic_provider()
+    return _provider
+
+
+def set_traffic_provider(provider: Optional[TrafficProvider]):
+    """استبدال المزود الحالي (للاختبارات أو لمزودات أخرى)"""
+    global _provider
+    _provider = provider
+
+
+def _cache_late_result(key, future):
+    if future.exception() is None:
+        cache_set(key, int(future.result()), ttl=TRAFFIC_CACHE_TTL_SECONDS)
+
+
+def get_traffic_delays(segments: List[TrafficSegment], deadline_seconds: float = TRAFFIC_DEADLINE_SECONDS,
+                       at: Optional[datetime] = None) -> List[int]:
+    """أزمنة الازدحام لعدة مقاطع: من الكاش أولاً، والباقي بطلبات متوازية ضمن مهلة إجمالية واحدة.
+    المقاطع التي لم تصل نتيجتها قبل انتهاء المهلة تأخذ صفراً، وتخزن نتيجتها في الكاش عند وصولها.
+    at: وقت الانطلاق إذا كان المزود time_aware (كاش المقاطع لازدحام الآن فلا يستخدم)، وإلا يهمل.
+    """
+    if not segments:
+        return []
+    provider = current_provider()
+    if at is not None and provider.time_aware:
+        return [int(provider.get_delay_at(segment, at)) for segment in segments]
+    if provider.is_local:
+        return [int(provider.get_delay(segment)) for segment in segments]
+
+    keys = [segment.cache_key for segment in segments]
+    try:
+        cached = cache_get_many(keys)
+    except Exception:
+        cached = [None] * len(keys)
+    delays = {key: int(value) for key, value in zip(keys, cached) if value is not None}
+
+    pending = {}
+    for key, segment in zip(keys, segments):
+        if key not in delays and key not in pending:
+            pending[key] = _executor.submit(provider.get_delay, segment)
+
+    if pending:
+        done, not_done = wait(pending.values(), timeout=deadline_seconds)
+        for key, future in pending.items():
+            if future in done:
+                if future.exception() is None:
+                    delays[key] = int(future.result())
+                    cache_set(key, delays[key], ttl=TRAFFIC_CACHE_TTL_SECONDS)
+            else:
+                # النتيجة المتأخرة تفيد البحث التالي
+                future.add_done_callback(lambda f, key=key: _cache_late_result(key, f))
+        search_metrics.incr("traffic_lookups", len(pending))
+        search_metrics.incr("traffic_timeouts", len(not_done))
+
+    return [delays.get(key, 0) for key in keys]
+
 
 def get_traffic_data(start_lat, start_lng, end_lat, end_lng):
     """
-    جلب بيانات الازدحام المروري بين نقطتين باستخدام Google Directions API (Traffic).
-    حالياً: إذا لم يوجد مفتاح API، تعيد زمن إضافي وهمي (mock).
-    لاحقاً: يمكن ربطها فعلياً مع Google Directions API.
+    جلب بيانات الازدحام المروري بين نقطتين عبر المزود الحالي (Google Directions API أو mock).
     تعيد: زمن إضافي تقديري (بالثواني)
     """
-    GOOGLE_API_KEY = os.getenv("GOOGLE_TRAFFIC_API_KEY")
-    if not GOOGLE_API_KEY:
-        # Mock: زمن إضافي عشوائي بين 0 و 10 دقائق
-        import random
-        return random.randint(0, 600)
-    
-    url = (
-        f"https://maps.googleapis.com/maps/api/directions/json?"
-        f"origin={start_lat},{start_lng}&destination={end_lat},{end_lng}"
-        f"&departure_time=now&key={GOOGLE_API_KEY}"
-    )
-    try:
-        resp = requests.get(url, timeout=5)
-        data = resp.json()
-        if data.get("status") == "OK":
-            # نأخذ أول مسار
-            route = data["routes"][0]
-            leg = route["legs"][0]
-            duration = leg["duration"]["value"]  # زمن الرحلة بالثواني (بدون ازدحام)
-            duration_in_traffic = leg.get("duration_in_traffic", {}).get("value", duration)
-            extra = max(duration_in_traffic - duration, 0)
-            return extra
-        else:
-            return 0  # إذا فشل الطلب، لا نضيف زمن إضافي
-    except Exception:
-        return 0 
\ No newline at end of file
+    segment = TrafficSegment(None, None, None, start_lat, start_lng, end_lat, end_lng)
+    return current_provider().get_delay(segment)
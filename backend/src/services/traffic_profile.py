@@ -0,0 +1,253 @@
+"""
+Traffic Profile
+ملف ازدحام تاريخي لكل مقطع بين موقفين متتاليين على كل خط ولكل ساعة من الأسبوع (168 ساعة)،
+يبنى دون اتصال من سجلات makro_locations بعد مطابقتها مع route_paths،
+ويجيب عن زمن الازدحام من الذاكرة دون أي طلب خارجي
+"""
+
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.geo_math import project_onto_path
+from src.services.stop_index import StopIndex
+from src.services.traffic import TrafficProvider, TrafficSegment
+from src.config.routing_config import MAKRO_SPEED_MPS, TRAFFIC_PROFILE_UTC_OFFSET_HOURS
+
+HOURS_PER_WEEK = 7 * 24
+PROFILE_FORMAT_VERSION = 1
+
+# أقصى بعد لنقطة GPS عن مسار الخط حتى تعتبر عليه (متر)
+MATCH_METERS = 50.0
+
+# الفاصل المقبول بين نقطتين متتاليتين لنفس المكرو (ثانية)
+MIN_FIX_GAP_SECONDS = 5
+MAX_FIX_GAP_SECONDS = 300
+
+# عدد نقاط الرحلة المستخدمة لتحديد خط المكرو
+MATCH_SAMPLE_FIXES = 200
+
+# السرعات الأعلى من هذه القيمة قفزات GPS وليست حركة حقيقية (متر/ثانية)
+MAX_SPEED_MPS = 25.0
+
+
+def hour_of_week(moment: datetime, utc_offset_hours: int = TRAFFIC_PROFILE_UTC_OFFSET_HOURS) -> int:
+    """ساعة الأسبوع بالتوقيت المحلي (0 = الاثنين 00:00)؛ التوقيت بدون منطقة يعتبر UTC"""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    local = moment + timedelta(hours=utc_offset_hours)
+    return local.weekday() * 24 + local.hour
+
+
+class RouteProfile:
+    """زمن الازدحام التراكمي على تسلسل مواقف خط واحد: cum_delays[ساعة، موقع الموقف]"""
+
+    __slots__ = ("stop_ids", "stop_positions", "cum_delays")
+
+    def __init__(self, stop_ids: List[int], delays: np.ndarray):
+        self.stop_ids = list(stop_ids)
+        self.stop_positions = {stop_id: pos for pos, stop_id in enumerate(self.stop_ids)}
+        cum = np.zeros((HOURS_PER_WEEK, len(self.stop_ids)), dtype=np.float64)
+        cum[:, 1:] = np.cumsum(delays, axis=1)
+        self.cum_delays = cum
+
+    def delays(self) -> np.ndarray:
+        """زمن الازدحام لكل مقطع (ساعة، مقطع)"""
+        return np.diff(self.cum_delays, axis=1)
+
+    def delay(self, from_stop_id, to_stop_id, hour: int) -> Optional[float]:
+        a = self.stop_positions.get(from_stop_id)
+        b = self.stop_positions.get(to_stop_id)
+        if a is None or b is None:
+            return None
+        # الاتجاه المعاكس يسلك نفس الطريق
+        return abs(self.cum_delays[hour, b] - self.cum_delays[hour, a])
+
+
+class TrafficProfile:
+    """ملفات الازدحام لكل الخطوط، مع الحفظ والتحميل بصيغة npz"""
+
+    def __init__(self, routes: Dict[int, RouteProfile], utc_offset_hours: int = TRAFFIC_PROFILE_UTC_OFFSET_HOURS,
+                 built_at: Optional[float] = None):
+        self.routes = routes
+        self.utc_offset_hours = utc_offset_hours
+        self.built_at = built_at if built_at is not None else time.time()
+
+    def delay(self, route_id, from_stop_id, to_stop_id, hour: int) -> Optional[float]:
+        route = self.routes.get(route_id)
+        if route is None:
+            return None
+        return route.delay(from_stop_id, to_stop_id, hour)
+
+    def save(self, path: str):
+        arrays = {
+            "meta": np.array([PROFILE_FORMAT_VERSION, self.utc_offset_hours, self.built_at], dtype=np.float64),
+            "route_ids": np.array(list(self.routes), dtype=np.int64),
+        }
+        for route_id, route in self.routes.items():
+            arrays[f"stops_{route_id}"] = np.array(route.stop_ids, dtype=np.int64)
+            arrays[f"delays_{route_id}"] = route.delays().astype(np.float32)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "TrafficProfile":
+        with np.load(path) as data:
+            version, utc_offset_hours, built_at = data["meta"].tolist()
+            if int(version) != PROFILE_FORMAT_VERSION:
+                raise ValueError(f"صيغة ملف الازدحام غير مدعومة: {int(version)}")
+            routes = {
+                route_id: RouteProfile(data[f"stops_{route_id}"].tolist(), data[f"delays_{route_id}"])
+                for route_id in data["route_ids"].tolist()
+            }
+        return cls(routes, utc_offset_hours=int(utc_offset_hours), built_at=built_at)
+
+
+class ProfileTrafficDelayProvider(TrafficProvider):
+    """مزود زمن الازدحام من الملف التاريخي حسب ساعة الأسبوع الحالية (أو وقت الانطلاق)؛ يجيب محلياً دون كاش
+    أو طلبات شبكة"""
+
+    is_local = True
+    time_aware = True
+
+    def __init__(self, profile: TrafficProfile, clock=None):
+        self.profile = profile
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+
+    def get_delay(self, segment: TrafficSegment) -> int:
+        return self.get_delay_at(segment, self.clock())
+
+    def get_delay_at(self, segment: TrafficSegment, moment: datetime) -> int:
+        hour = hour_of_week(moment, self.profile.utc_offset_hours)
+        delay = self.profile.delay(segment.route_id, segment.from_stop_id, segment.to_stop_id, hour)
+        return int(delay) if delay is not None else 0
+
+
+def pattern_delays(network, profile: TrafficProfile, hour: int) -> List[List[float]]:
+    """زمن الازدحام التراكمي عند كل موقع في كل نمط من الشبكة لساعة معينة (لـ RAPTOR)"""
+    result = []
+    for pattern, stops in enumerate(network.pattern_stops):
+        route = profile.routes.get(network.route_ids[network.pattern_route[pattern]])
+        positions = [route.stop_positions.get(network.stop_ids[s]) for s in stops] if route is not None else [None]
+        if None in positions:
+            result.append([0.0] * len(stops))
+            continue
+        cum = route.cum_delays[hour, positions]
+        result.append(np.abs(cum - cum[0]).tolist())
+    return result
+
+
+# ==================== OFFLINE BUILD ====================
+
+class _RoutePath:
+    """مسار خط مع المسافة التراكمية عند كل نقطة، ومواقع مواقفه على المسار"""
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, stop_ids: List[int], stop_lats, stop_lngs):
+        self.lats = lats
+        self.lngs = lngs
+        self.stop_ids = stop_ids
+        # إسقاط كل موقف على المسار، مع إبقاء الترتيب متزايداً على طول المسار
+        self.stop_along = np.maximum.accumulate(project_onto_path(stop_lats, stop_lngs, lats, lngs)[0])
+        self.meters = np.zeros((HOURS_PER_WEEK, len(stop_ids) - 1))
+        self.seconds = np.zeros((HOURS_PER_WEEK, len(stop_ids) - 1))
+
+    def along(self, lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+        """(المسافة على المسار، البعد عن المسار) لكل نقطة GPS"""
+        return project_onto_path(lats, lngs, self.lats, self.lngs)
+
+    def add_sample(self, hour: int, start: float, end: float, speed: float):
+        """توزيع عينة سرعة على المقاطع بين المواقف التي يغطيها الامتداد [start, end]"""
+        lo, hi = min(start, end), max(start, end)
+        overlap = np.clip(np.minimum(self.stop_along[1:], hi) - np.maximum(self.stop_along[:-1], lo), 0.0, None)
+        self.meters[hour] += overlap
+        self.seconds[hour] += overlap / speed
+
+    def delays(self) -> np.ndarray:
+        """زمن الازدحام لكل (ساعة، مقطع): زمن العبور المرصود ناقص زمن العبور بالسرعة التقديرية.
+        الساعات بلا عينات تأخذ متوسط المقطع في كل الساعات، والمقاطع بلا عينات إطلاقاً صفراً.
+        """
+        lengths = np.diff(self.stop_along)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pace = self.seconds / self.meters
+            overall = self.seconds.sum(axis=0) / self.meters.sum(axis=0)
+        pace = np.where(self.meters > 0, pace, overall)
+        pace = np.nan_to_num(pace, nan=1.0 / MAKRO_SPEED_MPS)
+        return np.clip((pace - 1.0 / MAKRO_SPEED_MPS) * lengths, 0.0, None)
+
+
+def _route_paths(network) -> Dict[int, _RoutePath]:
+    """مسارات الخطوط التي لها نقاط مسار وتسلسل مواقف (الاتجاه الأول لكل خط)"""
+    paths = {}
+    for route, patterns in enumerate(network.route_patterns):
+        points = network.route_paths[route]
+        if not patterns or len(points) < 2:
+            continue
+        stops = network.pattern_stops[patterns[0]]
+        lats, lngs = (np.array(values) for values in zip(*points))
+        paths[route] = _RoutePath(
+            lats, lngs, [network.stop_ids[s] for s in stops],
+            [network.stop_lats[s] for s in stops], [network.stop_lngs[s] for s in stops]
+        )
+    return paths
+
+
+def _vertex_index(paths: Dict[int, _RoutePath]) -> StopIndex:
+    """فهرس مكاني لكل نقاط المسارات، كل نقطة مرتبطة بخطها"""
+    lats, lngs, routes = [], [], []
+    for route, path in paths.items():
+        lats.extend(path.lats.tolist())
+        lngs.extend(path.lngs.tolist())
+        routes.extend([(route,)] * len(path.lats))
+    return StopIndex(lats, lngs, routes)
+
+
+def _match_route(index: StopIndex, lats, lngs, match_meters: float) -> Optional[int]:
+    """الخط الأكثر تكراراً قرب نقاط رحلة المكرو (makro_id غير مرتبط بخط في قاعدة البيانات)"""
+    votes = Counter()
+    step = max(1, len(lats) // MATCH_SAMPLE_FIXES)
+    for lat, lng in zip(lats[::step], lngs[::step]):
+        routes = {index.routes_for(vertex)[0] for _, vertex in index.within(lat, lng, match_meters)}
+        votes.update(routes)
+    if not votes:
+        return None
+    return votes.most_common(1)[0][0]
+
+
+def build_profile(network, locations: Iterable[Tuple[str, datetime, float, float]],
+                  utc_offset_hours: int = TRAFFIC_PROFILE_UTC_OFFSET_HOURS,
+                  match_meters: float = MATCH_METERS) -> TrafficProfile:
+    """بناء ملف الازدحام من سجلات (makro_id، timestamp، lat، lng) مرتبة حسب makro_id ثم timestamp"""
+    paths = _route_paths(network)
+    index = _vertex_index(paths)
+
+    for _, fixes in groupby(locations, key=lambda row: row[0]):
+        fixes = list(fixes)
+        if len(fixes) < 2:
+            continue
+        lats = np.array([row[2] for row in fixes], dtype=np.float64)
+        lngs = np.array([row[3] for row in fixes], dtype=np.float64)
+        route = _match_route(index, lats, lngs, match_meters)
+        if route is None:
+            continue
+        path = paths[route]
+        along, offsets = path.along(lats, lngs)
+        for i in range(1, len(fixes)):
+            if offsets[i - 1] > match_meters or offsets[i] > match_meters:
+                continue
+            gap = (fixes[i][1] - fixes[i - 1][1]).total_seconds()
+            moved = abs(along[i] - along[i - 1])
+            if not MIN_FIX_GAP_SECONDS <= gap <= MAX_FIX_GAP_SECONDS or moved == 0:
+                continue
+            speed = moved / gap
+            if speed > MAX_SPEED_MPS:
+                continue
+            path.add_sample(hour_of_week(fixes[i - 1][1], utc_offset_hours), along[i - 1], along[i], speed)
+
+    routes = {
+        network.route_ids[route]: RouteProfile(path.stop_ids, path.delays())
+        for route, path in paths.items()
+    }
+    return TrafficProfile(routes, utc_offset_hours=utc_offset_hours)
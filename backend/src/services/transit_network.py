@@ -0,0 +1,539 @@
+"""
+Transit Network
+شبكة النقل المحملة في ذاكرة العملية (المواقف، الخطوط، تسلسل المواقف ونقاط المسار)
+تسمح بتنفيذ البحث دون أي استعلام لقاعدة البيانات
+"""
+
+import copy
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.models import models
+from src.services.stop_index import StopIndex
+import numpy as np
+
+from src.services.geo_math import consecutive_distances, haversine, project_onto_path
+from src.config.routing_config import (
+    BIDIRECTIONAL_ROUTES, NETWORK_TTL_SECONDS, NETWORK_SNAPSHOT_PATH, PATH_SNAP_MAX_METERS, FOOTPATH_MAX_METERS
+)
+
+
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+_HOURS_RANGE = re.compile(r"(\d{1,2})(?:[:.](\d{2}))?\s*(?:-|–|—|إلى)\s*(\d{1,2})(?:[:.](\d{2}))?")
+MINUTES_PER_DAY = 24 * 60
+
+ServiceHours = Optional[Tuple[Tuple[int, int], ...]]
+
+
+def parse_operating_hours(text: Optional[str]) -> ServiceHours:
+    """تحويل نص ساعات العمل (مثل "06:00-23:00" أو "6-14, 16-22" أو "22:00-02:00") إلى فترات
+    بالدقائق من بداية اليوم. تعيد None إذا كان الخط يعمل طوال اليوم أو تعذر فهم النص."""
+    if not text:
+        return None
+    intervals = []
+    for start_h, start_m, end_h, end_m in _HOURS_RANGE.findall(text.translate(ARABIC_DIGITS)):
+        start = int(start_h) * 60 + int(start_m or 0)
+        end = int(end_h) * 60 + int(end_m or 0)
+        if start > MINUTES_PER_DAY or end > MINUTES_PER_DAY or start == end:
+            return None
+        if start < end:
+            intervals.append((start, end))
+        else:
+            # فترة تمتد بعد منتصف الليل
+            intervals.extend([(start, MINUTES_PER_DAY), (0, end)])
+    return tuple(sorted(intervals)) or None
+
+
+def _order_key(order, row_id):
+    # stop_order / point_order قد تكون فارغة، عندها نعتمد ترتيب الإدخال
+    return (order is None, order if order is not None else 0, row_id)
+
+
+class TransitNetwork:
+    """تمثيل مضغوط لشبكة المكروهات
+
+    كل خط يتحول إلى نمط (pattern) أو نمطين (ذهاب وإياب): تسلسل مرتب من فهارس المواقف
+    مع المسافة التراكمية عند كل موقف، مقاسة على طول مسار الخط (route_paths) بعد إسقاط المواقف عليه،
+    أو بخطوط مستقيمة بين المواقف إذا لم يكن للخط مسار يمر بمواقفه.
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.built_at = time.time()
+        self.stale = False
+        # رقم آخر حدث تعديل (network_updates) متضمن في هذه النسخة
+        self.update_seq = 0
+        self.bidirectional = BIDIRECTIONAL_ROUTES
+
+        # المواقف (الفهرس الداخلي هو موقع الموقف في هذه القوائم)
+        self.stop_ids: List[int] = []
+        self.stop_names: List[str] = []
+        self.stop_lats: List[float] = []
+        self.stop_lngs: List[float] = []
+        self.stop_index: Dict[int, int] = {}
+
+        # الخطوط
+        self.route_ids: List[int] = []
+        self.route_names: List[str] = []
+        self.route_prices: List[int] = []
+        self.route_hours: List[Optional[str]] = []
+        # ساعات العمل بعد تحليلها: فترات بالدقائق من بداية اليوم، أو None إذا كان يعمل دائماً
+        self.route_service: List[ServiceHours] = []
+        self.route_index: Dict[int, int] = {}
+        self.route_paths: List[List[Tuple[float, float]]] = []
+        # المسافة التراكمية عند كل نقطة من مسار الخط (بالمتر)
+        self.route_path_meters: List[np.ndarray] = []
+        # أنماط كل خط الفعالة (النمط الأول هو اتجاه الذهاب)؛ أنماط الخطوط المعدلة القديمة تبقى خارجها
+        self.route_patterns: List[List[int]] = []
+
+        # الأنماط: (خط، اتجاه) مع تسلسل المواقف والمسافة التراكمية بالمتر
+        self.pattern_route: List[int] = []
+        self.pattern_stops: List[List[int]] = []
+        self.pattern_cum_meters: List[List[float]] = []
+
+        # لكل موقف: الأنماط التي تمر به مع موقعه ضمن كل نمط
+        self.stop_patterns: List[List[Tuple[int, int]]] = []
+
+        # الفهرس المكاني للمواقف
+        self.spatial_index: Optional[StopIndex] = None
+
+        # ممرات المشي للتبديل: لكل موقف [(فهرس موقف قريب على خط آخر، المسافة بالمتر)]
+        self.footpaths: List[List[Tuple[int, float]]] = []
+
+    @classmethod
+    def from_rows(cls, routes, stops, route_stops, route_paths, version: int = 0,
+                  bidirectional: bool = BIDIRECTIONAL_ROUTES, footpaths=None) -> "TransitNetwork":
+        """بناء الشبكة من صفوف خام
+
+        routes: (id, name, price, operating_hours)
+        stops: (id, name, lat, lng)
+        route_stops: (id, route_id, stop_id, stop_order)
+        route_paths: (id, route_id, lat, lng, point_order)
+        footpaths: (from_stop_id, to_stop_id, distance_meters) من جدول stop_footpaths،
+                   أو None لحسابها من الفهرس المكاني عند البناء
+        """
+        network = cls(version=version)
+        network.bidirectional = bidirectional
+
+        for stop_id, name, lat, lng in stops:
+            network.stop_index[stop_id] = len(network.stop_ids)
+            network.stop_ids.append(stop_id)
+            network.stop_names.append(name)
+            network.stop_lats.append(float(lat))
+            network.stop_lngs.append(float(lng))
+            network.stop_patterns.append([])
+
+        for route_id, name, price, operating_hours in routes:
+            network.route_index[route_id] = len(network.route_ids)
+            network.route_ids.append(route_id)
+            network.route_names.append(name)
+            network.route_prices.append(price or 0)
+            network.route_hours.append(operating_hours)
+            network.route_service.append(parse_operating_hours(operating_hours))
+            network.route_paths.append([])
+            network.route_path_meters.append(np.zeros(0))
+            network.route_patterns.append([])
+
+        paths_by_route = defaultdict(list)
+        for row in route_paths:
+            if row[1] in network.route_index:
+                paths_by_route[row[1]].append(row)
+        for route_id, rows in paths_by_route.items():
+            network._set_path(network.route_index[route_id], rows)
+
+        stops_by_route = defaultdict(list)
+        for row in route_stops:
+            if row[1] in network.route_index:
+                stops_by_route[row[1]].append(row)
+        for route_id in network.route_ids:
+            route_idx = network.route_index[route_id]
+            network._add_patterns(route_idx, network._sequence(stops_by_route.get(route_id, [])))
+
+        network.spatial_index = StopIndex.from_network(network)
+        network.set_footpaths(network.compute_footpaths() if footpaths is None else footpaths)
+        return network
+
+    def _set_path(self, route_idx: int, rows):
+        """نقاط مسار الخط من صفوف route_paths: (id, route_id, lat, lng, point_order)"""
+        points = sorted((_order_key(point_order, row_id), float(lat), float(lng))
+                        for row_id, _, lat, lng, point_order in rows)
+        self.route_paths[route_idx] = [(lat, lng) for _, lat, lng in points]
+        if points:
+            hops = consecutive_distances([lat for _, lat, _ in points], [lng for _, _, lng in points])
+            self.route_path_meters[route_idx] = np.concatenate(([0.0], np.cumsum(hops)))
+        else:
+            self.route_path_meters[route_idx] = np.zeros(0)
+
+    def _sequence(self, rows) -> List[int]:
+        """تسلسل فهارس مواقف الخط من صفوف route_stops: (id, route_id, stop_id, stop_order)"""
+        rows = sorted(rows, key=lambda row: _order_key(row[3], row[0]))
+        ordered = [self.stop_index[row[2]] for row in rows if row[2] in self.stop_index]
+        # إزالة التكرار المتتالي لنفس الموقف
+        return [s for i, s in enumerate(ordered) if i == 0 or s != ordered[i - 1]]
+
+    def _add_patterns(self, route_idx: int, sequence: List[int]):
+        """نمط الذهاب (ونمط الإياب إن كانت الخطوط باتجاهين) لتسلسل مواقف خط"""
+        if len(sequence) < 2:
+            return
+        along = self._along_path(route_idx, sequence)
+        self._add_pattern(route_idx, sequence, along)
+        if self.bidirectional:
+            self._add_pattern(route_idx, sequence[::-1], along[::-1] if along is not None else None)
+
+    def _footpaths_from(self, stop: int, max_meters: float = FOOTPATH_MAX_METERS) -> List[Tuple[int, float]]:
+        """المواقف المخدومة ضمن مسافة المشي التي تتيح خطاً لا يمر بالموقف: [(فهرس الموقف، المسافة بالمتر)]"""
+        index = self.spatial_index
+        if not index.served[stop]:
+            return []
+        routes = set(index.routes_for(stop))
+        return [
+            (other, meters)
+            for meters, other in index.within(self.stop_lats[stop], self.stop_lngs[stop], max_meters, served_only=True)
+            if other != stop and not routes.issuperset(index.routes_for(other))
+        ]
+
+    def compute_footpaths(self, max_meters: float = FOOTPATH_MAX_METERS) -> List[Tuple[int, int, float]]:
+        """كل أزواج المواقف المخدومة ضمن مسافة المشي، حيث يتيح الموقف الثاني خطاً لا يمر بالأول:
+        [(from_stop_id, to_stop_id, distance_meters)]"""
+        return [
+            (self.stop_ids[stop], self.stop_ids[other], meters)
+            for stop in range(len(self.stop_ids))
+            for other, meters in self._footpaths_from(stop, max_meters)
+        ]
+
+    def set_footpaths(self, rows):
+        self.footpaths = [[] for _ in self.stop_ids]
+        for from_stop_id, to_stop_id, meters in rows:
+            a = self.stop_index.get(from_stop_id)
+            b = self.stop_index.get(to_stop_id)
+            if a is not None and b is not None:
+                self.footpaths[a].append((b, float(meters)))
+
+    def transfer_meters(self, a: int, b: int) -> float:
+        """مسافة المشي بين موقف النزول وموقف الصعود التالي"""
+        if a == b:
+            return 0.0
+        for other, meters in self.footpaths[a]:
+            if other == b:
+                return meters
+        return self.distance_between_stops(a, b)
+
+    def _along_path(self, route_idx: int, sequence: List[int]) -> Optional[np.ndarray]:
+        """موقع كل موقف على طول مسار الخط، أو None إذا كان المسار لا يمر قرب كل المواقف"""
+        points = self.route_paths[route_idx]
+        if len(points) < 2:
+            return None
+        path_lats, path_lngs = zip(*points)
+        along, offsets = project_onto_path(
+            [self.stop_lats[s] for s in sequence], [self.stop_lngs[s] for s in sequence], path_lats, path_lngs
+        )
+        if offsets.max() > PATH_SNAP_MAX_METERS:
+            return None
+        return along
+
+    def _add_pattern(self, route_idx: int, sequence: List[int], along: Optional[np.ndarray] = None):
+        pattern = len(self.pattern_route)
+        if along is not None:
+            # المسار قد يكون مرسوماً بعكس ترتيب المواقف؛ والمواقع غير المتزايدة (أخطاء رسم) تثبت عند سابقتها
+            along = along if along[-1] >= along[0] else -along
+            along = np.maximum.accumulate(along)
+            cum = (along - along[0]).tolist()
+        else:
+            hops = consecutive_distances([self.stop_lats[s] for s in sequence], [self.stop_lngs[s] for s in sequence])
+            cum = [0.0] + hops.cumsum().tolist()
+        self.pattern_route.append(route_idx)
+        self.pattern_stops.append(sequence)
+        self.pattern_cum_meters.append(cum)
+        self.route_patterns[route_idx].append(pattern)
+        for pos, stop in enumerate(sequence):
+            self.stop_patterns[stop].append((pattern, pos))
+
+    def distance_between_stops(self, a: int, b: int) -> float:
+        return float(haversine(self.stop_lats[a], self.stop_lngs[a], self.stop_lats[b], self.stop_lngs[b]))
+
+    def stop_coords(self, stop: int) -> Tuple[float, float]:
+        return self.stop_lats[stop], self.stop_lngs[stop]
+
+    def is_served(self, stop: int) -> bool:
+        """هل يمر أي خط بهذا الموقف"""
+        return bool(self.stop_patterns[stop])
+
+    def find_leg(self, route: int, board: int, alight: int) -> Optional[Tuple[int, int, int]]:
+        """إيجاد (نمط، موقع الصعود، موقع النزول) لركوب الخط route من الموقف board إلى alight"""
+        alight_positions = {pattern: pos for pattern, pos in self.stop_patterns[alight]}
+        for pattern, board_pos in self.stop_patterns[board]:
+            if self.pattern_route[pattern] != route:
+                continue
+            alight_pos = alight_positions.get(pattern)
+            if alight_pos is not None and alight_pos > board_pos:
+                return pattern, board_pos, alight_pos
+        return None
+
+    def ride_meters(self, pattern: int, board_pos: int, alight_pos: int) -> float:
+        """مسافة الركوب على طول مسار الخط بين موقعين في النمط (فرق قيمتين محسوبتين مسبقاً)"""
+        cum = self.pattern_cum_meters[pattern]
+        return cum[alight_pos] - cum[board_pos]
+
+    def closed_routes(self, minute_of_day: float) -> frozenset:
+        """الخطوط (فهارس داخلية) المتوقفة في دقيقة معينة من اليوم"""
+        closed = []
+        for route, intervals in enumerate(self.route_service):
+            if intervals is not None and not any(start <= minute_of_day < end for start, end in intervals):
+                closed.append(route)
+        return frozenset(closed)
+
+    def patched(self, routes=(), stops=(), route_stops=(), route_paths=(), removed_routes=(), removed_stops=(),
+                version: Optional[int] = None) -> "TransitNetwork":
+        """نسخة من الشبكة بعد تعديل خطوط ومواقف محددة، دون إعادة بناء الباقي
+
+        routes / stops: صفوف الخطوط والمواقف الجديدة أو المعدلة (بصيغة from_rows)
+        route_stops / route_paths: كل صفوف الخطوط الواردة في routes (تحل محل تسلسلها ومسارها)
+        removed_routes / removed_stops: معرفات محذوفة
+
+        القوائم تنسخ سطحياً والقوائم الداخلية المعدلة تستبدل ولا تعدل، فالبحث الجاري على النسخة الحالية
+        لا يتأثر. أنماط الخطوط المعدلة القديمة تبقى في القوائم دون أن تمر بها أي مواقف، حتى إعادة البناء التالية.
+        """
+        net = copy.copy(self)
+        for name in ("stop_ids", "stop_names", "stop_lats", "stop_lngs", "route_ids", "route_names", "route_prices",
+                     "route_hours", "route_service", "route_paths", "route_path_meters", "route_patterns",
+                     "pattern_route", "pattern_stops", "pattern_cum_meters", "stop_patterns", "footpaths"):
+            setattr(net, name, list(getattr(self, name)))
+        net.stop_index = dict(self.stop_index)
+        net.route_index = dict(self.route_index)
+        net.version = self.version + 1 if version is None else version
+        net.stale = False
+
+        # المواقف: {فهرس: إحداثيات جديدة، أو None إذا حذف}
+        moved: Dict[int, Optional[Tuple[float, float]]] = {}
+        for stop_id, name, lat, lng in stops:
+            stop = net.stop_index.get(stop_id)
+            if stop is None:
+                stop = net.stop_index[stop_id] = len(net.stop_ids)
+                net.stop_ids.append(stop_id)
+                net.stop_names.append(name)
+                net.stop_lats.append(float(lat))
+                net.stop_lngs.append(float(lng))
+                net.stop_patterns.append([])
+                net.footpaths.append([])
+            else:
+                net.stop_names[stop] = name
+                if (float(lat), float(lng)) == net.stop_coords(stop):
+                    continue
+                net.stop_lats[stop], net.stop_lngs[stop] = float(lat), float(lng)
+            moved[stop] = (float(lat), float(lng))
+        for stop_id in removed_stops:
+            stop = net.stop_index.pop(stop_id, None)
+            if stop is not None:
+                moved[stop] = None
+
+        # الخطوط المعدلة مع تسلسل مواقفها الجديد
+        rows_by_route = defaultdict(list)
+        for row in route_stops:
+            rows_by_route[row[1]].append(row)
+        paths_by_route = defaultdict(list)
+        for row in route_paths:
+            paths_by_route[row[1]].append(row)
+        sequences: Dict[int, List[int]] = {}
+        for route_id, name, price, operating_hours in routes:
+            route = net.route_index.get(route_id)
+            if route is None:
+                route = net.route_index[route_id] = len(net.route_ids)
+                for values in (net.route_ids, net.route_names, net.route_prices, net.route_hours, net.route_service,
+                               net.route_paths, net.route_path_meters, net.route_patterns):
+                    values.append(None)
+                net.route_ids[route] = route_id
+                net.route_patterns[route] = []
+            net.route_names[route] = name
+            net.route_prices[route] = price or 0
+            net.route_hours[route] = operating_hours
+            net.route_service[route] = parse_operating_hours(operating_hours)
+            net._set_path(route, paths_by_route.get(route_id, []))
+            sequences[route] = net._sequence(rows_by_route.get(route_id, []))
+        for route_id in removed_routes:
+            route = net.route_index.pop(route_id, None)
+            if route is not None:
+                sequences[route] = []
+        # الخطوط المارة بمواقف نقلت أو حذفت: نفس التسلسل بالإحداثيات الجديدة
+        for stop in moved:
+            for pattern, _ in (self.stop_patterns[stop] if stop < len(self.stop_patterns) else []):
+                route = self.pattern_route[pattern]
+                if route not in sequences:
+                    forward = self.pattern_stops[self.route_patterns[route][0]]
+                    sequences[route] = [s for s in forward if moved.get(s, True) is not None]
+
+        touched = set(moved)
+        for route, sequence in sequences.items():
+            for pattern in (self.route_patterns[route] if route < len(self.route_patterns) else []):
+                for stop in self.pattern_stops[pattern]:
+                    touched.add(stop)
+                    net.stop_patterns[stop] = [entry for entry in net.stop_patterns[stop] if entry[0] != pattern]
+            net.route_patterns[route] = []
+            for stop in sequence:
+                touched.add(stop)
+                net.stop_patterns[stop] = list(net.stop_patterns[stop])
+            net._add_patterns(route, [s for i, s in enumerate(sequence) if i == 0 or s != sequence[i - 1]])
+
+        stop_routes = {
+            stop: tuple(sorted({net.pattern_route[pattern] for pattern, _ in net.stop_patterns[stop]}))
+            for stop in touched
+        }
+        net.spatial_index = self.spatial_index.updated(moved, stop_routes)
+
+        # ممرات المشي من المواقف المتأثرة ومن جيرانها (حول الموقع القديم والجديد)
+        recompute = set(touched)
+        for stop in touched:
+            if stop < len(self.stop_ids):
+                recompute.update(other for _, other in self.spatial_index.within(
+                    *self.stop_coords(stop), FOOTPATH_MAX_METERS, served_only=True))
+            if moved.get(stop, True) is not None:
+                recompute.update(other for _, other in net.spatial_index.within(
+                    *net.stop_coords(stop), FOOTPATH_MAX_METERS, served_only=True))
+        for stop in recompute:
+            net.footpaths[stop] = [] if moved.get(stop, True) is None else net._footpaths_from(stop)
+        return net
+
+    def __getstate__(self):
+        """للإرسال إلى عمليات أخرى (travel_matrix): الشبكة المحملة من لقطة تحمل نوافذ memoryview على الملف
+        (ومجموعاتها في القوائم بعد patched) ولا تسلسل، فتنسخ المجموعات قوائم"""
+        state = self.__dict__.copy()
+        for name in ("route_paths", "pattern_stops", "pattern_cum_meters", "footpaths"):
+            state[name] = [list(group) for group in state[name]]
+        return state
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "version": self.version,
+            "update_seq": self.update_seq,
+            "stops": len(self.stop_index),
+            "routes": len(self.route_index),
+            "patterns": sum(len(patterns) for patterns in self.route_patterns),
+            "footpaths": sum(len(paths) for paths in self.footpaths),
+        }
+
+
+def load_network(db: Session, version: int = 0) -> TransitNetwork:
+    """تحميل الشبكة كاملة بخمسة استعلامات فقط"""
+    routes = db.query(models.Route.id, models.Route.name, models.Route.price, models.Route.operating_hours).all()
+    stops = db.query(models.Stop.id, models.Stop.name, models.Stop.lat, models.Stop.lng).all()
+    route_stops = db.query(
+        models.RouteStop.id, models.RouteStop.route_id, models.RouteStop.stop_id, models.RouteStop.stop_order
+    ).all()
+    route_paths = db.query(
+        models.RoutePath.id, models.RoutePath.route_id, models.RoutePath.lat, models.RoutePath.lng,
+        models.RoutePath.point_order
+    ).all()
+    footpaths = db.query(
+        models.StopFootpath.from_stop_id, models.StopFootpath.to_stop_id, models.StopFootpath.distance_meters
+    ).all()
+    # جدول فارغ (لم يشغّل scripts/build_footpaths.py بعد): تحسب الممرات عند البناء
+    return TransitNetwork.from_rows(routes, stops, route_stops, route_paths, version=version,
+                                    footpaths=footpaths or None)
+
+
+def load_changes(db: Session, route_ids=(), stop_ids=()) -> dict:
+    """صفوف الخطوط والمواقف المعدلة فقط (مع مواقف تلك الخطوط)، بالصيغة التي يقبلها TransitNetwork.patched"""
+    route_ids, stop_ids = set(route_ids), set(stop_ids)
+    routes = db.query(models.Route.id, models.Route.name, models.Route.price, models.Route.operating_hours).filter(
+        models.Route.id.in_(route_ids)).all()
+    route_stops = db.query(
+        models.RouteStop.id, models.RouteStop.route_id, models.RouteStop.stop_id, models.RouteStop.stop_order
+    ).filter(models.RouteStop.route_id.in_(route_ids)).all()
+    route_paths = db.query(
+        models.RoutePath.id, models.RoutePath.route_id, models.RoutePath.lat, models.RoutePath.lng,
+        models.RoutePath.point_order
+    ).filter(models.RoutePath.route_id.in_(route_ids)).all()
+    wanted = stop_ids | {row[2] for row in route_stops}
+    stops = db.query(models.Stop.id, models.Stop.name, models.Stop.lat, models.Stop.lng).filter(
+        models.Stop.id.in_(wanted)).all()
+    return {
+        "routes": routes,
+        "stops": stops,
+        "route_stops": route_stops,
+        "route_paths": route_paths,
+        "removed_routes": route_ids - {row[0] for row in routes},
+        "removed_stops": stop_ids - {row[0] for row in stops},
+    }
+
+
+# ==================== PROCESS-WIDE NETWORK ====================
+
+_network: Optional[TransitNetwork] = None
+_network_lock = threading.Lock()
+
+
+def _is_fresh(network: Optional[TransitNetwork]) -> bool:
+    return network is not None and not network.stale and time.time() - network.built_at < NETWORK_TTL_SECONDS
+
+
+def get_network() -> TransitNetwork:
+    """إرجاع الشبكة المحملة في العملية، وإعادة بنائها عند انتهاء صلاحيتها"""
+    global _network
+    network = _network
+    if _is_fresh(network):
+        return network
+    # إذا كانت هناك نسخة قديمة وعملية بناء جارية، نستمر بالنسخة القديمة بدل الانتظار
+    if not _network_lock.acquire(blocking=network is None):
+        return network
+    try:
+        if _network is None and os.path.exists(NETWORK_SNAPSHOT_PATH):
+            # بدء العملية: اللقطة الثنائية أسرع بكثير من البناء من قاعدة البيانات
+            from src.services.network_snapshot import load_snapshot
+            try:
+                _network = load_snapshot(NETWORK_SNAPSHOT_PATH, version=1)
+                logging.info(f"Transit network loaded from snapshot {NETWORK_SNAPSHOT_PATH}: {_network.stats()}")
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Network snapshot unavailable ({NETWORK_SNAPSHOT_PATH}): {e}")
+        if not _is_fresh(_network):
+            from config.database import SessionLocal
+            from src.services.network_updates import current_seq
+            db = SessionLocal()
+            try:
+                version = _network.version + 1 if _network is not None else 1
+                # رقم التحديث يقرأ قبل الاستعلامات: أي تعديل بعده يطبق مرة أخرى (التطبيق متكرر بأمان)
+                update_seq = current_seq()
+                _network = load_network(db, version=version)
+                _network.update_seq = update_seq
+                logging.info(f"Transit network loaded: {_network.stats()}")
+            finally:
+                db.close()
+        from src.services.network_updates import start_listener
+        start_listener()
+        return _network
+    finally:
+        _network_lock.release()
+
+
+def set_network(network: Optional[TransitNetwork]):
+    """استبدال الشبكة الحالية (للاختبارات أو عند التحميل من مصدر آخر)"""
+    global _network
+    with _network_lock:
+        _network = network
+
+
+def peek_network() -> Optional[TransitNetwork]:
+    """الشبكة الحالية دون تحميلها"""
+    return _network
+
+
+def swap_network(current: TransitNetwork, network: TransitNetwork) -> bool:
+    """استبدال الشبكة بنسخة معدلة منها، فقط إن لم تستبدل منذ قراءتها (مثلاً بإعادة بناء كاملة)"""
+    global _network
+    with _network_lock:
+        if _network is not current:
+            return False
+        _network = network
+        return True
+
+
+def invalidate_network():
+    """وسم الشبكة الحالية كقديمة ليعاد بناؤها (مع الفهرس المكاني) عند البحث التالي"""
+    network = _network
+    if network is not None:
+        network.stale = True
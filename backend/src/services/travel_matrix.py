@@ -0,0 +1,123 @@
+"""
+Travel Matrix
+مصفوفة أزمنة الرحلة (مكرو + مشي) بين عدة نقاط بداية وعدة وجهات على الشبكة المحملة في الذاكرة:
+بحث RAPTOR واحد من كل نقطة بداية إلى كل المواقف، موزعاً على مجموعة عمليات
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.transit_network import TransitNetwork
+from src.services.raptor import earliest_arrivals
+from src.services.geo_math import haversine_many_to_many
+from src.services.traffic import current_provider
+from src.config.routing_config import (
+    WALK_SPEED_MPS, MAX_WALK_METERS, MATRIX_MAX_SECONDS, MATRIX_WORKERS, MATRIX_PARALLEL_MIN_ORIGINS
+)
+
+Point = Tuple[float, float]
+
+# مجموعة العمليات تحمل نسخة من الشبكة منذ إنشائها، وتستبدل عند تغير نسخة الشبكة
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_version: Optional[int] = None
+_pool_lock = threading.Lock()
+_worker_network: Optional[TransitNetwork] = None
+
+
+def _init_worker(network: TransitNetwork):
+    global _worker_network
+    _worker_network = network
+
+
+def _get_pool(network: TransitNetwork) -> ProcessPoolExecutor:
+    global _pool, _pool_version
+    with _pool_lock:
+        if _pool is None or _pool_version != network.version:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn صراحة على كل الأنظمة: fork لعملية فيها خيوط (مستمع التعديلات، كاتب السجلات) غير آمن،
+            # والشبكة ترسل مسلسلة (TransitNetwork.__getstate__) مرة لكل عملية عند بدئها
+            _pool = ProcessPoolExecutor(max_workers=MATRIX_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker, initargs=(network,))
+            _pool_version = network.version
+            logging.info(f"Travel matrix pool started for network version {network.version}")
+        return _pool
+
+
+def _walk_links(network: TransitNetwork, points: Sequence[Point]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """لكل نقطة: (فهارس المواقف ضمن مسافة المشي، زمن المشي إليها بالثواني)"""
+    links = []
+    for lat, lng in points:
+        found = network.spatial_index.within(lat, lng, MAX_WALK_METERS, served_only=True)
+        stops = np.array([stop for _, stop in found], dtype=np.int64)
+        seconds = np.array([meters for meters, _ in found], dtype=np.float64) / WALK_SPEED_MPS
+        links.append((stops, seconds))
+    return links
+
+
+def _rows(network: TransitNetwork, origins: Sequence[Point], destinations: Sequence[Point],
+          pattern_delays, max_seconds: float) -> np.ndarray:
+    """صفوف المصفوفة لمجموعة من نقاط البداية (inf = غير ممكن خلال max_seconds)"""
+    # مواقف كل الوجهات في مصفوفة واحدة، مع بداية مجموعة كل وجهة لها مواقف قريبة
+    egress = _walk_links(network, destinations)
+    reachable = np.array([j for j, (stops, _) in enumerate(egress) if len(stops)], dtype=np.int64)
+    flat_stops = np.concatenate([egress[j][0] for j in reachable]) if len(reachable) else np.zeros(0, np.int64)
+    flat_seconds = np.concatenate([egress[j][1] for j in reachable]) if len(reachable) else np.zeros(0)
+    starts = np.cumsum([0] + [len(egress[j][0]) for j in reachable[:-1]]) if len(reachable) else None
+
+    # المشي المباشر بين نقطة البداية والوجهة دون مكرو
+    direct = haversine_many_to_many(
+        [p[0] for p in origins], [p[1] for p in origins], [p[0] for p in destinations], [p[1] for p in destinations]
+    )
+    rows = np.where(direct <= MAX_WALK_METERS, direct / WALK_SPEED_MPS, np.inf)
+    for i, (stops, seconds) in enumerate(_walk_links(network, origins)):
+        if not len(stops) or starts is None:
+            continue
+        best = np.asarray(earliest_arrivals(
+            network, dict(zip(stops.tolist(), seconds.tolist())), max_seconds=max_seconds,
+            pattern_delays=pattern_delays
+        ))
+        via_stops = np.minimum.reduceat(best[flat_stops] + flat_seconds, starts)
+        rows[i, reachable] = np.minimum(rows[i, reachable], via_stops)
+    rows[rows > max_seconds] = np.inf
+    return rows
+
+
+def _worker_rows(origins, destinations, pattern_delays, max_seconds) -> np.ndarray:
+    return _rows(_worker_network, origins, destinations, pattern_delays, max_seconds)
+
+
+def _current_pattern_delays(network: TransitNetwork):
+    """زمن الازدحام من الملف التاريخي إن كان هو المزود الحالي؛ المزودات الخارجية لا تستخدم
+    هنا لأن المصفوفة تحتاج زمن كل مقطع على كل خط"""
+    from src.services.traffic_profile import ProfileTrafficDelayProvider, hour_of_week, pattern_delays
+    provider = current_provider()
+    if not isinstance(provider, ProfileTrafficDelayProvider):
+        return None
+    hour = hour_of_week(datetime.now(timezone.utc), provider.profile.utc_offset_hours)
+    return pattern_delays(network, provider.profile, hour)
+
+
+def compute_matrix(network: TransitNetwork, origins: Sequence[Point], destinations: Sequence[Point],
+                   max_seconds: float = MATRIX_MAX_SECONDS, parallel: Optional[bool] = None) -> List[List[Optional[int]]]:
+    """مصفوفة الأزمنة بالثواني [نقطة بداية][وجهة]، و None للأزواج غير الممكنة"""
+    origins = [tuple(p) for p in origins]
+    destinations = [tuple(p) for p in destinations]
+    delays = _current_pattern_delays(network)
+    if parallel is None:
+        parallel = len(origins) >= MATRIX_PARALLEL_MIN_ORIGINS and MATRIX_WORKERS > 1
+    if parallel:
+        pool = _get_pool(network)
+        size = -(-len(origins) // (MATRIX_WORKERS * 4))
+        chunks = [origins[i:i + size] for i in range(0, len(origins), size)]
+        futures = [pool.submit(_worker_rows, chunk, destinations, delays, max_seconds) for chunk in chunks]
+        matrix = np.vstack([future.result() for future in futures])
+    else:
+        matrix = _rows(network, origins, destinations, delays, max_seconds)
+    return [[int(v) if np.isfinite(v) else None for v in row] for row in matrix.tolist()]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+from src.services import geo_math
+
+POINTS = [(33.500, 36.300), (33.513, 36.292), (33.480, 36.350), (33.520, 36.280)]
+LATS = [p[0] for p in POINTS]
+LNGS = [p[1] for p in POINTS]
+
+
+def test_haversine_close_to_geodesic():
+    for a in POINTS:
+        for b in POINTS:
+            expected = geodesic(a, b).meters
+            assert float(geo_math.haversine(*a, *b)) == pytest.approx(expected, rel=5e-3, abs=1e-6)
+
+
+def test_one_to_many_matches_scalar():
+    distances = geo_math.haversine_one_to_many(33.5, 36.3, LATS, LNGS)
+    assert distances.shape == (4,)
+    assert distances[0] == pytest.approx(0.0)
+    for i, (lat, lng) in enumerate(POINTS):
+        assert distances[i] == pytest.approx(float(geo_math.haversine(33.5, 36.3, lat, lng)))
+
+
+def test_many_to_many_shape_and_symmetry():
+    matrix = geo_math.haversine_many_to_many(LATS, LNGS, LATS, LNGS)
+    assert matrix.shape == (4, 4)
+    assert np.allclose(matrix, matrix.T)
+    assert np.allclose(np.diag(matrix), 0.0)
+    rect = geo_math.haversine_many_to_many(LATS[:2], LNGS[:2], LATS, LNGS)
+    assert rect.shape == (2, 4)
+
+
+def test_equirectangular_close_to_haversine_in_city():
+    exact = geo_math.haversine_many_to_many(LATS, LNGS, LATS, LNGS)
+    approx = geo_math.equirectangular_many_to_many(LATS, LNGS, LATS, LNGS)
+    assert np.allclose(approx, exact, rtol=1e-3, atol=1e-6)
+
+
+def test_consecutive_distances_and_bounding_box():
+    hops = geo_math.consecutive_distances(LATS, LNGS)
+    assert len(hops) == 3
+    assert hops[0] == pytest.approx(float(geo_math.haversine(*POINTS[0], *POINTS[1])))
+    min_lat, min_lng, max_lat, max_lng = geo_math.bounding_box(33.5, 36.3, 1000)
+    assert float(geo_math.haversine(33.5, 36.3, max_lat, 36.3)) == pytest.approx(1000, rel=1e-2)
+    assert min_lat < 33.5 < max_lat and min_lng < 36.3 < max_lng
+
+
+def test_project_onto_path():
+    # مسار على شكل L: شمالاً ثم شرقاً
+    path_lats, path_lngs = [33.50, 33.51, 33.51], [36.30, 36.30, 36.31]
+    first = float(geo_math.haversine(33.50, 36.30, 33.51, 36.30))
+    along, offsets = geo_math.project_onto_path([33.505, 33.5105], [36.3001, 36.305], path_lats, path_lngs)
+    assert along[0] == pytest.approx(first / 2, rel=1e-2)
+    assert offsets[0] == pytest.approx(float(geo_math.haversine(33.505, 36.30, 33.505, 36.3001)), rel=1e-2)
+    assert along[1] == pytest.approx(first + float(geo_math.haversine(33.51, 36.30, 33.51, 36.305)), rel=1e-2)
+    # النقاط قبل بداية المسار تسقط على بدايته
+    along, _ = geo_math.project_onto_path([33.49], [36.30], path_lats, path_lngs)
+    assert along[0] == 0
+
+
+def test_geohash_encode():
+    # قيم مرجعية معروفة
+    assert geo_math.geohash_encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geo_math.geohash_encode(33.5, 36.3, 7).startswith(geo_math.geohash_encode(33.5, 36.3, 5))
+    # نقطتان على بعد متر واحد تقعان غالباً في نفس الخلية
+    assert geo_math.geohash_encode(33.50012, 36.30012, 7) == geo_math.geohash_encode(33.50013, 36.30013, 7)
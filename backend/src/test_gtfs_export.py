@@ -0,0 +1,68 @@
+import io
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from src.services import gtfs_export
+from src.services.network_import import import_records, read_csv, read_gtfs
+from src.test_network_import import CSV, SCHEMA, db  # noqa: F401
+
+
+@pytest.fixture(autouse=True)
+def agency_url(monkeypatch):
+    monkeypatch.setattr(gtfs_export, "GTFS_AGENCY_URL", "https://makroji.example")
+
+
+def test_feed_round_trips_through_importer(db, tmp_path):
+    import_records(db, read_csv(io.StringIO(CSV)))
+    db.execute(text("UPDATE routes SET operating_hours = '06:00-22:00' WHERE name = 'خط 1'"))
+    db.execute(text("INSERT INTO route_paths (route_id, lat, lng, point_order) SELECT id, 33.51, 36.29, 1 FROM routes"))
+    db.commit()
+    path = str(tmp_path / "feed.zip")
+    counts = gtfs_export.write_feed(db, path, year=2025)
+    assert counts["trips"] == 4 and counts["stop_times"] == 8
+
+    with zipfile.ZipFile(path) as archive:
+        frequencies = archive.read("frequencies.txt").decode().splitlines()
+        assert "06:00:00,22:00:00" in next(line for line in frequencies if line.startswith("1_0"))
+        assert archive.read("agency.txt").decode().splitlines()[1].split(",")[2] == "https://makroji.example"
+        assert archive.read("stop_times.txt").decode().splitlines()[1].startswith("1_0,00:00:00,00:00:00,")
+
+    # الملف يستورد بنفس المواقف وترتيبها
+    with Session(create_engine("sqlite://")) as copy:
+        for statement in SCHEMA:
+            copy.execute(text(statement))
+        report = import_records(copy, read_gtfs(path))
+        assert report["stops"]["inserted"] == 3 and report["route_stops"]["unmatched"] == 0
+        names = copy.execute(text("""SELECT s.name FROM route_stops rs JOIN stops s ON s.id = rs.stop_id
+                                     JOIN routes r ON r.id = rs.route_id WHERE r.name = 'خط 2'
+                                     ORDER BY rs.stop_order""")).scalars().all()
+        assert names == ["المرجة", "باب توما"]
+
+    # الأرشيف حتمي
+    gtfs_export.write_feed(db, str(tmp_path / "again.zip"), year=2025)
+    assert (tmp_path / "again.zip").read_bytes() == (tmp_path / "feed.zip").read_bytes()
+
+
+def test_feed_regenerated_only_when_network_changes(db, tmp_path, monkeypatch):
+    seq = [5]
+    monkeypatch.setattr(gtfs_export, "current_seq", lambda: seq[0])
+    generated = []
+    write_feed = gtfs_export.write_feed
+    monkeypatch.setattr(gtfs_export, "write_feed", lambda *args: generated.append(1) or write_feed(*args))
+    factory = lambda: Session(db.get_bind())  # noqa: E731
+
+    first = gtfs_export.get_feed(factory, str(tmp_path))
+    assert gtfs_export.get_feed(factory, str(tmp_path)) == first and len(generated) == 1
+    seq[0] = 6
+    second = gtfs_export.get_feed(factory, str(tmp_path))
+    # نفس البيانات: نفس البصمة
+    assert len(generated) == 2 and second["seq"] == 6 and second["etag"] == first["etag"]
+
+
+def test_feed_refused_without_agency_url(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(gtfs_export, "GTFS_AGENCY_URL", "")
+    with pytest.raises(ValueError, match="agency_url"):
+        gtfs_export.write_feed(db, str(tmp_path / "feed.zip"))
+    assert not (tmp_path / "feed.zip").exists()
@@ -0,0 +1,37 @@
+from shapely.geometry import Point, shape
+
+from src.config.routing_config import MAKRO_SPEED_MPS
+from src.services.isochrone import compute_isochrone
+from src.services.raptor import earliest_arrivals
+from src.services.transit_network import TransitNetwork
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+
+def make_network():
+    return TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+
+
+def test_earliest_arrivals_respects_limit():
+    network = make_network()
+    a, c, f = network.stop_index[10], network.stop_index[12], network.stop_index[15]
+    best = earliest_arrivals(network, {a: 0}, transfer_penalty=60)
+    assert best[c] == network.ride_meters(0, 0, 2) / MAKRO_SPEED_MPS
+    assert best[f] < float("inf")
+    limited = earliest_arrivals(network, {a: 0}, max_seconds=best[c], transfer_penalty=60)
+    assert limited[c] == best[c]
+    assert limited[f] == float("inf")
+
+
+def test_isochrone_bands():
+    network = make_network()
+    result = compute_isochrone(network, 33.500, 36.300, [10, 5])
+    assert result["minutes"] == [5, 10]
+    arrivals = [s["arrival_seconds"] for s in result["stops"]]
+    assert arrivals == sorted(arrivals) and result["stops"][0]["stop_id"] == 10
+    assert all(a <= 600 for a in arrivals)
+
+    small, large = (shape(f["geometry"]) for f in result["geojson"]["features"])
+    assert small.contains(Point(36.300, 33.5005))
+    # المنطقة الأوسع تحتوي الأصغر، والمواقف البعيدة غير المدرجة خارجها
+    assert large.buffer(1e-9).contains(small)
+    assert not large.contains(Point(36.200, 33.400))
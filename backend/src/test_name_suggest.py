@@ -0,0 +1,52 @@
+import pytest
+from src.services import name_suggest, transit_network
+from src.services.name_suggest import NameSuggestIndex, get_name_suggest_index, normalize_arabic
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+ENTRIES = [
+    ("stop", 1, "موقف الإذاعة", 33.51, 36.28),
+    ("stop", 2, "جسر الرئيس", 33.51, 36.29),
+    ("stop", 3, "مَدْرَسَةُ المزّة", 33.50, 36.25),
+    ("stop", 4, "الأمويين", 33.51, 36.27),
+    ("route", 7, "مزة - كراجات", None, None),
+]
+
+
+def test_normalize_folds_arabic_variants():
+    assert normalize_arabic("أإآٱ ة ى ؤ ئ") == "اااا ه ي و ي"
+    assert normalize_arabic("مَدْرَسَـــةُ  ٣") == "مدرسه 3"
+
+
+def test_suggest_ignores_hamza_taa_marbuta_and_article():
+    index = NameSuggestIndex(ENTRIES)
+    assert [row["id"] for row in index.suggest("موقف الاذاع")] == [1]
+    assert [row["id"] for row in index.suggest("مدرسه")] == [3]
+    # كلمة عامة ليست في الاسم، وكلمات بأي ترتيب
+    assert [row["id"] for row in index.suggest("محطة الرييس جسر")] == [2]
+    # المزة دون "ال": الخط يبدأ بها فيأتي أولاً
+    assert [(row["kind"], row["id"]) for row in index.suggest("مزه")] == [("route", 7), ("stop", 3)]
+    assert [row["id"] for row in index.suggest("امو", kind="stop")] == [4]
+    assert index.suggest("مزه", kind="route", limit=1)[0]["lat"] is None
+    assert index.suggest("xyz") == [] and index.suggest("  ") == []
+
+
+@pytest.fixture
+def network():
+    network = transit_network.TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+    transit_network.set_network(network)
+    yield network
+    transit_network.set_network(None)
+
+
+def test_index_follows_network(network):
+    name = network.stop_names[0]
+    assert get_name_suggest_index().suggest(name)[0]["name"] == name
+    transit_network.set_network(network.patched(stops=[(16, "موقف تجريبي جديد", 33.51, 36.33)], version=1))
+    # الطلب لا ينتظر البناء: الفهرس السابق يخدم حتى يجهز الجديد
+    old = get_name_suggest_index()
+    assert old.suggest("تجريبي جد") == []
+    builder = name_suggest._builder
+    if builder is not None:
+        builder.join()
+    assert get_name_suggest_index() is not old
+    assert get_name_suggest_index().suggest("تجريبي جد")[0]["id"] == 16
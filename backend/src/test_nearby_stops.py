@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from src.services import transit_network
+from src.services.nearby_stops import decode_cursor, encode_cursor, find_nearby, nearby_in_memory
+from src.services.stop_geohash_index import GeohashStopIndex, get_stop_geohash_index
+from src.services.geo_math import geohash_encode
+from src.services.stop_index import StopIndex
+from src.services.synthetic_city import generate_city
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+
+@pytest.fixture
+def network():
+    network = transit_network.TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+    transit_network.set_network(network)
+    yield network
+    transit_network.set_network(None)
+
+
+def test_pages_follow_distance_order(network):
+    index = GeohashStopIndex.from_network(network)
+    first, cursor = nearby_in_memory(index, 33.5000, 36.3000, 5000, limit=2)
+    assert len(first) == 2 and cursor is not None
+    rest, last_cursor = nearby_in_memory(index, 33.5000, 36.3000, 5000, limit=100, after=decode_cursor(cursor))
+    everything, _ = nearby_in_memory(index, 33.5000, 36.3000, 5000, limit=100)
+    assert first + rest == everything and last_cursor is None
+    distances = [stop["distance_meters"] for stop in everything]
+    assert distances == sorted(distances) and distances[-1] <= 5000
+
+
+def test_sqlite_uses_in_memory_index(network):
+    with Session(create_engine("sqlite://")) as db:
+        stops, _ = find_nearby(db, 33.5000, 36.3000, 300, limit=10)
+    assert stops[0]["distance_meters"] < 300 and stops[0]["id"] in network.stop_index
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(123.456789, 42)) == (123.456789, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_geohash_index_matches_stop_index():
+    city = generate_city(n_stops=2000, n_routes=0, seed=5)
+    ids, names, lats, lngs = zip(*city.stops)
+    index = GeohashStopIndex(ids, names, lats, lngs, precision=6)
+    reference = StopIndex(lats, lngs, [()] * len(lats))
+    for lat, lng in [(33.5138, 36.2765), (33.55, 36.25), (33.45, 36.33)]:
+        found = [(round(m, 6), int(index.ids[p])) for m, p in index.within(lat, lng, 800)]
+        expected = sorted((round(m, 6), ids[s]) for m, s in reference.within(lat, lng, 800))
+        assert found == expected
+        assert index.nearest(lat, lng, 3) == index.nearby(lat, lng, 1e9)[:3]
+        inside = index.bbox(lat - 0.01, lng - 0.01, lat + 0.01, lng + 0.01)
+        assert [row["id"] for row in inside] == sorted(
+            i for i, _, a, b in city.stops if lat - 0.01 <= a <= lat + 0.01 and lng - 0.01 <= b <= lng + 0.01)
+    # رموز الخلايا هي geohash نفسه
+    code = int(index.cell_codes[0])
+    start = int(index.cell_starts[0])
+    assert index.geohash(code) == geohash_encode(index.lats[start], index.lngs[start], 6)
+
+
+def test_index_follows_network_updates(network):
+    assert 16 not in get_stop_geohash_index().ids
+    transit_network.set_network(network.patched(stops=[(16, "G", 33.5100, 36.3300)], version=1))
+    assert get_stop_geohash_index().nearest(33.5100, 36.3300)[0]["id"] == 16
+    removed = transit_network.peek_network().patched(removed_stops=[16], version=2)
+    transit_network.set_network(removed)
+    assert get_stop_geohash_index().nearest(33.5100, 36.3300)[0]["id"] != 16
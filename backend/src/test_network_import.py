@@ -0,0 +1,80 @@
+import io
+import zipfile
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from src.services import network_import
+from src.services.network_import import import_records, read_csv, read_gtfs
+
+SCHEMA = [
+    "CREATE TABLE stops (id INTEGER PRIMARY KEY, name TEXT UNIQUE, lat FLOAT, lng FLOAT)",
+    "CREATE TABLE routes (id INTEGER PRIMARY KEY, name TEXT UNIQUE, description TEXT, price INTEGER,"
+    " operating_hours TEXT)",
+    "CREATE TABLE route_stops (id INTEGER PRIMARY KEY, route_id INTEGER, stop_id INTEGER, stop_order INTEGER)",
+    "CREATE TABLE route_paths (id INTEGER PRIMARY KEY, route_id INTEGER, lat FLOAT, lng FLOAT, point_order INTEGER)",
+]
+
+CSV = """name,lat,lng,route
+المرجة,33.5130,36.2980,خط 1
+ البرامكة ,33.5060,36.2880,خط 1
+المرجة,33.9999,36.9999,خط 2
+باب توما,33.5140,36.3150,خط 2
+خطأ,95,36.3,
+"""
+
+
+@pytest.fixture
+def db(monkeypatch):
+    published = []
+    monkeypatch.setattr(network_import, "_publish", lambda route_ids, stop_ids: published.append((route_ids, stop_ids)))
+    with Session(create_engine("sqlite://")) as session:
+        for statement in SCHEMA:
+            session.execute(text(statement))
+        session.execute(text("INSERT INTO stops (name, lat, lng) VALUES ('باب توما', 33.5, 36.3)"))
+        session.commit()
+        session.published = published
+        yield session
+
+
+def test_csv_import_dedups_names_in_chunks(db):
+    staged = []
+    report = import_records(db, read_csv(io.StringIO(CSV)), chunk_rows=2,
+                            progress=lambda kind, count: staged.append((kind, count)))
+    assert report["stops"] == {"inserted": 2, "read": 4, "invalid": 1}
+    assert report["routes"]["inserted"] == 2 and report["route_stops"]["unmatched"] == 0
+    assert ("stop", 2) in staged and ("stop", 4) in staged
+    # أول ظهور للاسم، والموقف الموجود لا يتغير
+    assert db.execute(text("SELECT lat FROM stops WHERE name = 'المرجة'")).scalar() == 33.5130
+    assert db.execute(text("SELECT lat FROM stops WHERE name = 'باب توما'")).scalar() == 33.5
+    orders = db.execute(text("""SELECT s.name, rs.stop_order FROM route_stops rs JOIN routes r ON r.id = rs.route_id
+                                JOIN stops s ON s.id = rs.stop_id WHERE r.name = 'خط 1' ORDER BY 2""")).all()
+    assert orders == [("المرجة", 1), ("البرامكة", 2)]
+    [(route_ids, stop_ids)] = db.published
+    assert len(route_ids) == 2 and len(stop_ids) == 3
+
+    # إعادة الاستيراد تستبدل مواقف الخطوط ولا تكرر المواقف
+    report = import_records(db, read_csv(io.StringIO(CSV)), update_existing=True)
+    assert report["stops"]["inserted"] == 0 and report["stops"]["updated"] == 3
+    assert report["route_stops"]["replaced"] == 4
+    assert db.execute(text("SELECT COUNT(*) FROM route_stops")).scalar() == 4
+    assert db.execute(text("SELECT lat FROM stops WHERE name = 'باب توما'")).scalar() == 33.5140
+
+
+def test_gtfs_zip_uses_one_trip_per_route(db):
+    feed = io.BytesIO()
+    with zipfile.ZipFile(feed, "w") as archive:
+        archive.writestr("feed/routes.txt", "route_id,route_short_name,route_long_name\nR1,1,مزة - كراجات\n")
+        archive.writestr("feed/trips.txt", "route_id,service_id,trip_id,shape_id\nR1,D,T0,\nR1,D,T1,S1\n")
+        archive.writestr("feed/stops.txt", "﻿stop_id,stop_name,stop_lat,stop_lon,location_type\n"
+                                           "A,المزة,33.50,36.25,0\nB,الكراجات,33.52,36.32,\nST,محطة,33.5,36.3,1\n")
+        archive.writestr("feed/stop_times.txt", "trip_id,stop_sequence,stop_id\nT1,20,B\nT1,10,A\nT0,1,B\n")
+        archive.writestr("feed/shapes.txt", "shape_id,shape_pt_lat,shape_pt_lon,shape_pt_sequence\n"
+                                            "S1,33.50,36.25,1\nS1,33.51,36.28,2\nS2,1,1,1\n")
+    feed.seek(0)
+    report = import_records(db, read_gtfs(feed))
+    assert report["stops"]["inserted"] == 2 and report["routes"]["inserted"] == 1
+    assert report["route_paths"]["inserted"] == 2
+    names = db.execute(text("""SELECT s.name FROM route_stops rs JOIN stops s ON s.id = rs.stop_id
+                               ORDER BY rs.stop_order""")).scalars().all()
+    assert names == ["المزة", "الكراجات"]
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from src.services.network_snapshot import CSRView, load_snapshot, save_snapshot, snapshot_info
+from src.services import network_updates
+from src.services.transit_network import TransitNetwork
+from src.services.raptor import raptor_search
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+
+@pytest.fixture
+def network():
+    return TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS, version=7)
+
+
+def test_snapshot_round_trip(network, tmp_path):
+    path = str(tmp_path / "network.snapshot")
+    save_snapshot(network, path)
+    loaded = load_snapshot(path)
+
+    assert loaded.stats() == network.stats()
+    assert snapshot_info(path)["network_version"] == 7
+    for name in ("stop_ids", "stop_names", "stop_lats", "stop_lngs", "route_ids", "route_names", "route_prices",
+                 "route_hours", "route_service", "route_paths", "pattern_route", "pattern_stops",
+                 "pattern_cum_meters", "stop_patterns", "footpaths"):
+        assert getattr(loaded, name) == getattr(network, name), name
+    for ours, theirs in zip(loaded.route_path_meters, network.route_path_meters):
+        assert np.array_equal(ours, theirs)
+    # الفهرس المكاني والأنماط يقرأون من الملف مباشرة
+    assert not loaded.spatial_index.lats.flags.writeable
+    assert isinstance(loaded.pattern_stops, CSRView) and isinstance(loaded.pattern_stops[0][0], int)
+    assert loaded.spatial_index.within(33.5, 36.3, 600) == network.spatial_index.within(33.5, 36.3, 600)
+
+    a, e = network.stop_index[10], network.stop_index[14]
+    expected = [j.route_sequence(network) for j in raptor_search(network, {a: 0}, {e: 0}, transfer_penalty=60)]
+    assert [j.route_sequence(loaded) for j in raptor_search(loaded, {a: 0}, {e: 0}, transfer_penalty=60)] == expected
+    # التعديلات الجزئية تعمل على النوافذ كما على القوائم
+    moved = loaded.patched(stops=[(STOPS[0][0], STOPS[0][1], STOPS[0][2] + 0.001, STOPS[0][3])], version=8)
+    assert moved.stats()["patterns"] == network.stats()["patterns"]
+
+
+def test_snapshot_keeps_update_seq(network, tmp_path, monkeypatch):
+    network.update_seq = 12
+    path = str(tmp_path / "network.snapshot")
+    save_snapshot(network, path)
+    loaded = load_snapshot(path, version=1)
+    assert loaded.update_seq == 12 and snapshot_info(path)["update_seq"] == 12
+
+    # لا تعديلات بعد التصدير: الشبكة المحملة تبقى
+    invalidated = []
+    monkeypatch.setattr(network_updates, "peek_network", lambda: loaded)
+    monkeypatch.setattr(network_updates, "invalidate_network", lambda: invalidated.append(1))
+    monkeypatch.setattr(network_updates, "current_seq", lambda: 12)
+    network_updates._catch_up()
+    assert invalidated == []
+    monkeypatch.setattr(network_updates, "current_seq", lambda: 13)
+    network_updates._catch_up()
+    assert invalidated == [1]
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "other.snapshot"
+    path.write_bytes(b"not a snapshot at all")
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
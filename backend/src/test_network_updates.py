@@ -0,0 +1,55 @@
+import pytest
+from src.services import network_updates, route_search, transit_network
+from src.services.transit_network import TransitNetwork
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def network(monkeypatch):
+    invalidated, loaded = [], []
+
+    def load_changes(db, route_ids, stop_ids):
+        loaded.append((route_ids, stop_ids))
+        # الخط 2 يمتد إلى موقف جديد G
+        return {
+            "routes": [row for row in ROUTES if row[0] in route_ids],
+            "stops": [(16, "G", 33.5100, 36.3300)],
+            "route_stops": [row for row in ROUTE_STOPS if row[1] in route_ids] + [(30, 2, 16, 4)],
+            "route_paths": [],
+            "removed_routes": set(),
+            "removed_stops": set(),
+        }
+
+    monkeypatch.setattr(network_updates, "load_changes", load_changes)
+    monkeypatch.setattr(route_search, "invalidate_search_cache",
+                        lambda route_ids, points: invalidated.append((set(route_ids), len(points))))
+    monkeypatch.setattr(network_updates.search_metrics, "incr", lambda name, amount=1: None)
+    network = TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS, version=3)
+    network.update_seq = 10
+    transit_network.set_network(network)
+    network.invalidated, network.loaded = invalidated, loaded
+    yield network
+    transit_network.set_network(None)
+
+
+def test_event_patches_current_network(network):
+    assert network_updates.apply_event({"seq": 11, "routes": [2], "stops": []}, FakeSession)
+    current = transit_network.peek_network()
+    assert (current.version, current.update_seq) == (4, 11)
+    assert 16 in current.stop_index and 16 not in network.stop_index
+    assert current.spatial_index.nearest(33.5100, 36.3300)[0][1] == current.stop_index[16]
+    # مواقف الخط قبل التعديل (C-D-E) وبعده (C-D-E-G)
+    assert network.invalidated == [({2}, 7)]
+    # نفس الحدث مرة أخرى لا يغير شيئاً
+    assert not network_updates.apply_event({"seq": 11, "routes": [2], "stops": []}, FakeSession)
+    assert transit_network.peek_network() is current
+
+
+def test_missed_event_rebuilds(network):
+    assert not network_updates.apply_event({"seq": 13, "routes": [2], "stops": []}, FakeSession)
+    assert network.stale and network.loaded == []
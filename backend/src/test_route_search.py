@@ -0,0 +1,177 @@
+import pytest
+from datetime import datetime, timezone
+from src.schemas.search import SearchRouteRequest
+from src.services import route_search, transit_network
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    store = {}
+    monkeypatch.setattr(route_search, "cache_get", lambda key: store.get(key))
+    monkeypatch.setattr(route_search, "cache_get_many", lambda keys: [store.get(k) for k in keys])
+    monkeypatch.setattr(route_search, "cache_set", lambda key, value, ttl=300: store.__setitem__(key, value))
+    monkeypatch.setattr(route_search, "cache_tag", lambda key, tags, ttl=300: None)
+    monkeypatch.setattr(route_search.search_metrics, "incr", lambda name, amount=1: None)
+    monkeypatch.setattr(route_search, "get_traffic_delays", lambda segments, at=None: [60] * len(segments))
+    return store
+
+
+@pytest.fixture
+def fake_tags(fake_cache, monkeypatch):
+    tags = {}
+    monkeypatch.setattr(route_search, "cache_tag",
+                        lambda key, names, ttl=300: [tags.setdefault(name, set()).add(key) for name in names])
+
+    def invalidate(names):
+        keys = set().union(*(tags.pop(name, set()) for name in names))
+        for key in keys:
+            fake_cache.pop(key, None)
+        return len(keys)
+    monkeypatch.setattr(route_search, "invalidate_tags", invalidate)
+    return tags
+
+
+@pytest.fixture
+def network():
+    network = transit_network.TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+    transit_network.set_network(network)
+    yield network
+    transit_network.set_network(None)
+
+
+def make_request(start_lat=33.4995, start_lng=36.3, end_lat=33.5101, end_lng=36.3105, filter_type="fastest",
+                 departure_time=datetime(2024, 5, 6, 12, 0)):
+    return SearchRouteRequest(start_lat=start_lat, start_lng=start_lng, end_lat=end_lat, end_lng=end_lng,
+                              filter_type=filter_type, departure_time=departure_time)
+
+
+def test_search_returns_single_and_transfer_journeys(fake_cache, network):
+    response = route_search.search_routes(make_request())
+    descriptions = [r.description for r in response.routes]
+    assert {"خط 1", "خط 1 ثم خط 2"} <= set(descriptions)
+    times = [r.total_estimated_time_seconds for r in response.routes]
+    assert times == sorted(times)
+    makro = [s for s in response.routes[0].segments if s.type == "makro"]
+    assert makro[0].duration_seconds >= 60
+
+
+def test_nearby_requests_share_cache_entry(fake_cache, network):
+    first = make_request(start_lat=33.49950, start_lng=36.30000)
+    second = make_request(start_lat=33.49955, start_lng=36.30004)
+    assert route_search._cache_key(network, first) == route_search._cache_key(network, second)
+    assert route_search._cache_key(network, first) != route_search._cache_key(network, make_request(filter_type="cheapest"))
+
+    route_search.search_routes(first)
+    assert len(fake_cache) == 1
+    cached = route_search.search_routes(second)
+    fresh = route_search._rank(
+        network, route_search._find_candidates(network, second, lambda p: route_search._walking_candidates(network, p)),
+        second
+    )
+    # مقاطع المشي محسوبة للنقطة الدقيقة للطلب الثاني
+    assert cached == fresh
+
+
+def test_stale_cache_entry_is_recomputed(fake_cache, network):
+    request = make_request()
+    fake_cache[route_search._cache_key(network, request)] = [
+        {"legs": [{"route_id": 999, "board_stop_id": 10, "alight_stop_id": 12, "traffic_seconds": 0}]}
+    ]
+    response = route_search.search_routes(request)
+    assert response.routes
+    assert fake_cache[route_search._cache_key(network, request)][0]["legs"][0]["route_id"] != 999
+
+
+def test_batch_preserves_order(fake_cache, network):
+    requests = [make_request(filter_type="cheapest"), make_request(), make_request(filter_type="cheapest")]
+    results = route_search.search_routes_batch(requests)
+    assert len(results) == 3
+    assert results[0] == results[2]
+    assert results[1] == route_search.search_routes(requests[1])
+
+
+def test_best_first_prunes_routes_that_cannot_win(fake_cache, network, monkeypatch):
+    looked_up, counters = [], {}
+    monkeypatch.setattr(route_search, "get_traffic_delays", lambda segments, at=None: looked_up.extend(segments) or [0] * len(segments))
+    monkeypatch.setattr(route_search.search_metrics, "incr",
+                        lambda name, amount=1: counters.__setitem__(name, counters.get(name, 0) + amount))
+    a, e = network.stop_index[10], network.stop_index[14]
+    journeys = route_search.raptor_search(network, {a: 0}, {e: 0}, transfer_penalty=60)
+    assert len(journeys) == 2
+
+    candidates = route_search._best_first_traffic(network, journeys, k=1)
+    # الرحلة عبر الموقف البعيد F لا تطلب لها بيانات ازدحام
+    assert [j.route_sequence(network) for j, _ in candidates] == [(0, 1)]
+    assert {s.route_id for s in looked_up} == {1, 2}
+    assert counters == {"ranked_searches": 1, "routes_evaluated": 1, "routes_pruned": 1}
+
+    # مع k أكبر من عدد الرحلات تقيّم كلها
+    assert len(route_search._best_first_traffic(network, journeys, k=3)) == 2
+
+
+def test_suggestion_includes_transfer_walk(fake_cache, monkeypatch):
+    from src.test_transit_network import WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS
+    # نقطة البداية قرب A فقط، فالوصول إلى خط 4 يتطلب التبديل مشياً من B إلى G
+    monkeypatch.setattr(route_search, "MAX_WALK_METERS", 200)
+    transit_network.set_network(transit_network.TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, []))
+    try:
+        response = route_search.search_routes(make_request(end_lat=33.5150, end_lng=36.3010))
+    finally:
+        transit_network.set_network(None)
+    types = [s.type for s in response.routes[0].segments]
+    assert types == ["walk", "makro", "walk", "makro"]
+    walk = response.routes[0].segments[2]
+    assert (walk.start_stop_id, walk.end_stop_id) == ("11", "16")
+    assert response.routes[0].total_estimated_time_seconds == sum(s.duration_seconds for s in response.routes[0].segments)
+
+
+def test_pareto_filter_returns_tradeoffs_in_one_entry(fake_cache, network):
+    request = make_request(end_lat=33.5101, end_lng=36.3201, filter_type="pareto")
+    routes = route_search.search_routes(request).routes
+    assert [r.description for r in routes] == ["خط 1 ثم خط 2", "خط 3"]
+    # لا يوجد مسار أفضل من آخر في كل المعايير
+    first, second = routes
+    assert first.total_estimated_time_seconds < second.total_estimated_time_seconds
+    assert first.total_estimated_cost < second.total_estimated_cost
+    assert list(fake_cache) == [route_search._cache_key(network, request)]
+
+
+def test_closed_line_excluded_at_night(fake_cache, network):
+    # خط 1 يعمل 06:00-23:00، فبعد منتصف الليل يبقى الخط 3 فقط إلى E
+    night = make_request(end_lat=33.5101, end_lng=36.3201, departure_time=datetime(2024, 5, 6, 23, 30))
+    assert [r.description for r in route_search.search_routes(night).routes] == ["خط 3"]
+    day = make_request(end_lat=33.5101, end_lng=36.3201)
+    assert "خط 1 ثم خط 2" in [r.description for r in route_search.search_routes(day).routes]
+    assert route_search._cache_key(network, night) != route_search._cache_key(network, day)
+    # الوقت مع منطقة زمنية يحول إلى التوقيت المحلي (UTC+3)
+    utc_night = night.model_copy(update={"departure_time": datetime(2024, 5, 6, 20, 30, tzinfo=timezone.utc)})
+    assert route_search._cache_key(network, utc_night) == route_search._cache_key(network, night)
+
+
+def test_route_change_invalidates_tagged_results(fake_tags, fake_cache, network):
+    route_search.search_routes(make_request())
+    far = make_request(start_lat=33.4000, start_lng=36.2000, end_lat=33.5101, end_lng=36.3201, filter_type="cheapest")
+    route_search.search_routes(far)
+    assert len(fake_cache) == 2
+    assert "route_search:route:1" in fake_tags
+    # الرحلة من F تستخدم الخط 3 فقط، فتعديل الخط 2 لا يبطلها
+    assert route_search.invalidate_search_cache([2], []) == 1
+    assert list(fake_cache) == [route_search._cache_key(network, far)]
+    # موقف جديد قرب نقطة البداية
+    assert route_search.invalidate_search_cache([], [(33.4010, 36.2010)]) == 1
+    assert fake_cache == {}
+
+
+def test_stream_sends_untrafficked_result_first(fake_cache, network, monkeypatch):
+    from src.services.traffic import StubTrafficDelayProvider
+    monkeypatch.setattr(route_search, "current_provider", lambda: StubTrafficDelayProvider())
+    request = make_request()
+    phases = list(route_search.search_routes_stream(request))
+    assert [phase for phase, _ in phases][0] == "initial" and phases[-1][0] == "final"
+    initial, final = phases[0][1], phases[-1][1]
+    # الأولى دون ازدحام، والنهائية مع 60 ثانية لكل مقطع ركوب
+    assert initial.routes[0].total_estimated_time_seconds < final.routes[0].total_estimated_time_seconds
+    # النتيجة النهائية مخزنة، فالطلب التالي يأخذها مباشرة
+    assert [phase for phase, _ in route_search.search_routes_stream(request)] == ["final"]
+    assert route_search.search_routes(request) == final
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from src.services import search_log
+from src.services.search_log import SearchLogWriter
+
+
+class FakeSession:
+    def __init__(self, batches, fail=False, routes=None):
+        self.batches = batches
+        self.fail = fail
+        self.routes = routes
+
+    def bulk_insert_mappings(self, model, rows):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        if self.routes is not None and any(row.get("route_id") not in self.routes for row in rows):
+            raise IntegrityError("INSERT INTO search_logs", rows, Exception("foreign key violation"))
+        self.batches.append(list(rows))
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    counters = {}
+    monkeypatch.setattr(search_log.search_metrics, "incr",
+                        lambda name, amount=1: counters.__setitem__(name, counters.get(name, 0) + amount))
+    return counters
+
+
+def test_batches_by_size_and_counts_drops(counters):
+    batches = []
+    writer = SearchLogWriter(lambda: FakeSession(batches), max_queue=5, batch_size=2, flush_seconds=0.01)
+    accepted = [writer.submit({"filter_type": "fastest", "n": i}) for i in range(7)]
+    assert accepted == [True] * 5 + [False] * 2
+    assert writer.flush() == 2 and writer.flush() == 2 and writer.flush() == 1
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert counters == {"search_logs_written": 5, "search_logs_dropped": 2}
+
+
+def test_failed_batch_is_counted(counters):
+    writer = SearchLogWriter(lambda: FakeSession([], fail=True), batch_size=10, flush_seconds=0.01)
+    writer.submit({"filter_type": "cheapest"})
+    assert writer.flush() == 0
+    assert counters == {"search_logs_failed": 1}
+
+
+def test_row_with_deleted_route_does_not_drop_batch(counters):
+    batches = []
+    writer = SearchLogWriter(lambda: FakeSession(batches, routes={None, 1}), batch_size=10, flush_seconds=0.01)
+    for route_id in (1, 99, None):
+        writer.submit({"route_id": route_id})
+    assert writer.flush() == 2
+    assert batches == [[{"route_id": 1}], [{"route_id": None}]]
+    assert counters == {"search_logs_written": 2, "search_logs_failed": 1}
+
+
+def test_background_thread_writes_and_drains_on_close(counters):
+    batches = []
+    writer = SearchLogWriter(lambda: FakeSession(batches), batch_size=100, flush_seconds=0.05)
+    writer.start()
+    for i in range(3):
+        writer.submit({"n": i})
+    writer.close()
+    assert sum(len(batch) for batch in batches) == 3
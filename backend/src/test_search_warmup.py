@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import pytest
+from src.services import route_search, search_warmup, traffic
+from src.services.search_warmup import popular_pairs, upcoming_hours, warm_cache
+from src.services.traffic import StubTrafficDelayProvider, TrafficProvider
+from src.test_route_search import fake_cache, network, make_request  # noqa: F401
+
+# 05:10 و 05:40 بتوقيت UTC = الساعة 8 محلياً
+MORNING = datetime(2024, 5, 6, 5, 10)
+LATE_MORNING = datetime(2024, 5, 6, 5, 40)
+
+
+def test_pairs_grouped_by_cell_and_local_hour():
+    rows = [
+        (33.49950, 36.30000, 33.5101, 36.3105, "fastest", MORNING),
+        (33.49955, 36.30004, 33.5101, 36.3105, None, LATE_MORNING),
+        (33.49950, 36.30000, 33.5101, 36.3105, "cheapest", MORNING),
+        (33.40000, 36.20000, 33.5101, 36.3201, "fastest", datetime(2024, 5, 6, 15, 0)),
+    ]
+    pairs = popular_pairs(rows, hours=[8, 9], top_n=1)
+    assert pairs[9] == []
+    [top] = pairs[8]
+    assert (top.filter_type, top.count) == ("fastest", 2)
+    assert abs(top.start_lat - 33.499525) < 1e-9
+
+
+class HourlyProvider(TrafficProvider):
+    """مزود يعرف الازدحام حسب الوقت، ويسجل الأوقات المطلوبة"""
+
+    is_local = True
+    time_aware = True
+
+    def __init__(self):
+        self.moments = []
+
+    def get_delay(self, segment):
+        raise AssertionError("warmup must ask for the departure hour, not now")
+
+    def get_delay_at(self, segment, moment):
+        self.moments.append(moment)
+        return 60
+
+
+@pytest.fixture
+def provider(fake_cache, monkeypatch):
+    monkeypatch.setattr(search_warmup.search_metrics, "incr", lambda name, amount=1: None)
+    monkeypatch.setattr(route_search, "get_traffic_delays", traffic.get_traffic_delays)
+    yield
+    traffic.set_traffic_provider(None)
+
+
+def test_warm_cache_makes_first_search_a_hit(fake_cache, network, provider):
+    hourly = HourlyProvider()
+    traffic.set_traffic_provider(hourly)
+    rows = [(33.4995, 36.3, 33.5101, 36.3105, "fastest", MORNING), (33.4995, 36.3, 33.5101, 36.3105, "cheapest", MORNING)]
+    pairs = popular_pairs(rows, hours=[8])
+    local_now = datetime(2024, 5, 6, 7, 15)
+    assert warm_cache(pairs, local_now) == {"computed": 2, "already_cached": 0, "skipped": 0, "failed": 0}
+    # الازدحام لوقت الانطلاق 08:30 محلياً
+    assert set(hourly.moments) == {datetime(2024, 5, 6, 5, 30, tzinfo=timezone.utc)}
+    # طلب الساعة 8 يجد النتيجة المسخنة
+    request = make_request(departure_time=datetime(2024, 5, 6, 8, 5))
+    assert route_search._cache_key(network, request) in fake_cache
+    # نتيجة أسرع طريق تعاد بازدحام ساعتها بدل تمديدها، والأرخص تمدد
+    assert warm_cache(pairs, local_now) == {"computed": 1, "already_cached": 1, "skipped": 0, "failed": 0}
+
+
+def test_warmed_hours_get_separate_keys(fake_cache, network, provider):
+    hourly = HourlyProvider()
+    traffic.set_traffic_provider(hourly)
+    pairs = popular_pairs([(33.4995, 36.3, 33.5101, 36.3105, "fastest", MORNING),
+                           (33.4995, 36.3, 33.5101, 36.3105, "fastest", datetime(2024, 5, 6, 6, 10))], hours=[8, 9])
+    assert warm_cache(pairs, datetime(2024, 5, 6, 7, 15))["computed"] == 2
+    eight, nine = (route_search._cache_key(network, make_request(departure_time=datetime(2024, 5, 6, hour, 5)))
+                   for hour in (8, 9))
+    assert eight != nine and eight in fake_cache and nine in fake_cache
+    # البحث العادي يحسب بازدحام وقت انطلاقه كما في التسخين
+    hourly.moments.clear()
+    fake_cache.clear()
+    route_search.search_routes(make_request(departure_time=datetime(2024, 5, 6, 8, 5)))
+    assert set(hourly.moments) == {datetime(2024, 5, 6, 5, 5, tzinfo=timezone.utc)} and eight in fake_cache
+
+
+def test_live_traffic_results_are_not_warmed_or_extended(fake_cache, network, provider, monkeypatch):
+    traffic.set_traffic_provider(StubTrafficDelayProvider(delay_seconds=30))
+    request = make_request(departure_time=datetime(2024, 5, 6, 8, 5))
+    route_search.search_routes(request)
+    ttls = []
+    monkeypatch.setattr(route_search, "cache_set", lambda key, value, ttl=300: ttls.append(ttl))
+    pairs = popular_pairs([(33.4995, 36.3, 33.5101, 36.3105, "fastest", MORNING)], hours=[8])
+    assert warm_cache(pairs, datetime(2024, 5, 6, 7, 15))["skipped"] == 1
+    assert ttls == []
+
+
+def test_upcoming_hours_stop_at_midnight():
+    local_now, hours = upcoming_hours(3, now=datetime.fromisoformat("2024-05-06T19:20:00+00:00"))
+    assert (local_now.hour, hours) == (22, [23])
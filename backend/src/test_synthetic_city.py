@@ -0,0 +1,34 @@
+import itertools
+from datetime import datetime, timezone
+from src.services.synthetic_city import generate_city, makro_location_rows, search_log_rows
+from src.services.transit_network import TransitNetwork
+from src.services.raptor import raptor_search
+
+END = datetime(2024, 5, 6, tzinfo=timezone.utc)
+
+
+def test_city_is_deterministic_and_builds_network():
+    city = generate_city(n_stops=400, n_routes=20, stops_per_route=10, seed=7, id_offsets={"stops": 1000})
+    assert generate_city(n_stops=400, n_routes=20, stops_per_route=10, seed=7, id_offsets={"stops": 1000}).route_paths == city.route_paths
+    assert city.stats()["stops"] == 400 and city.stats()["routes"] == 20
+    assert city.stops[0][0] == 1000 and len({stop[1] for stop in city.stops}) == 400
+    # نقاط المسار أكثف بكثير من المواقف
+    assert len(city.route_paths) > 3 * len(city.route_stops)
+
+    network = TransitNetwork.from_rows(city.routes, city.stops, city.route_stops, city.route_paths)
+    assert network.stats()["patterns"] == 40
+    # رحلة على خط واحد من أول موقف فيه إلى آخره
+    stops = [row[2] for row in city.route_stops if row[1] == city.routes[0][0]]
+    first, last = network.stop_index[stops[0]], network.stop_index[stops[-1]]
+    assert raptor_search(network, {first: 0.0}, {last: 0.0})
+
+
+def test_log_rows_are_lazy_and_ordered():
+    city = generate_city(n_stops=200, n_routes=5, stops_per_route=8, seed=3)
+    logs = list(search_log_rows(city, 50, days=10, end=END))
+    assert len(logs) == 50 and all((END - row["timestamp"]).days < 10 for row in logs)
+
+    locations = list(itertools.islice(makro_location_rows(city, 2, days=1, interval_seconds=60, end=END), 2000))
+    assert {row["makro_id"] for row in locations} == {"synthetic-1", "synthetic-2"}
+    first = [row["timestamp"] for row in locations if row["makro_id"] == "synthetic-1"]
+    assert first == sorted(first) and len(first) == 16 * 60
@@ -0,0 +1,47 @@
+import time
+import pytest
+from src.services import traffic
+
+
+@pytest.fixture
+def fake_cache(monkeypatch):
+    store = {}
+    monkeypatch.setattr(traffic, "cache_get_many", lambda keys: [store.get(k) for k in keys])
+    monkeypatch.setattr(traffic, "cache_set", lambda key, value, ttl=300: store.__setitem__(key, value))
+    monkeypatch.setattr(traffic.search_metrics, "incr", lambda name, amount=1: None)
+    yield store
+    traffic.set_traffic_provider(None)
+
+
+def segment(a, b):
+    return traffic.TrafficSegment(1, a, b, 33.5, 36.3, 33.51, 36.31)
+
+
+def test_delays_are_cached_per_stop_pair(fake_cache):
+    provider = traffic.StubTrafficDelayProvider(delay_seconds=42)
+    traffic.set_traffic_provider(provider)
+    segments = [segment(1, 2), segment(2, 3), segment(1, 2)]
+    assert traffic.get_traffic_delays(segments) == [42, 42, 42]
+    # المقطع المكرر يطلب مرة واحدة
+    assert provider.calls == 2
+    assert fake_cache == {"traffic:1:2": 42, "traffic:2:3": 42}
+    assert traffic.get_traffic_delays(segments) == [42, 42, 42]
+    assert provider.calls == 2
+
+
+def test_lookups_run_concurrently_within_deadline(fake_cache):
+    traffic.set_traffic_provider(traffic.StubTrafficDelayProvider(delay_seconds=10, latency_seconds=0.2))
+    started = time.perf_counter()
+    delays = traffic.get_traffic_delays([segment(i, i + 1) for i in range(8)], deadline_seconds=2)
+    assert delays == [10] * 8
+    assert time.perf_counter() - started < 1.0
+
+
+def test_slow_lookups_fall_back_to_zero(fake_cache):
+    traffic.set_traffic_provider(traffic.StubTrafficDelayProvider(delay_seconds=10, latency_seconds=0.5))
+    started = time.perf_counter()
+    assert traffic.get_traffic_delays([segment(5, 6)], deadline_seconds=0.05) == [0]
+    assert time.perf_counter() - started < 0.4
+    # النتيجة المتأخرة تخزن في الكاش عند وصولها
+    time.sleep(0.6)
+    assert fake_cache == {"traffic:5:6": 10}
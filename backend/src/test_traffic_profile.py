@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.config.routing_config import MAKRO_SPEED_MPS
+from src.services import traffic
+from src.services.geo_math import haversine
+from src.services.transit_network import TransitNetwork
+from src.services.traffic_profile import (
+    ProfileTrafficDelayProvider, TrafficProfile, build_profile, hour_of_week
+)
+
+# خط واحد A-B-C على خط طول ثابت، ونقاط مسار كل 0.001 درجة
+ROUTES = [(1, "خط 1", 500, None)]
+STOPS = [(10, "A", 33.500, 36.300), (11, "B", 33.505, 36.300), (12, "C", 33.510, 36.300)]
+ROUTE_STOPS = [(1, 1, 10, 1), (2, 1, 11, 2), (3, 1, 12, 3)]
+ROUTE_PATHS = [(i, 1, 33.500 + i * 0.001, 36.300, i) for i in range(11)]
+
+# الاثنين 08:00 بتوقيت دمشق = 05:00 UTC
+MONDAY_8 = datetime(2024, 1, 1, 5, 0)
+
+
+def trace(makro_id, start, speed_mps, step_seconds=20):
+    """نقاط GPS لمكرو يسير من A إلى C بسرعة ثابتة"""
+    meters_per_deg = float(haversine(33.500, 36.300, 33.501, 36.300)) / 0.001
+    rows, t = [], 0
+    while True:
+        lat = 33.500 + speed_mps * t / meters_per_deg
+        if lat > 33.510:
+            return rows
+        rows.append((makro_id, start + timedelta(seconds=t), lat, 36.3001))
+        t += step_seconds
+
+
+@pytest.fixture
+def profile():
+    network = TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+    rows = trace("m1", MONDAY_8, 2.5) + trace("m2", MONDAY_8 + timedelta(hours=5), 10.0)
+    return build_profile(network, rows)
+
+
+def test_hour_of_week():
+    assert hour_of_week(MONDAY_8) == 8
+    assert hour_of_week(MONDAY_8 + timedelta(days=6, hours=15)) == 6 * 24 + 23
+
+
+def test_profile_delay_by_hour(profile):
+    ride = float(haversine(33.500, 36.300, 33.510, 36.300))
+    slow = profile.delay(1, 10, 12, hour=8)
+    assert slow == pytest.approx(ride / 2.5 - ride / MAKRO_SPEED_MPS, rel=0.05)
+    # أسرع من السرعة التقديرية: لا ازدحام
+    assert profile.delay(1, 10, 12, hour=13) == 0
+    # ساعة بلا عينات تأخذ متوسط كل الساعات
+    assert 0 < profile.delay(1, 10, 12, hour=20) < slow
+    # الاتجاه المعاكس ومقطع جزئي
+    assert profile.delay(1, 12, 10, hour=8) == pytest.approx(slow)
+    assert profile.delay(1, 10, 11, hour=8) == pytest.approx(slow / 2, rel=0.1)
+    assert profile.delay(2, 10, 12, hour=8) is None
+
+
+def test_profile_roundtrip_and_provider(profile, tmp_path, monkeypatch):
+    path = str(tmp_path / "profile.npz")
+    profile.save(path)
+    loaded = TrafficProfile.load(path)
+    assert loaded.delay(1, 10, 12, hour=8) == pytest.approx(profile.delay(1, 10, 12, hour=8), rel=1e-4)
+
+    # المزود المحلي لا يمر بالكاش
+    monkeypatch.setattr(traffic, "cache_get_many", lambda keys: pytest.fail("cache used"))
+    traffic.set_traffic_provider(ProfileTrafficDelayProvider(loaded, clock=lambda: MONDAY_8))
+    try:
+        segment = traffic.TrafficSegment(1, 10, 12, 33.500, 36.300, 33.510, 36.300)
+        unknown = traffic.TrafficSegment(9, 10, 12, 33.500, 36.300, 33.510, 36.300)
+        delays = traffic.get_traffic_delays([segment, unknown])
+    finally:
+        traffic.set_traffic_provider(None)
+    assert delays == [int(loaded.delay(1, 10, 12, hour=8)), 0]
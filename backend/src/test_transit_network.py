@@ -0,0 +1,230 @@
+import pytest
+from src.services.transit_network import TransitNetwork, parse_operating_hours
+from src.services.raptor import pareto_search, raptor_search
+
+# شبكة صغيرة: خط 1 (A-B-C) وخط 2 (C-D-E) يلتقيان في الموقف C، وخط 3 (A-E) طويل ومكلف
+ROUTES = [(1, "خط 1", 500, "06:00-23:00"), (2, "خط 2", 400, None), (3, "خط 3", 1000, None)]
+STOPS = [
+    (10, "A", 33.500, 36.300),
+    (11, "B", 33.505, 36.300),
+    (12, "C", 33.510, 36.300),
+    (13, "D", 33.510, 36.310),
+    (14, "E", 33.510, 36.320),
+    (15, "F", 33.400, 36.200),
+]
+ROUTE_STOPS = [
+    (1, 1, 10, 1), (2, 1, 11, 2), (3, 1, 12, 3),
+    (4, 2, 12, 1), (5, 2, 13, 2), (6, 2, 14, 3),
+    (7, 3, 10, 1), (8, 3, 15, 2), (9, 3, 14, 3),
+]
+ROUTE_PATHS = [(1, 1, 33.500, 36.300, 2), (2, 1, 33.510, 36.300, 3), (3, 1, 33.490, 36.300, 1)]
+
+
+@pytest.fixture
+def network():
+    return TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS)
+
+
+def test_network_structure(network):
+    assert network.stats() == {"version": 0, "update_seq": 0, "stops": 6, "routes": 3, "patterns": 6, "footpaths": 0}
+    # نقاط المسار مرتبة حسب point_order
+    assert network.route_paths[0][0] == (33.490, 36.300)
+    # كل موقف على خط ثنائي الاتجاه يظهر في نمطين
+    assert len(network.stop_patterns[network.stop_index[11]]) == 2
+    assert network.is_served(network.stop_index[15])
+
+
+def test_stop_order_falls_back_to_insertion_order():
+    network = TransitNetwork.from_rows(
+        ROUTES[:1], STOPS, [(1, 1, 12, None), (2, 1, 10, None), (3, 1, 11, None)], [], bidirectional=False
+    )
+    assert [network.stop_ids[s] for s in network.pattern_stops[0]] == [12, 10, 11]
+
+
+def test_ride_meters_follow_route_path():
+    from src.services.geo_math import haversine
+    # الخط يلتف شرقاً بين A و C، والمسار مرسوم من C إلى A
+    path = [(1, 1, 33.510, 36.300, 1), (2, 1, 33.510, 36.305, 2), (3, 1, 33.500, 36.305, 3), (4, 1, 33.500, 36.300, 4)]
+    network = TransitNetwork.from_rows(ROUTES[:1], STOPS, [(1, 1, 10, 1), (2, 1, 12, 2)], path)
+    detour = float(network.route_path_meters[0][-1])
+    assert detour > 1.5 * float(haversine(33.500, 36.300, 33.510, 36.300))
+    assert network.ride_meters(0, 0, 1) == pytest.approx(detour, rel=1e-3)
+    assert network.ride_meters(1, 0, 1) == pytest.approx(detour, rel=1e-3)
+
+
+def test_ride_meters_fall_back_to_straight_lines(network):
+    from src.services.geo_math import haversine
+    # مسار الخط 1 يمر بكل مواقفه، والخط 2 بلا مسار
+    a_to_c = float(haversine(33.500, 36.300, 33.510, 36.300))
+    assert network.ride_meters(0, 0, 2) == pytest.approx(a_to_c, rel=1e-3)
+    c_to_e = float(haversine(33.510, 36.300, 33.510, 36.320))
+    assert network.ride_meters(2, 0, 2) == pytest.approx(c_to_e, rel=1e-3)
+    # مسار لا يمر قرب المواقف لا يستخدم
+    far = [(1, 1, 33.600, 36.400, 1), (2, 1, 33.610, 36.400, 2)]
+    network = TransitNetwork.from_rows(ROUTES[:1], STOPS, ROUTE_STOPS[:3], far)
+    assert network.ride_meters(0, 0, 2) == pytest.approx(a_to_c, rel=1e-3)
+
+
+def test_single_line_journey(network):
+    a, b = network.stop_index[10], network.stop_index[12]
+    journeys = raptor_search(network, {a: 0}, {b: 0}, max_transfers=0)
+    assert len(journeys) == 1
+    assert journeys[0].route_sequence(network) == (0,)
+    assert journeys[0].access_stop(network) == a
+    assert journeys[0].egress_stop(network) == b
+
+
+def test_reverse_direction(network):
+    c, a = network.stop_index[12], network.stop_index[10]
+    journeys = raptor_search(network, {c: 0}, {a: 0})
+    assert journeys[0].route_sequence(network) == (0,)
+    assert journeys[0].legs[0].board_pos == 0
+
+
+def test_transfer_journey(network):
+    a, d = network.stop_index[10], network.stop_index[13]
+    assert raptor_search(network, {a: 0}, {d: 0}, max_transfers=0) == []
+    journeys = raptor_search(network, {a: 0}, {d: 0}, max_transfers=1, transfer_penalty=60)
+    # البديل الأبطأ (الخط 3 ثم الخط 2 بالاتجاه المعاكس) يأتي بعد الأسرع
+    assert [j.route_sequence(network) for j in journeys] == [(0, 1), (2, 1)]
+    first, second = journeys[0].legs
+    assert network.pattern_stops[first.pattern][first.alight_pos] == network.stop_index[12]
+    assert network.pattern_stops[second.pattern][second.board_pos] == network.stop_index[12]
+
+
+def test_transfer_kept_only_when_faster(network):
+    a, e = network.stop_index[10], network.stop_index[14]
+    # الخط 3 المباشر يمر عبر موقف بعيد، لذلك الرحلة مع التبديل أسرع
+    journeys = raptor_search(network, {a: 0}, {e: 0}, max_transfers=1, transfer_penalty=60)
+    assert [j.route_sequence(network) for j in journeys] == [(2,), (0, 1)]
+    # مع عقوبة تبديل كبيرة تبقى الرحلة المباشرة فقط
+    journeys = raptor_search(network, {a: 0}, {e: 0}, max_transfers=1, transfer_penalty=10 ** 6)
+    assert [j.route_sequence(network) for j in journeys] == [(2,)]
+
+
+def test_parse_operating_hours():
+    assert parse_operating_hours("06:00-23:00") == ((360, 1380),)
+    assert parse_operating_hours("٦:٣٠ إلى ١٠") == ((390, 600),)
+    # فترة تمتد بعد منتصف الليل تقسم إلى فترتين
+    assert parse_operating_hours("22:00-02:00") == ((0, 120), (1320, 1440))
+    assert parse_operating_hours("24/7") is None
+    assert parse_operating_hours(None) is None
+
+
+def test_closed_routes(network):
+    assert network.closed_routes(12 * 60) == frozenset()
+    assert network.closed_routes(23 * 60 + 30) == frozenset({0})
+    a, e = network.stop_index[10], network.stop_index[14]
+    journeys = raptor_search(network, {a: 0}, {e: 0}, transfer_penalty=60, closed_routes=network.closed_routes(300))
+    assert [j.route_sequence(network) for j in journeys] == [(2,)]
+
+
+# خط 4 يبدأ من G على بعد ~100 متر من B، فالتبديل من خط 1 يتطلب المشي
+WALK_ROUTES = ROUTES[:1] + [(4, "خط 4", 300, None)]
+WALK_STOPS = STOPS[:3] + [(16, "G", 33.5055, 36.3010), (17, "H", 33.5150, 36.3010)]
+WALK_ROUTE_STOPS = ROUTE_STOPS[:2] + [(10, 4, 16, 1), (11, 4, 17, 2)]
+
+
+def test_footpaths_computed_between_lines():
+    network = TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, [])
+    b, g = network.stop_index[11], network.stop_index[16]
+    assert [other for other, _ in network.footpaths[b]] == [g]
+    assert network.footpaths[g][0][1] == pytest.approx(network.distance_between_stops(b, g))
+    assert network.stats()["footpaths"] == 2
+    # الجدول المحفوظ يستخدم كما هو بدل الحساب
+    stored = TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, [], footpaths=[(11, 16, 120.0)])
+    assert stored.footpaths[b] == [(g, 120.0)] and stored.footpaths[g] == []
+
+
+def test_transfer_with_walk_between_stops():
+    network = TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, [])
+    a, h = network.stop_index[10], network.stop_index[17]
+    journeys = raptor_search(network, {a: 0}, {h: 0}, transfer_penalty=60)
+    assert [j.route_sequence(network) for j in journeys] == [(0, 1)]
+    first, second = journeys[0].legs
+    assert network.pattern_stops[first.pattern][first.alight_pos] == network.stop_index[11]
+    assert network.pattern_stops[second.pattern][second.board_pos] == network.stop_index[16]
+    # دون ممرات المشي لا توجد رحلة
+    network.set_footpaths([])
+    assert raptor_search(network, {a: 0}, {h: 0}) == []
+
+
+def _shape(network):
+    """بنية الشبكة بمعرفات قاعدة البيانات، للمقارنة بين شبكة معدلة وشبكة مبنية من جديد"""
+    patterns = {
+        network.route_ids[route]: [
+            ([network.stop_ids[s] for s in network.pattern_stops[p]], [round(m, 3) for m in network.pattern_cum_meters[p]])
+            for p in patterns
+        ]
+        for route, patterns in enumerate(network.route_patterns) if network.route_ids[route] in network.route_index
+    }
+    footpaths = {
+        (network.stop_ids[stop], network.stop_ids[other])
+        for stop, paths in enumerate(network.footpaths) for other, _ in paths
+    }
+    nearby = {
+        network.stop_ids[stop]: sorted(network.stop_ids[other] for _, other in network.spatial_index.within(
+            *network.stop_coords(stop), 2000, served_only=True))
+        for stop_id, stop in network.stop_index.items()
+    }
+    return patterns, footpaths, nearby, network.stats()["patterns"]
+
+
+def test_patched_matches_full_rebuild():
+    network = TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, [])
+    # موقف جديد I على خط 4، نقل G بعيداً عن B، وحذف الخط 1 وإضافة الخط 2
+    stops = WALK_STOPS[:3] + [(16, "G", 33.5120, 36.3010), (17, "H", 33.5150, 36.3010), (18, "I", 33.5180, 36.3010)]
+    route_stops = [(10, 4, 16, 1), (11, 4, 17, 2), (12, 4, 18, 3), (4, 2, 12, 1), (5, 2, 16, 2)]
+    routes = [(4, "خط 4", 350, None), (2, "خط 2", 400, None)]
+    patched = network.patched(
+        routes=routes, stops=stops[3:], route_stops=route_stops, removed_routes=[1]
+    )
+    expected = TransitNetwork.from_rows(routes, stops, route_stops, [])
+    assert _shape(patched) == _shape(expected)
+    assert patched.version == network.version + 1
+    assert patched.route_prices[patched.route_index[4]] == 350
+    # النسخة الأصلية لم تتغير
+    assert _shape(network) == _shape(TransitNetwork.from_rows(WALK_ROUTES, WALK_STOPS, WALK_ROUTE_STOPS, []))
+
+    # حذف موقف يزيله من تسلسل خطوطه ومن الفهرس المكاني
+    removed = patched.patched(removed_stops=[17])
+    route_stops = [row for row in route_stops if row[2] != 17]
+    assert _shape(removed) == _shape(TransitNetwork.from_rows(routes, stops[:4] + stops[5:], route_stops, []))
+    a, i = removed.stop_index[16], removed.stop_index[18]
+    assert [j.route_sequence(removed) for j in raptor_search(removed, {a: 0}, {i: 0})] == [(1,)]
+
+
+def test_pareto_search_keeps_all_tradeoffs(network):
+    a, e = network.stop_index[10], network.stop_index[14]
+    journeys = pareto_search(network, {a: 0}, {e: 0}, transfer_penalty=60)
+    # الأسرع والأرخص مع تبديل، والمباشر الأبطأ والأغلى لأنه بلا تبديل
+    assert [j.route_sequence(network) for j in journeys] == [(0, 1), (2,)]
+    fastest = raptor_search(network, {a: 0}, {e: 0}, transfer_penalty=60)
+    assert journeys[0].total_seconds == pytest.approx(min(j.total_seconds for j in fastest))
+    # بدون تبديلات يبقى المباشر فقط
+    assert [j.route_sequence(network) for j in pareto_search(network, {a: 0}, {e: 0}, max_transfers=0)] == [(2,)]
+
+
+def test_pareto_search_prefers_cheaper_slower_line():
+    # خط 5 يوازي خط 1 بأجرة أقل لكنه أطول (يمر بموقف بعيد)
+    routes = ROUTES[:1] + [(5, "خط 5", 100, None)]
+    route_stops = ROUTE_STOPS[:3] + [(20, 5, 10, 1), (21, 5, 15, 2), (22, 5, 12, 3)]
+    network = TransitNetwork.from_rows(routes, STOPS, route_stops, [])
+    a, c = network.stop_index[10], network.stop_index[12]
+    journeys = pareto_search(network, {a: 0}, {c: 0})
+    assert [j.route_sequence(network) for j in journeys] == [(0,), (1,)]
+    assert raptor_search(network, {a: 0}, {c: 0})[0].route_sequence(network) == (0,)
+
+
+def test_spatial_index_matches_brute_force(network):
+    from src.services.geo_math import haversine
+    index = network.spatial_index
+    point = (33.506, 36.302)
+    expected = sorted(
+        (float(haversine(*point, *network.stop_coords(s))), s) for s in range(len(network.stop_ids))
+    )
+    assert [s for _, s in index.within(*point, 1500)] == [s for m, s in expected if m <= 1500]
+    assert [s for _, s in index.nearest(*point, k=3)] == [s for _, s in expected[:3]]
+    # الموقف البعيد F يُوجد عند طلب كل المواقف
+    assert len(index.nearest(*point, k=10)) == 6
+    assert index.routes_for(network.stop_index[12]) == (0, 1)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from src.schemas.search import MatrixRequest
+from src.services import travel_matrix
+from src.services.network_snapshot import load_snapshot, save_snapshot
+from src.services.raptor import earliest_arrivals
+from src.services.traffic_profile import RouteProfile, TrafficProfile, pattern_delays
+from src.services.transit_network import TransitNetwork
+from src.test_transit_network import ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS
+
+ORIGINS = [(33.5001, 36.3001), (33.5101, 36.3101), (33.3000, 36.1000)]
+DESTINATIONS = [(33.5101, 36.3201), (33.5002, 36.3002), (33.3000, 36.1000)]
+
+
+def make_network():
+    return TransitNetwork.from_rows(ROUTES, STOPS, ROUTE_STOPS, ROUTE_PATHS, version=7)
+
+
+def test_matrix_sequential():
+    network = make_network()
+    matrix = travel_matrix.compute_matrix(network, ORIGINS, DESTINATIONS, parallel=False)
+    assert len(matrix) == 3 and all(len(row) == 3 for row in matrix)
+    # نقطة بعيدة عن كل المواقف: لا يصل إليها إلا المشي المباشر من نفسها
+    assert matrix[0][2] is None and matrix[2][0] is None
+    assert matrix[2][2] == 0
+    # وجهة على بعد أمتار: مشي مباشر
+    assert matrix[0][1] < 60
+    assert matrix[0][0] > matrix[1][0]
+
+
+def test_matrix_parallel_matches_sequential():
+    network = make_network()
+    sequential = travel_matrix.compute_matrix(network, ORIGINS * 4, DESTINATIONS, parallel=False)
+    parallel = travel_matrix.compute_matrix(network, ORIGINS * 4, DESTINATIONS, parallel=True)
+    assert parallel == sequential
+
+
+def test_matrix_pool_from_snapshot_network(tmp_path):
+    path = str(tmp_path / "network.snapshot")
+    save_snapshot(make_network(), path)
+    network = load_snapshot(path, version=8)
+    patched = network.patched(stops=[(STOPS[0][0], STOPS[0][1], STOPS[0][2], STOPS[0][3])], version=9)
+    for loaded in (network, patched):
+        sequential = travel_matrix.compute_matrix(loaded, ORIGINS * 4, DESTINATIONS, parallel=False)
+        assert travel_matrix.compute_matrix(loaded, ORIGINS * 4, DESTINATIONS, parallel=True) == sequential
+
+
+def test_pattern_delays_slow_down_rides():
+    network = make_network()
+    # 100 ثانية ازدحام على كل مقطع من خط 1 في كل الساعات
+    profile = TrafficProfile({1: RouteProfile([10, 11, 12], np.full((168, 2), 100.0))})
+    delays = pattern_delays(network, profile, hour=0)
+    assert delays[0] == [0.0, 100.0, 200.0] and delays[1] == [0.0, 100.0, 200.0]
+    a, c = network.stop_index[10], network.stop_index[12]
+    plain = earliest_arrivals(network, {a: 0})
+    slowed = earliest_arrivals(network, {a: 0}, pattern_delays=delays)
+    assert slowed[c] == plain[c] + 200
+
+
+@pytest.mark.parametrize("max_minutes", [0, -5])
+def test_matrix_rejects_non_positive_max_minutes(max_minutes):
+    # FastAPI يعيد 422 لخطأ التحقق في جسم الطلب
+    with pytest.raises(ValidationError):
+        MatrixRequest(origins=[], destinations=[], max_minutes=max_minutes)
+    assert MatrixRequest(origins=[], destinations=[], max_minutes=1).max_minutes == 1